@@ -0,0 +1,214 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+_THROTTLING_ERRORS = {"ThrottlingException", "ProvisionedThroughputExceededException", "LimitExceededException"}
+
+
+class TextractJobError(Exception):
+    """Raised when a Textract detection job ends in a non-successful state."""
+
+
+class AsyncTextractClient:
+    """
+    asyncio-native client for Textract's asynchronous text detection API.
+
+    - `submit` starts detection jobs without waiting for them, so hundreds of jobs
+      can be fanned out at once (bounded by `max_concurrent_requests`).
+    - A single background task polls every pending job, backing off while nothing
+      finishes and tightening again as soon as a job completes or a new one is added.
+    - Result pages are fetched while the previous page is being parsed, and the pages
+      of different jobs are fetched concurrently.
+
+    Each boto3 call runs on a dedicated thread pool, so the event loop never blocks
+    on network I/O or on a polling sleep.
+
+    Usage:
+        async with AsyncTextractClient(s3_bucket_name="my-bucket") as client:
+            text = await client.extract("documents/invoice.pdf")
+    """
+
+    def __init__(self, region_name: str = "us-east-1", s3_bucket_name: Optional[str] = None,
+                 textract_client=None, max_concurrent_requests: int = 32,
+                 min_poll_interval: float = 1.0, max_poll_interval: float = 20.0,
+                 poll_backoff: float = 1.5, max_start_retries: int = 5):
+        """
+        :param region_name: AWS region for Textract.
+        :param s3_bucket_name: Default S3 bucket for `submit` / `extract`.
+        :param textract_client: Optional boto3 Textract client (e.g. pointing at a custom endpoint).
+        :param max_concurrent_requests: Upper bound on Textract API calls in flight.
+        :param min_poll_interval: Seconds between polling rounds right after activity.
+        :param max_poll_interval: Upper bound for the polling interval while jobs are idle.
+        :param poll_backoff: Factor applied to the polling interval after a round with no completions.
+        :param max_start_retries: Retries for throttled StartDocumentTextDetection calls.
+        """
+        self.s3_bucket_name = s3_bucket_name
+        self.textract = textract_client or boto3.client("textract", region_name=region_name)
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.poll_backoff = poll_backoff
+        self.max_start_retries = max_start_retries
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_requests, thread_name_prefix="textract")
+        self._request_slots = asyncio.Semaphore(max_concurrent_requests)
+        self._pending_jobs: Dict[str, asyncio.Future] = {}
+        self._poller: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def __aenter__(self) -> "AsyncTextractClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Stops the polling task and releases the worker threads."""
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        for future in self._pending_jobs.values():
+            if not future.done():
+                future.cancel()
+        self._pending_jobs.clear()
+        self._executor.shutdown(wait=False)
+
+    async def _call(self, method_name: str, **kwargs) -> Dict[str, Any]:
+        async with self._request_slots:
+            loop = asyncio.get_running_loop()
+            method = getattr(self.textract, method_name)
+            return await loop.run_in_executor(self._executor, lambda: method(**kwargs))
+
+    async def submit(self, document_key: str, bucket_name: Optional[str] = None) -> str:
+        """
+        Starts a text detection job and returns its JobId without waiting for it.
+        Throttled requests are retried with exponential backoff.
+        """
+        target_bucket = bucket_name or self.s3_bucket_name
+        if not target_bucket:
+            raise ValueError("S3 bucket name not provided for async Textract operation.")
+        delay = self.min_poll_interval
+        for attempt in range(self.max_start_retries + 1):
+            try:
+                response = await self._call(
+                    "start_document_text_detection",
+                    DocumentLocation={"S3Object": {"Bucket": target_bucket, "Name": document_key}},
+                )
+                return response["JobId"]
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in _THROTTLING_ERRORS or attempt == self.max_start_retries:
+                    raise
+                logger.warning(f"Textract throttled starting job for {document_key}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_poll_interval)
+
+    def wait_for_job(self, job_id: str) -> "asyncio.Future[Dict[str, Any]]":
+        """
+        Registers `job_id` with the shared poller and returns a future that resolves
+        to the job's first result page once it has SUCCEEDED.
+        """
+        future = self._pending_jobs.get(job_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending_jobs[job_id] = future
+        if self._poller is None or self._poller.done():
+            self._wakeup = asyncio.Event()
+            self._poller = asyncio.create_task(self._poll_loop())
+        self._wakeup.set()
+        return future
+
+    async def _poll_job(self, job_id: str) -> bool:
+        """Checks one job. Returns True if the job reached a final state."""
+        future = self._pending_jobs[job_id]
+        try:
+            response = await self._call("get_document_text_detection", JobId=job_id)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in _THROTTLING_ERRORS:
+                return False
+            self._pending_jobs.pop(job_id, None)
+            if not future.done():
+                future.set_exception(e)
+            return True
+
+        status = response.get("JobStatus")
+        if status == "IN_PROGRESS":
+            return False
+        self._pending_jobs.pop(job_id, None)
+        if future.done():
+            return True
+        if status == "SUCCEEDED":
+            future.set_result(response)
+        else: # FAILED, PARTIAL_SUCCESS
+            future.set_exception(TextractJobError(
+                f"Textract job {job_id} finished with status {status}: {response.get('StatusMessage', '')}"
+            ))
+        return True
+
+    async def _poll_loop(self):
+        interval = self.min_poll_interval
+        while self._pending_jobs:
+            self._wakeup.clear()
+            job_ids = list(self._pending_jobs)
+            finished = await asyncio.gather(*(self._poll_job(job_id) for job_id in job_ids))
+            if any(finished):
+                interval = self.min_poll_interval
+            else:
+                interval = min(interval * self.poll_backoff, self.max_poll_interval)
+            if not self._pending_jobs:
+                break
+            try:
+                # A newly submitted job interrupts the sleep and resets the backoff
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+                interval = self.min_poll_interval
+            except asyncio.TimeoutError:
+                pass
+
+    async def get_blocks(self, job_id: str, first_page: Optional[Dict[str, Any]] = None) -> List[dict]:
+        """
+        Returns every block of a finished job, following NextToken. The request for
+        the next page is issued before the current page is processed.
+        """
+        page = first_page or await self._call("get_document_text_detection", JobId=job_id)
+        blocks: List[dict] = []
+        while True:
+            next_token = page.get("NextToken")
+            next_page = None
+            if next_token:
+                next_page = asyncio.ensure_future(
+                    self._call("get_document_text_detection", JobId=job_id, NextToken=next_token)
+                )
+            blocks.extend(page.get("Blocks", []))
+            if next_page is None:
+                return blocks
+            page = await next_page
+
+    async def extract_document(self, document_key: str, bucket_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Runs text detection on an S3 document and returns {"text": ..., "blocks": [...]},
+        the same shape as `aws_lib.textract.detect_document_text`.
+        """
+        job_id = await self.submit(document_key, bucket_name)
+        first_page = await self.wait_for_job(job_id)
+        blocks = await self.get_blocks(job_id, first_page)
+        text = "\n".join(block.get("Text", "") for block in blocks if block.get("BlockType") == "LINE")
+        return {"text": text, "blocks": blocks}
+
+    async def extract(self, document_key: str, bucket_name: Optional[str] = None) -> str:
+        """Runs text detection on an S3 document and returns the extracted text."""
+        return (await self.extract_document(document_key, bucket_name))["text"]
+
+    async def extract_many(self, document_keys: List[str], bucket_name: Optional[str] = None,
+                           return_exceptions: bool = True) -> List[Any]:
+        """Fans out `extract` over many documents; results are in input order."""
+        return await asyncio.gather(
+            *(self.extract(key, bucket_name) for key in document_keys),
+            return_exceptions=return_exceptions,
+        )
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB of cached OCR results
+_ENTRY_SUFFIX = ".json"
+
+
+def cache_key_for_s3_object(bucket_name: str, document_key: str, s3_client=None) -> str:
+    """
+    Builds a content-addressed cache key for a document stored in S3.
+
+    The key is derived from the object's ETag and size, so the same content
+    uploaded under a different key (or re-uploaded unchanged) maps to the same
+    cache entry, while an overwritten object gets a new one.
+
+    :param bucket_name: The name of the S3 bucket where the document is stored.
+    :param document_key: The key of the document in the S3 bucket.
+    :param s3_client: Optional boto3 S3 client. A default one is created if omitted.
+    :return: Cache key as a string.
+    """
+    if s3_client is None:
+        from aws_lib.s3 import get_s3_client
+        s3_client = get_s3_client()
+    head = s3_client.head_object(Bucket=bucket_name, Key=document_key)
+    etag = head.get("ETag", "").strip('"')
+    return f"etag-{etag}-{head.get('ContentLength', 0)}"
+
+
+def cache_key_for_bytes(document_bytes: bytes) -> str:
+    """
+    Builds a content-addressed cache key for an in-memory document.
+
+    :param document_bytes: Bytes of the document file, or any bytes-like view of it (e.g. an mmap).
+    :return: Cache key as a string.
+    """
+    return cache_key_for_sha256(hashlib.sha256(document_bytes).hexdigest())
+
+
+def cache_key_for_sha256(sha256_hexdigest: str) -> str:
+    """
+    Builds the cache key for a document whose SHA-256 is already known, e.g. because
+    it was computed while the upload was being streamed to disk. Matches
+    `cache_key_for_bytes` for the same content.
+
+    :param sha256_hexdigest: Hex SHA-256 digest of the document content.
+    :return: Cache key as a string.
+    """
+    return f"sha256-{sha256_hexdigest}"
+
+
+class OCRCache:
+    """
+    Persistent, size-bounded cache of OCR results on local disk.
+
+    Each entry is stored as one JSON file named after its cache key. Entries are
+    evicted in least-recently-used order once the total size on disk exceeds
+    `max_bytes`. Recency survives restarts because reads refresh the file's mtime.
+    The cache is safe to share between threads.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param cache_dir: Directory where cache entries are stored. Created if missing.
+        :param max_bytes: Upper bound for the total size of all entries, in bytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuilds the in-memory LRU index from the files already on disk."""
+        found = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(_ENTRY_SUFFIX):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, file_name))
+            found.append((stat.st_mtime, file_name[:-len(_ENTRY_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{_ENTRY_SUFFIX}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached OCR result for `key`, or None on a miss.
+        The result is a dictionary with at least a "text" entry.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path_for(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    payload = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable OCR cache entry {key}: {e}")
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: str, payload: Dict[str, Any]):
+        """
+        Stores an OCR result under `key`, evicting old entries if needed.
+        :param key: Cache key, see `cache_key_for_s3_object` / `cache_key_for_bytes`.
+        :param payload: JSON-serialisable OCR result, e.g. {"text": "..."}.
+        """
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            logger.warning(f"OCR result for {key} ({len(data)} bytes) exceeds the cache size limit; not cached.")
+            return
+        path = self._path_for(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)  # Atomic, readers never see a partial entry
+            self._total_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            while self._total_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path_for(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Removes every entry from the cache. Counters are kept."""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss/eviction counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_default_cache: Optional[OCRCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_ocr_cache() -> Optional[OCRCache]:
+    """
+    Returns the process-wide OCR cache configured through the environment, or
+    None if caching is disabled.
+
+    Set OCR_CACHE_DIR to enable it and OCR_CACHE_MAX_BYTES to bound its size.
+    """
+    global _default_cache
+    cache_dir = os.environ.get("OCR_CACHE_DIR")
+    if not cache_dir:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None or _default_cache.cache_dir != cache_dir:
+            max_bytes = int(os.environ.get("OCR_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+            _default_cache = OCRCache(cache_dir, max_bytes=max_bytes)
+        return _default_cache
@@ -0,0 +1,122 @@
+import asyncio
+import io
+import logging
+from typing import Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGES_PER_JOB = 25
+DEFAULT_MAX_PARALLEL_JOBS = 8
+
+
+class PagePart(NamedTuple):
+    """A page range of a PDF, written out as a PDF of its own."""
+    first_page: int # 1-based page number of the part's first page in the original document
+    page_count: int
+    content: bytes
+
+    @property
+    def last_page(self) -> int:
+        return self.first_page + self.page_count - 1
+
+
+def _pdf_reader(document):
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ImportError("Page-parallel OCR needs pypdf to split PDFs (pip install pypdf).") from e
+    return PdfReader(document if hasattr(document, "seek") else io.BytesIO(document))
+
+
+def is_pdf(document) -> bool:
+    return bytes(document[:5]) == b"%PDF-"
+
+
+def count_pdf_pages(document) -> int:
+    """Number of pages of a PDF given as bytes or a bytes-like view (e.g. an mmap)."""
+    return len(_pdf_reader(document).pages)
+
+
+def split_pdf(document, pages_per_part: int = DEFAULT_PAGES_PER_JOB) -> List[PagePart]:
+    """
+    Splits a PDF locally into consecutive parts of at most `pages_per_part` pages.
+    :return: The parts, in page order.
+    """
+    from pypdf import PdfWriter
+
+    reader = _pdf_reader(document)
+    parts = []
+    for start in range(0, len(reader.pages), pages_per_part):
+        writer = PdfWriter()
+        for page in reader.pages[start:start + pages_per_part]:
+            writer.add_page(page)
+        output = io.BytesIO()
+        writer.write(output)
+        parts.append(PagePart(start + 1, len(writer.pages), output.getvalue()))
+    return parts
+
+
+def merge_page_results(results: Iterable[Tuple[int, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Merges the OCR results of the parts of a document into one {"text", "blocks"} result,
+    as if the whole document had been OCR'd at once.
+    :param results: (first page of the part, {"text", "blocks"}) in page order. Block
+                    "Page" numbers are shifted from part-relative to document page numbers.
+    """
+    texts, blocks = [], []
+    for first_page, result in results:
+        if result.get("text"):
+            texts.append(result["text"])
+        for block in result.get("blocks", []):
+            block = dict(block)
+            block["Page"] = block.get("Page", 1) + first_page - 1
+            blocks.append(block)
+    return {"text": "\n".join(texts), "blocks": blocks}
+
+
+async def iter_page_ranges(client, parts: List[PagePart], bucket_name: str, key_prefix: str,
+                           s3_client, max_parallel_jobs: int = DEFAULT_MAX_PARALLEL_JOBS
+                           ) -> AsyncIterator[Tuple[PagePart, Dict[str, Any]]]:
+    """
+    OCRs the parts of a document as concurrent Textract jobs (at most `max_parallel_jobs`
+    in flight) and yields (part, {"text", "blocks"}) in page order, each as soon as it and
+    every part before it are done. Parts are uploaded under `key_prefix` and deleted
+    again once their job has finished.
+    :param client: An `aws_lib.async_textract.AsyncTextractClient`.
+    """
+    slots = asyncio.Semaphore(max_parallel_jobs) # FIFO, so the first pages are OCR'd first
+    loop = asyncio.get_running_loop()
+
+    async def run(part: PagePart) -> Dict[str, Any]:
+        key = f"{key_prefix}pages-{part.first_page:05d}-{part.last_page:05d}.pdf"
+        async with slots:
+            await loop.run_in_executor(None, lambda: s3_client.put_object(Bucket=bucket_name, Key=key, Body=part.content))
+            try:
+                return await client.extract_document(key, bucket_name)
+            finally:
+                try:
+                    await loop.run_in_executor(None, lambda: s3_client.delete_object(Bucket=bucket_name, Key=key))
+                except Exception as e:
+                    logger.warning(f"Could not delete page range s3://{bucket_name}/{key}: {e}")
+
+    tasks = [asyncio.ensure_future(run(part)) for part in parts]
+    try:
+        for part, task in zip(parts, tasks):
+            yield part, await task
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def extract_pdf_by_page_ranges(client, document, bucket_name: str, key_prefix: str, s3_client,
+                                     pages_per_job: int = DEFAULT_PAGES_PER_JOB,
+                                     max_parallel_jobs: int = DEFAULT_MAX_PARALLEL_JOBS) -> Dict[str, Any]:
+    """
+    Splits a PDF into page ranges, OCRs them concurrently (see `iter_page_ranges`) and
+    returns the merged {"text", "blocks"} of the whole document.
+    """
+    parts = split_pdf(document, pages_per_job)
+    results = [(part.first_page, result) async for part, result in
+               iter_page_ranges(client, parts, bucket_name, key_prefix, s3_client, max_parallel_jobs)]
+    return merge_page_results(results)
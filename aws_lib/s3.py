@@ -1,5 +1,11 @@
+import hashlib
+from typing import BinaryIO, Tuple
+
 import boto3
 
+MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024  # S3 requires parts of at least 5 MB (except the last one)
+
+
 def get_s3_client():
     """
     Initializes and returns a boto3 S3 client.
@@ -8,3 +14,45 @@ def get_s3_client():
     (e.g., through environment variables, shared credential file, or IAM roles).
     """
     return boto3.client("s3")
+
+
+def upload_fileobj_multipart(fileobj: BinaryIO, bucket_name: str, key: str,
+                             chunk_size: int = MULTIPART_CHUNK_SIZE, s3_client=None) -> Tuple[str, int]:
+    """
+    Streams a file-like object to S3 with a multipart upload, one `chunk_size` part
+    at a time, computing its SHA-256 on the fly. Only one part is held in memory.
+    The multipart upload is aborted if any part fails.
+
+    :param fileobj: Readable binary file-like object (e.g. `UploadFile.file`).
+    :param bucket_name: Destination bucket.
+    :param key: Destination object key.
+    :param chunk_size: Part size in bytes (minimum 5 MB for all parts but the last).
+    :param s3_client: Optional boto3 S3 client. A default one is created if omitted.
+    :return: (SHA-256 hex digest, size in bytes) of the uploaded content.
+    """
+    s3_client = s3_client or get_s3_client()
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket_name, Key=key)["UploadId"]
+    digest = hashlib.sha256()
+    size = 0
+    parts = []
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk and parts:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+            part_number = len(parts) + 1
+            response = s3_client.upload_part(
+                Bucket=bucket_name, Key=key, UploadId=upload_id, PartNumber=part_number, Body=chunk
+            )
+            parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+            if not chunk:  # Empty source: a single empty part completes the upload
+                break
+        s3_client.complete_multipart_upload(
+            Bucket=bucket_name, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+    except BaseException:
+        s3_client.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+        raise
+    return digest.hexdigest(), size
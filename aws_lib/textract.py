@@ -1,15 +1,63 @@
 from textractor import Textractor
 from textractor.data.constants import TextractFeatures
+from typing import Any, Dict, Optional
+import asyncio
+import logging
 
-def extract_text_from_document(bucket_name: str, document_key: str, region_name: str = "us-east-1"):
+import boto3
+
+from aws_lib.async_textract import AsyncTextractClient
+from aws_lib.ocr_cache import OCRCache, cache_key_for_s3_object, get_default_ocr_cache
+from aws_lib.page_parallel import (
+    DEFAULT_MAX_PARALLEL_JOBS, DEFAULT_PAGES_PER_JOB, count_pdf_pages, extract_pdf_by_page_ranges, is_pdf,
+)
+
+logger = logging.getLogger(__name__)
+
+_PDF_HEADER_BYTES = 1024 # Ranged read used to recognize PDFs (they start with "%PDF-")
+
+def detect_document_text(bucket_name: str, document_key: str, region_name: str = "us-east-1",
+                         cache: Optional[OCRCache] = None, page_parallel_threshold: Optional[int] = None,
+                         pages_per_job: int = DEFAULT_PAGES_PER_JOB,
+                         max_parallel_jobs: int = DEFAULT_MAX_PARALLEL_JOBS) -> Dict[str, Any]:
     """
-    Extracts text from a document stored in S3 using Amazon Textract.
+    Runs Amazon Textract text detection on a document stored in S3 and returns
+    both the linearized text and the raw Textract blocks.
+
+    If an OCR cache is available (passed explicitly or configured through
+    OCR_CACHE_DIR), results are looked up by the S3 object's ETag first and
+    Textract is only called on a miss.
 
     :param bucket_name: The name of the S3 bucket where the document is stored.
     :param document_key: The key of the document in the S3 bucket.
     :param region_name: The AWS region where Textract service is available.
-    :return: Extracted text as a string.
+    :param cache: Optional OCR cache. Defaults to the process-wide cache, if any.
+    :param page_parallel_threshold: If set, PDFs with at least this many pages are split
+                                    locally into ranges of `pages_per_job` pages, OCR'd as up
+                                    to `max_parallel_jobs` concurrent jobs and merged in page
+                                    order (see `aws_lib.page_parallel`). Requires pypdf.
+    :return: Dictionary with "text" (str) and "blocks" (list of Textract block dicts).
     """
+    if cache is None:
+        cache = get_default_ocr_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = cache_key_for_s3_object(bucket_name, document_key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return {"text": cached["text"], "blocks": cached.get("blocks", [])}
+
+    result = None
+    if page_parallel_threshold:
+        result = _detect_by_page_ranges(bucket_name, document_key, region_name, page_parallel_threshold,
+                                        pages_per_job, max_parallel_jobs)
+    if result is None:
+        result = _detect_whole_document(bucket_name, document_key, region_name)
+    if cache is not None:
+        cache.put(cache_key, result)
+    return result
+
+def _detect_whole_document(bucket_name: str, document_key: str, region_name: str) -> Dict[str, Any]:
     extractor = Textractor(region_name=region_name)
     # Note: The Textractor library uses the default AWS session configured for boto3.
     # It will automatically use the credentials and region from the environment
@@ -21,4 +69,56 @@ def extract_text_from_document(bucket_name: str, document_key: str, region_name:
         save_image=False
     )
 
-    return response.text
+    raw_response = getattr(response, "response", None) # Raw Textract JSON kept by textractor
+    return {
+        "text": response.text,
+        "blocks": raw_response.get("Blocks", []) if isinstance(raw_response, dict) else [],
+    }
+
+def _detect_by_page_ranges(bucket_name: str, document_key: str, region_name: str, threshold: int,
+                           pages_per_job: int, max_parallel_jobs: int) -> Optional[Dict[str, Any]]:
+    """Page-parallel OCR of a large PDF, or None if the document is not one (or cannot be split)."""
+    s3_client = boto3.client("s3", region_name=region_name)
+    # The first bytes tell whether it is a PDF: images and other documents are not downloaded
+    head = s3_client.get_object(Bucket=bucket_name, Key=document_key, Range=f"bytes=0-{_PDF_HEADER_BYTES - 1}")
+    if not is_pdf(head["Body"].read()):
+        return None
+    try:
+        import pypdf # noqa: F401 (checked before downloading a document that could not be split anyway)
+    except ImportError:
+        logger.warning(f"Page-parallel OCR needs pypdf to split PDFs (pip install pypdf). "
+                       f"OCR'ing s3://{bucket_name}/{document_key} as a single job.")
+        return None
+    document = s3_client.get_object(Bucket=bucket_name, Key=document_key)["Body"].read()
+    try:
+        if count_pdf_pages(document) < threshold:
+            return None
+    except Exception as e: # Malformed PDFs are still sent to Textract as they are
+        logger.warning(f"Could not read the pages of s3://{bucket_name}/{document_key} ({e}); OCR'ing it as a single job.")
+        return None
+
+    async def run():
+        async with AsyncTextractClient(region_name=region_name, s3_bucket_name=bucket_name,
+                                       max_concurrent_requests=max(32, 2 * max_parallel_jobs)) as client:
+            return await extract_pdf_by_page_ranges(
+                client, document, bucket_name, f"textract-input/{document_key}/", s3_client,
+                pages_per_job=pages_per_job, max_parallel_jobs=max_parallel_jobs,
+            )
+
+    return asyncio.run(run())
+
+def extract_text_from_document(bucket_name: str, document_key: str, region_name: str = "us-east-1",
+                               cache: Optional[OCRCache] = None, page_parallel_threshold: Optional[int] = None):
+    """
+    Extracts text from a document stored in S3 using Amazon Textract.
+
+    :param bucket_name: The name of the S3 bucket where the document is stored.
+    :param document_key: The key of the document in the S3 bucket.
+    :param region_name: The AWS region where Textract service is available.
+    :param cache: Optional OCR cache, see `detect_document_text`.
+    :param page_parallel_threshold: Page-parallel OCR for PDFs with at least this many pages,
+                                    see `detect_document_text`.
+    :return: Extracted text as a string.
+    """
+    return detect_document_text(bucket_name, document_key, region_name, cache=cache,
+                                page_parallel_threshold=page_parallel_threshold)["text"]
@@ -1,14 +1,23 @@
 # Endpoints FastAPI
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Body
-from typing import Optional, List
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Body, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from typing import Any, Dict, Optional, List
+from document_processor.config import UPLOAD_DIR, UPLOAD_S3_BUCKET, UPLOAD_S3_PREFIX, UPLOAD_CHUNK_SIZE
+from document_processor.utils.file_utils import stream_to_file
+from document_processor.db.database import initialize_database, close_db_connections
+from document_processor.db.job_queue import enqueue_job, get_job
+from document_processor.db.query import get_document_details_by_id, find_documents_page
+from document_processor.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY
+from document_processor.worker_pool import QueueWorkerPool
+import logging
+import os
+import uuid
 # from models import ProcessedDocument, APIStatusResponse, CertificadoFinalData # Pydantic models
 # from pipeline import DocumentProcessingPipeline
 # from rag import DocumentRAGSystem
 # from db.query import get_document_details_from_db # Example query
-# import shutil
-# import os
-# import uuid
 
 # # --- Temporary Placeholder Models (until models.py is fully integrated) ---
 from pydantic import BaseModel, Field
@@ -22,10 +31,16 @@ class APIStatusResponse(BaseModel):
 class ProcessedDocument(BaseModel): # Simplified for placeholder
     document_id: str
     file_name: str
-    status: str
+    status: str # Live pipeline stage while queued/running, final processing_status once done
+    queue_status: Optional[str] = None # queued, running, done, failed
+    error_message: Optional[str] = None
     extracted_fields: Optional[dict] = None
     validation_summary: Optional[dict] = None
 
+class DocumentPage(BaseModel):
+    documents: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None # Pass back as `cursor` to get the next page
+
 class RAGQueryRequest(BaseModel):
     question: str
 
@@ -35,8 +50,9 @@ class RAGQueryResponse(BaseModel):
 # # --- End Temporary Placeholder Models ---
 
 
-# UPLOAD_DIR = "uploaded_documents" # Temp storage for uploaded files
-# os.makedirs(UPLOAD_DIR, exist_ok=True)
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = [".pdf", ".png", ".jpg", ".jpeg", ".tiff", ".tif"]
 
 app = FastAPI(
     title="Document Processor API",
@@ -51,6 +67,9 @@ class MockRAGSystem:
         return f"Mock answer to: {question}"
 rag_system = MockRAGSystem()
 
+# Background workers that consume the processing queue (see worker_pool.py)
+worker_pool = QueueWorkerPool()
+
 
 @app.on_event("startup")
 async def startup_event():
@@ -58,51 +77,64 @@ async def startup_event():
     # global rag_system
     # rag_system = DocumentRAGSystem()
     print("FastAPI application startup: Initializing resources (mock).")
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    await run_in_threadpool(initialize_database)
+    worker_pool.start() # Also resumes jobs queued before a restart
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await run_in_threadpool(worker_pool.stop)
+    close_db_connections()
+
+
+def _store_upload(upload_file: UploadFile, document_id: str, file_extension: str):
+    """
+    Streams an upload to its final location in UPLOAD_CHUNK_SIZE chunks, hashing it on
+    the way. Returns (document_path, sha256); the document is never held whole in memory.
+    """
+    file_name = f"{document_id}{file_extension}"
+    if UPLOAD_S3_BUCKET:
+        from aws_lib.s3 import upload_fileobj_multipart # boto3 is only imported when uploads go to S3
+        key = f"{UPLOAD_S3_PREFIX}{file_name}"
+        sha256, _ = upload_fileobj_multipart(upload_file.file, UPLOAD_S3_BUCKET, key, chunk_size=UPLOAD_CHUNK_SIZE)
+        return f"s3://{UPLOAD_S3_BUCKET}/{key}", sha256
+    stored = stream_to_file(upload_file.file, os.path.join(UPLOAD_DIR, file_name), chunk_size=UPLOAD_CHUNK_SIZE)
+    return stored.path, stored.sha256
 
 @app.post("/upload_document/", response_model=APIStatusResponse, status_code=202)
-async def upload_and_process_document(file: UploadFile = File(...)):
+async def upload_and_process_document(file: UploadFile = File(...), document_type: Optional[str] = Form(None)):
     """
-    Accepts a document (PDF or image), saves it, and initiates asynchronous processing.
+    Accepts a document (PDF or image), saves it, and queues it for background processing.
+    Returns as soon as the job is queued; poll /document_status/{document_id} for progress.
+    :param document_type: Optional expected type (e.g. "factura"), used as the queue priority lane.
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file name provided.")
 
-    # file_extension = os.path.splitext(file.filename)[1].lower()
-    # supported_extensions = [".pdf", ".png", ".jpg", ".jpeg", ".tiff", ".tif"]
-    # if file_extension not in supported_extensions:
-    #     raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_extension}")
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    if file_extension not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_extension}")
 
-    # temp_file_id = str(uuid.uuid4())
-    # temp_file_path = os.path.join(UPLOAD_DIR, f"{temp_file_id}{file_extension}")
+    document_id = str(uuid.uuid4())
 
     try:
-        # with open(temp_file_path, "wb") as buffer:
-        #     shutil.copyfileobj(file.file, buffer)
-        # print(f"File '{file.filename}' uploaded to '{temp_file_path}'")
-
-        # # Initiate asynchronous processing (e.g., using Celery or FastAPI's background tasks)
-        # # For now, simulate direct call to pipeline for simplicity in this placeholder
-        # pipeline = DocumentProcessingPipeline(
-        #     document_path=temp_file_path,
-        #     file_name=file.filename,
-        #     file_type=file_extension
-        # )
-        # # In a real async setup, you'd do: background_tasks.add_task(pipeline.run)
-        # # result = pipeline.run() # Synchronous for now for placeholder
-
-        # This is a placeholder response.
-        # In a real system, the pipeline.run() would be called, potentially asynchronously.
-        # The document_id would come from the pipeline.
-        mock_document_id = "mock_doc_" + str(file.filename)
-        print(f"Simulating processing for file: {file.filename}")
+        file_path, sha256 = await run_in_threadpool(_store_upload, file, document_id, file_extension)
+        queued = await run_in_threadpool(
+            enqueue_job, document_id, file_path, file.filename, file_extension, document_type, sha256
+        )
+        if not queued:
+            raise RuntimeError("Document could not be queued.")
+        worker_pool.notify()
+        logger.info(f"File '{file.filename}' saved to '{file_path}' and queued as {document_id}")
 
         return APIStatusResponse(
-            status="processing_initiated",
-            message=f"Document '{file.filename}' received and processing started.",
-            document_id=mock_document_id # This ID would be used to check status
+            status="queued",
+            message=f"Document '{file.filename}' received and queued for processing.",
+            document_id=document_id # Used to check status
         )
     except Exception as e:
-        # logger.error(f"Error uploading file {file.filename}: {e}", exc_info=True)
+        logger.error(f"Error uploading file {file.filename}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Could not process file: {str(e)}")
     finally:
         await file.close()
@@ -111,23 +143,47 @@ async def upload_and_process_document(file: UploadFile = File(...)):
 @app.get("/document_status/{document_id}", response_model=ProcessedDocument)
 async def get_document_status(document_id: str):
     """
-    Retrieves the status and results of a processed document.
+    Retrieves the live status of a queued document, and its results once processed.
     """
-    # In a real system, this would query the database (db.query.py)
-    # processed_doc_data = get_document_details_from_db(document_id) # Example
-    print(f"Fetching status for document_id: {document_id}")
+    job = await run_in_threadpool(get_job, document_id)
+    details = await run_in_threadpool(get_document_details_by_id, document_id)
+    if job is None and details is None:
+        raise HTTPException(status_code=404, detail=f"Document with ID '{document_id}' not found.")
 
-    # Placeholder response
-    # if document_id == "mock_doc_example.pdf": # Simulate found document
-    return ProcessedDocument(
+    response = ProcessedDocument(
         document_id=document_id,
-        file_name=f"{document_id.replace('mock_doc_', '')}", # Simulate filename
-        status="completed_placeholder",
-        extracted_fields={"field1": "value1", "field2": "value2"},
-        validation_summary={"is_valid": True, "checks_passed": 2}
+        file_name=job["file_name"] if job else details["metadata"]["file_name"],
+        status=(job["stage"] or job["status"]) if job else details["metadata"]["processing_status"],
+        queue_status=job["status"] if job else None,
+        error_message=job["error_message"] if job else None,
     )
-    # else:
-    #     raise HTTPException(status_code=404, detail=f"Document with ID '{document_id}' not found.")
+    if details:
+        response.error_message = response.error_message or details["metadata"]["error_message"]
+        if details["extracted_data"]:
+            response.extracted_fields = details["extracted_data"]["fields"]
+        if details["validation_result"]:
+            response.validation_summary = details["validation_result"]
+    return response
+
+
+@app.get("/documents/", response_model=DocumentPage)
+async def list_documents(status: Optional[str] = None, document_type: Optional[str] = None,
+                         limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None,
+                         include_details: bool = False):
+    """
+    Lists processed documents, newest first, one page at a time (keyset pagination).
+    """
+    try:
+        page = await run_in_threadpool(find_documents_page, status, document_type, limit, cursor, include_details)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return DocumentPage(**page)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Pipeline stage and field-rule timings (wall and CPU) in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 
 @app.post("/query_documents/", response_model=RAGQueryResponse)
@@ -142,7 +198,7 @@ async def query_documents_with_rag(query: RAGQueryRequest = Body(...)):
         answer = rag_system.query(query.question)
         return RAGQueryResponse(question=query.question, answer=answer)
     except Exception as e:
-        # logger.error(f"Error during RAG query '{query.question}': {e}", exc_info=True)
+        logger.error(f"Error during RAG query '{query.question}': {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing your query: {str(e)}")
 
 # Example of a specific document type endpoint (if needed, though generic is better)
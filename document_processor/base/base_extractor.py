@@ -1,15 +1,62 @@
 from abc import ABC, abstractmethod
+from typing import Optional, Union
 from aws_lib.textract import extract_text_from_document
+from document_processor.context import DocumentContext
+from document_processor.utils.version_utils import class_fingerprint
 
 class BaseExtractor(ABC):
-    def __init__(self, bucket_name: str, document_key: str):
+    # Bump to mark a change in extraction output that is not in the extractor's module
+    # (e.g. in a shared helper), so stored documents are re-extracted
+    version = "1"
+
+    def __init__(self, text: Union[str, DocumentContext, None] = None, *, bucket_name: Optional[str] = None,
+                 document_key: Optional[str] = None, context: Optional[DocumentContext] = None):
+        """
+        Extractors are built from text that has already been OCR'd, from a shared
+        `DocumentContext`, or from an S3 location that is OCR'd on first use:
+
+            FacturaExtractor(text)
+            FacturaExtractor(context=context)
+            FacturaExtractor(bucket_name="bucket", document_key="key.pdf")
+
+        Instances built from text or from a loaded context make no AWS calls and can be
+        pickled, e.g. to run `extract` in a `ProcessPoolExecutor`.
+        :param text: OCR text of the document, or its `DocumentContext`.
+        :param bucket_name: S3 bucket of the document (used when no text or context is given).
+        :param document_key: S3 key of the document (used when no text or context is given).
+        :param context: Shared per-document context. When given, its OCR output is
+                        reused instead of running Textract again.
+        """
+        if text is not None and context is not None:
+            raise ValueError("Pass either the document text or its context, not both.")
+        if isinstance(text, DocumentContext):
+            text, context = None, text
         self.bucket_name = bucket_name
         self.document_key = document_key
-        self.text = self._load_text_from_s3()
+        if context is not None:
+            self.context = context
+        elif text is not None:
+            self.context = DocumentContext.from_text(text)
+        elif bucket_name and document_key:
+            # OCR is deferred until the text is first needed
+            self.context = DocumentContext(loader=self._load_text_from_s3)
+        else:
+            raise ValueError("An extractor needs the document text, a context or an S3 bucket and key.")
+
+    @property
+    def text(self) -> str:
+        return self.context.text
+
+    @classmethod
+    def version_fingerprint(cls) -> str:
+        """Identifies this extractor's logic; stored with the fields it extracts (see utils/version_utils.py)."""
+        return class_fingerprint(cls)
 
     def _load_text_from_s3(self) -> str:
         """
         Loads text from an S3 document using AWS Textract.
+        If OCR_CACHE_DIR is set, previously OCR'd content is served from the
+        local OCR cache instead (see `aws_lib.ocr_cache`).
         """
         # Assuming region_name is configured elsewhere or using a default
         # For now, let's hardcode it or consider making it configurable
@@ -1,8 +1,32 @@
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional
+import time
+
+from document_processor.context import DocumentContext
+from document_processor.utils.version_utils import class_fingerprint
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# NumPy (vector_utils) is only imported by the batch path, so that loading validators
+# (e.g. at API startup, through processor_factory) does not load it.
 
 class BaseValidator(ABC):
-    def __init__(self, data: dict):
+    # Fields read by `validate`, with the default its `data.get(...)` calls use for a
+    # missing field. They are the columns `validate_batch` expects.
+    batch_fields: Dict[str, Any] = {}
+    # Bump to mark a change in validation results that is not in the validator's module
+    # (e.g. in a shared helper), so stored documents are re-validated
+    version = "1"
+
+    def __init__(self, data: dict, context: Optional[DocumentContext] = None):
+        """
+        :param data: Fields returned by the matching extractor.
+        :param context: Optional shared per-document context, for rules that need
+                        to look back at the OCR text without re-running OCR.
+        """
         self.data = data
+        self.context = context
 
     @abstractmethod
     def validate(self) -> dict:
@@ -11,3 +35,64 @@ class BaseValidator(ABC):
         Should be implemented by subclasses for specific document types.
         """
         pass
+
+    @classmethod
+    def version_fingerprint(cls) -> str:
+        """Identifies this validator's logic; stored with its results (see utils/version_utils.py)."""
+        return class_fingerprint(cls)
+
+    @classmethod
+    def columns_from_records(cls, records: Iterable[Mapping[str, Any]]) -> Dict[str, "np.ndarray"]:
+        """Columnar input for `validate_batch` from extracted-data dicts (e.g. decoded data_json)."""
+        from document_processor.utils.vector_utils import columns_from_records
+        return columns_from_records(records, cls.batch_fields)
+
+    @classmethod
+    def validate_batch(cls, columns: Any) -> Dict[str, "np.ndarray"]:
+        """
+        Validates many records at once.
+        :param columns: Dict of 1-D arrays (or a pandas DataFrame) with one column per
+                        `batch_fields` entry; missing values are None.
+        :return: One array per result key of `validate`, with element i equal to
+                 `validate()[key]` for record i.
+        This default runs `validate` record by record; validators override it with
+        vectorized rules.
+        """
+        import numpy as np
+        from document_processor.utils.vector_utils import object_column
+        names = list(cls.batch_fields)
+        arrays = [np.asarray(columns[name], dtype=object) for name in names]
+        results = [cls(dict(zip(names, values))).validate() for values in zip(*arrays)]
+        keys = list(results[0]) if results else []
+        return {key: object_column((result[key] for result in results), len(results)) for key in keys}
+
+
+def compare_batch_with_scalar(validator_class, records: List[Mapping[str, Any]], runs: int = 3) -> Dict[str, float]:
+    """
+    Benchmarks `validate_batch` against one `validate` call per record over `records`,
+    after checking that both give the same result for every record.
+    :return: Seconds per run of each path and the speedup.
+    """
+    columns = validator_class.columns_from_records(records)
+    batch = validator_class.validate_batch(columns)
+    for index, record in enumerate(records):
+        expected = validator_class(record).validate()
+        actual = {key: batch[key][index] for key in expected}
+        if actual != expected:
+            raise AssertionError(f"Batch and scalar validation disagree on record {index}: {actual} != {expected}")
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        for record in records:
+            validator_class(record).validate()
+    scalar = (time.perf_counter() - start) / runs
+    start = time.perf_counter()
+    for _ in range(runs):
+        validator_class.validate_batch(validator_class.columns_from_records(records))
+    batch_with_columns = (time.perf_counter() - start) / runs
+    start = time.perf_counter()
+    for _ in range(runs):
+        validator_class.validate_batch(columns)
+    batch_only = (time.perf_counter() - start) / runs
+    return {"scalar": scalar, "batch": batch_only, "batch_with_columns": batch_with_columns,
+            "speedup": scalar / batch_only, "speedup_with_columns": scalar / batch_with_columns}
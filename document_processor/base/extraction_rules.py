@@ -0,0 +1,172 @@
+# Reglas declarativas de extracción de campos
+
+# Extractors declare their fields as a module-level `ExtractionRuleSet`, which is compiled
+# once at import time and evaluates all fields of a document together:
+#
+# - case-insensitive `RegexField` patterns written in lowercase run, without IGNORECASE,
+#   over the document's shared lowercased text (`DocumentContext.text_lower`); values are
+#   sliced from the original text by span. Case-insensitive matching is what dominated
+#   extractor CPU, and this is several times faster than the same search with IGNORECASE;
+# - every `KeywordField` keyword goes into one `KeywordScanner` pass over the lowercased text.
+#
+# Each pattern is a single precompiled search that stops at its first match, so a new
+# field costs one more search over text that is already lowercased. (Merging all patterns
+# into one alternation was measured slower: sre cannot skip ahead on a mixed alternation.)
+#
+# With METRICS_FIELD_TIMING, the wall and CPU time of each regex field (and of the shared
+# keyword scan) is recorded per rule set in metrics.FIELD_RULE_SECONDS.
+
+import re
+from time import perf_counter, thread_time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from document_processor.context import DocumentContext
+from document_processor.metrics import field_timing_enabled, record_field_rules
+from document_processor.utils.text_utils import KeywordScanner
+
+_ESCAPE_RE = re.compile(r"\\.", re.DOTALL)
+KEYWORD_SCAN_FIELD = "<keywords>" # Field label of the shared keyword scan in the timing metrics
+
+
+class RegexField(NamedTuple):
+    """
+    Field extracted with regular expressions.
+    - patterns: tried in priority order; a match of an earlier pattern anywhere in the text
+      wins over a later pattern. Each pattern captures the value in group `group`.
+    - flags: regular `re` flags. With re.IGNORECASE, write the pattern in lowercase so it
+      can run over the shared lowercased text (escapes such as \\D or \\Z are fine).
+    - transform: applied to the captured string (e.g. parse a number).
+    - default: value when no pattern matches.
+    """
+    name: str
+    patterns: Tuple[str, ...]
+    flags: int = 0
+    group: int = 1
+    transform: Optional[Callable[[str], Any]] = None
+    default: Any = None
+
+
+class KeywordField(NamedTuple):
+    """
+    Boolean field: True when every `all_of` keyword and at least one `any_of` keyword
+    (if any are given) occur in the lowercased text.
+    """
+    name: str
+    all_of: Tuple[str, ...] = ()
+    any_of: Tuple[str, ...] = ()
+
+
+class ConstantField(NamedTuple):
+    """Field with a fixed value (e.g. placeholders for fields not extracted yet)."""
+    name: str
+    value: Any
+
+
+FieldRule = Union[RegexField, KeywordField, ConstantField]
+
+
+class _CompiledPattern(NamedTuple):
+    exact: re.Pattern # Pattern with the field's flags, for the original text
+    lowered: Optional[re.Pattern] # Same pattern without IGNORECASE, for the lowercased text
+
+
+def _is_lowercase_pattern(pattern: str) -> bool:
+    """True if the pattern has no uppercase letters outside escape sequences (e.g. \\D, \\Z)."""
+    unescaped = _ESCAPE_RE.sub("", pattern)
+    return unescaped == unescaped.lower()
+
+
+class ExtractionRuleSet:
+    """
+    A compiled set of field rules. `extract` returns a dict with one entry per field,
+    in declaration order.
+    """
+
+    def __init__(self, fields: Sequence[FieldRule], name: str = "rules"):
+        """
+        :param name: Label of the rule set in the field-rule timing metrics (e.g. the document type).
+        """
+        self.name = name
+        self.fields = list(fields)
+        names = [field.name for field in self.fields]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate field names in extraction rules: {names}")
+
+        self._patterns: Dict[int, List[_CompiledPattern]] = {} # Field index -> patterns by priority
+        for field_index, field in enumerate(self.fields):
+            if isinstance(field, RegexField):
+                self._patterns[field_index] = [self._compile(field, pattern) for pattern in field.patterns]
+
+        keywords = set()
+        for field in self.fields:
+            if isinstance(field, KeywordField):
+                keywords.update(k.lower() for k in field.all_of + field.any_of)
+        self._scanner = KeywordScanner(keywords) if keywords else None
+
+    @staticmethod
+    def _compile(field: RegexField, pattern: str) -> _CompiledPattern:
+        exact = re.compile(pattern, field.flags)
+        if exact.groupindex:
+            raise ValueError(f"Field '{field.name}': named groups are not supported in rule patterns.")
+        if not 0 <= field.group <= exact.groups:
+            raise ValueError(f"Field '{field.name}': pattern {pattern!r} has no group {field.group}.")
+        lowered = None
+        if field.flags & re.IGNORECASE and _is_lowercase_pattern(pattern):
+            lowered = re.compile(pattern, field.flags & ~re.IGNORECASE)
+        return _CompiledPattern(exact, lowered)
+
+    def extract(self, source: Union[str, DocumentContext]) -> Dict[str, Any]:
+        """
+        Extracts every field from a document's text (or its shared `DocumentContext`).
+        """
+        context = source if isinstance(source, DocumentContext) else DocumentContext.from_text(source)
+        text = context.text or ""
+        # Lowercasing can change the length of a few characters (e.g. "İ"); spans are only
+        # interchangeable between both texts when it does not.
+        text_lower = context.text_lower if len(context.text_lower) == len(text) else None
+        # Field timings are chained (each field's end is the next one's start) and recorded
+        # under one lock per document, which keeps the overhead to a few microseconds.
+        timings = [] if field_timing_enabled() else None
+        if timings is not None:
+            marks = (perf_counter(), thread_time())
+        found_keywords = self._scanner.find(context.text_lower) if self._scanner is not None else set()
+        if timings is not None and self._scanner is not None: # One pass serves every KeywordField
+            marks = self._lap(timings, KEYWORD_SCAN_FIELD, marks)
+
+        result: Dict[str, Any] = {}
+        for field_index, field in enumerate(self.fields):
+            if isinstance(field, ConstantField):
+                result[field.name] = field.value
+            elif isinstance(field, KeywordField):
+                has_all = all(k.lower() in found_keywords for k in field.all_of)
+                has_any = any(k.lower() in found_keywords for k in field.any_of) if field.any_of else True
+                result[field.name] = bool(field.all_of or field.any_of) and has_all and has_any
+            else:
+                if timings is not None and field_index and not isinstance(self.fields[field_index - 1], RegexField):
+                    marks = (perf_counter(), thread_time()) # Leave out the fields in between
+                result[field.name] = self._regex_value(field, self._patterns[field_index], text, text_lower)
+                if timings is not None:
+                    marks = self._lap(timings, field.name, marks)
+        if timings:
+            record_field_rules(self.name, timings)
+        return result
+
+    @staticmethod
+    def _lap(timings: List[Tuple[str, float, float]], field_name: str, marks: Tuple[float, float]) -> Tuple[float, float]:
+        now = (perf_counter(), thread_time())
+        timings.append((field_name, now[0] - marks[0], now[1] - marks[1]))
+        return now
+
+    @staticmethod
+    def _regex_value(field: RegexField, patterns: List[_CompiledPattern], text: str, text_lower: Optional[str]) -> Any:
+        for compiled in patterns:
+            if compiled.lowered is not None and text_lower is not None:
+                match = compiled.lowered.search(text_lower)
+                start, end = match.span(field.group) if match else (-1, -1)
+                value = text[start:end] if start >= 0 else None # -1: optional group did not participate
+            else:
+                match = compiled.exact.search(text)
+                value = match.group(field.group) if match else None
+            if match:
+                return field.transform(value) if field.transform and value is not None else value
+        return field.default
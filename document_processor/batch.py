@@ -0,0 +1,172 @@
+# Procesamiento concurrente por lotes
+
+# `BatchPipelineRunner` runs `DocumentProcessingPipeline` over many documents at once.
+# The two halves of the pipeline have very different costs:
+#
+# - OCR is I/O bound (waiting on Textract), so it runs on a bounded thread pool.
+# - Classification, extraction and validation are CPU bound, so they run on a
+#   process pool, fed with the OCR text of each document.
+#
+# Results are yielded as soon as each document finishes, in completion order.
+
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+import logging
+import os
+import uuid
+
+from document_processor.context import DocumentContext
+from document_processor.metrics import StageTiming, stage_timer
+from document_processor.models import ProcessedDocument, ProcessingEvent
+from document_processor.pipeline import DocumentProcessingPipeline
+from document_processor.utils.file_utils import get_file_extension, get_file_name
+from document_processor.utils.textract_utils import TextractClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OCR_WORKERS = 16
+
+
+class _OCRResult:
+    """OCR output of one document, on its way to the CPU stage."""
+    def __init__(self, document_id: str, document_path: str, text: Optional[str], error: Optional[str] = None,
+                 blocks: Optional[List[dict]] = None, timing: Optional[StageTiming] = None):
+        self.document_id = document_id
+        self.document_path = document_path
+        self.text = text
+        self.error = error
+        self.blocks = blocks
+        self.timing = timing
+
+
+class _InlineExecutor(Executor):
+    """Runs submitted work immediately in the calling thread (cpu_workers=0)."""
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def _run_cpu_stages(document_id: str, document_path: str, text: Optional[str], ocr_error: Optional[str]) -> ProcessedDocument:
+    """
+    Classification, extraction and validation for one already-OCR'd document.
+    Module-level so it can be shipped to worker processes.
+    """
+    pipeline = DocumentProcessingPipeline(
+        document_path=document_path,
+        file_name=get_file_name(document_path),
+        file_type=get_file_extension(document_path),
+        context=DocumentContext.from_text(text),
+        document_id=document_id,
+    )
+    try:
+        result = pipeline.run()
+    except Exception as e:
+        logger.error(f"Unexpected pipeline error for {document_path}: {e}", exc_info=True)
+        pipeline.metadata.processing_status = "error_pipeline"
+        pipeline.metadata.error_message = f"Pipeline failed: {str(e)}"
+        return pipeline._build_processed_document()
+    if ocr_error and result.metadata.processing_status == "error_ocr":
+        result.metadata.error_message = f"OCR failed: {ocr_error}"
+    return result
+
+
+def _attach_ocr_timing(result: ProcessedDocument, timing: StageTiming):
+    """
+    The pipeline of the CPU stage only reads text that `_ocr` already extracted, so its
+    "ocr" event is replaced with the timing of the actual OCR call, which also becomes
+    part of "total".
+    """
+    ocr = ProcessingEvent(stage="ocr", started=datetime.fromtimestamp(timing.started),
+                          wall_seconds=timing.wall_seconds, cpu_seconds=timing.cpu_seconds)
+    events = [event for event in result.processing_events if event.stage != "ocr"]
+    for event in events:
+        if event.stage == "total":
+            event.started = ocr.started
+            event.wall_seconds += ocr.wall_seconds
+            event.cpu_seconds += ocr.cpu_seconds
+    result.processing_events = [ocr] + events
+
+
+class BatchPipelineRunner:
+    def __init__(self, ocr_workers: int = DEFAULT_OCR_WORKERS, cpu_workers: Optional[int] = None,
+                 max_in_flight: Optional[int] = None, textract_client: Optional[TextractClient] = None):
+        """
+        :param ocr_workers: Number of documents OCR'd concurrently.
+        :param cpu_workers: Processes for classification/extraction/validation.
+                            Defaults to the number of CPUs; 0 runs them in the caller's thread.
+        :param max_in_flight: Upper bound on documents submitted but not yet yielded,
+                              which bounds memory use. Defaults to twice `ocr_workers`.
+        :param textract_client: Client used for OCR. A default one is created if omitted.
+        """
+        self.ocr_workers = ocr_workers
+        self.cpu_workers = (os.cpu_count() or 1) if cpu_workers is None else cpu_workers
+        self.max_in_flight = max_in_flight or 2 * ocr_workers
+        self.textract_client = textract_client or TextractClient()
+
+    def _ocr(self, document_path: str) -> _OCRResult:
+        document_id = str(uuid.uuid4())
+        timings: List[StageTiming] = []
+        try:
+            context = DocumentContext.from_document_path(document_path, self.textract_client)
+            with stage_timer("ocr", timings):
+                text = context.text
+            return _OCRResult(document_id, document_path, text, blocks=context.blocks or None, timing=timings[0])
+        except Exception as e:
+            logger.error(f"OCR failed for {document_path}: {e}", exc_info=True)
+            return _OCRResult(document_id, document_path, None, error=str(e), timing=timings[0] if timings else None)
+
+    def _cpu_executor(self) -> Executor:
+        if self.cpu_workers == 0:
+            return _InlineExecutor()
+        return ProcessPoolExecutor(max_workers=self.cpu_workers)
+
+    def run(self, document_paths: Iterable[str]) -> Iterator[ProcessedDocument]:
+        """
+        Processes every document in `document_paths` (local paths or s3:// URIs)
+        and yields one `ProcessedDocument` per input as soon as it is done.
+        """
+        paths = iter(document_paths)
+        with ThreadPoolExecutor(max_workers=self.ocr_workers, thread_name_prefix="ocr") as ocr_pool, \
+                self._cpu_executor() as cpu_pool:
+            pending = set()
+            # Raw blocks stay in this process and are attached to the result afterwards,
+            # instead of being pickled to a worker process and back
+            blocks_of = {}
+            ocr_timing_of = {}
+
+            def submit_next() -> bool:
+                document_path = next(paths, None)
+                if document_path is None:
+                    return False
+                pending.add(ocr_pool.submit(self._ocr, document_path))
+                return True
+
+            for _ in range(self.max_in_flight):
+                if not submit_next():
+                    break
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    result = future.result()
+                    if isinstance(result, _OCRResult):
+                        cpu_future = cpu_pool.submit(
+                            _run_cpu_stages, result.document_id, result.document_path, result.text, result.error
+                        )
+                        pending.add(cpu_future)
+                        if result.blocks:
+                            blocks_of[cpu_future] = result.blocks
+                        if result.timing:
+                            ocr_timing_of[cpu_future] = result.timing
+                        continue
+                    result.raw_blocks = blocks_of.pop(future, None)
+                    if future in ocr_timing_of:
+                        _attach_ocr_timing(result, ocr_timing_of.pop(future))
+                    yield result
+                    submit_next()
@@ -8,13 +8,125 @@
 # 2. Machine learning models (e.g., text classification).
 # 3. Rule-based systems.
 
-# For now, a simple placeholder.
+# Keyword rules for all types are compiled into one regex (see KeywordClassifierEngine),
+# so the text is scanned once regardless of how many types and keywords exist.
 
 # from config import SUPPORTED_DOCUMENT_TYPES # Assuming this will be defined
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+from document_processor.context import DocumentContext
+from document_processor.utils.text_utils import KeywordScanner
+from document_processor.utils.version_utils import class_fingerprint
+
+class DocumentTypeRule(NamedTuple):
+    """
+    Keyword rule for one document type. Keywords are matched as lowercase substrings.
+    - required: all must appear, otherwise the type is not a candidate.
+    - keywords: weight of each keyword found (required ones included); negative weights penalize.
+    - excluded: any of these vetoes the type (e.g. "sin la firma").
+    - min_score: minimum total weight for the type to qualify.
+    The first qualifying rule (in rule order) is chosen; weights only decide whether a
+    type qualifies and how confident the classification is.
+    """
+    document_type: str
+    required: Tuple[str, ...] = ()
+    keywords: Dict[str, float] = {}
+    excluded: Tuple[str, ...] = ()
+    min_score: float = 0.0
+
+class ClassificationResult(NamedTuple):
+    document_type: Optional[str]
+    confidence: float # Share of the chosen type's positive weight that was found, 0..1
+    scores: Dict[str, float] # Score of every non-vetoed type with all its required keywords
+
+# Rules for every supported type, in priority order: the first qualifying type wins.
+# Adding types or keywords does not add passes over the text: all rules share one scan.
+CLASSIFICATION_RULES: List[DocumentTypeRule] = [
+    DocumentTypeRule(
+        "certificado_final",
+        required=("certificado final de obra",),
+        keywords={"certificado final de obra": 3.0, "director de obra": 1.0, "director de ejecución": 1.0},
+        excluded=("sin la firma", "sin firma"),
+    ),
+    DocumentTypeRule(
+        "factura",
+        required=("factura", "cliente", "total"),
+        keywords={"factura": 2.0, "cliente": 1.0, "total": 1.0, "iva": 1.0, "base imponible": 1.0, "nif": 0.5},
+    ),
+    DocumentTypeRule(
+        "memoria_actuacion",
+        required=("memoria de actuación",),
+        keywords={"memoria de actuación": 3.0, "objetivos": 1.0, "proyecto": 0.5, "emplazamiento": 0.5},
+    ),
+    # ... add rules for the other document types ...
+]
+
+class KeywordClassifierEngine:
+    """
+    Compiles a set of `DocumentTypeRule`s into a single keyword scanner (one trie-shaped
+    regex, see `KeywordScanner`) and scores every type from one scan of the text.
+    """
+
+    def __init__(self, rules: List[DocumentTypeRule]):
+        self.rules = [rule._replace(
+            required=tuple(k.lower() for k in rule.required),
+            keywords={k.lower(): w for k, w in rule.keywords.items()},
+            excluded=tuple(k.lower() for k in rule.excluded),
+        ) for rule in rules]
+        vocabulary: Set[str] = set()
+        for rule in self.rules:
+            vocabulary.update(rule.required, rule.keywords, rule.excluded)
+        self._scanner = KeywordScanner(vocabulary)
+        # Identifies the rules and the scoring code; stored with every classification
+        self.fingerprint = class_fingerprint(type(self), self.rules)
+
+    def find_keywords(self, text_lower: str) -> Set[str]:
+        """Returns every rule keyword that occurs in the (already lowercased) text, in one pass."""
+        return self._scanner.find(text_lower)
+
+    def classify(self, text_lower: str) -> ClassificationResult:
+        found = self.find_keywords(text_lower)
+        scores: Dict[str, float] = {}
+        chosen: Optional[Tuple[DocumentTypeRule, float]] = None
+        for rule in self.rules:
+            if any(k in found for k in rule.excluded) or not all(k in found for k in rule.required):
+                continue
+            score = sum(weight for keyword, weight in rule.keywords.items() if keyword in found)
+            scores[rule.document_type] = score
+            if chosen is None and score >= rule.min_score:
+                max_score = sum(weight for weight in rule.keywords.values() if weight > 0)
+                chosen = (rule, max(0.0, min(1.0, score / max_score)) if max_score else 1.0)
+        if chosen is None:
+            return ClassificationResult(None, 0.0, scores)
+        return ClassificationResult(chosen[0].document_type, chosen[1], scores)
+
+# Compiled once at import time and shared by every classifier instance
+_DEFAULT_ENGINE = KeywordClassifierEngine(CLASSIFICATION_RULES)
 
 class DocumentClassifier:
-    def __init__(self, text: str):
-        self.text = text.lower() # Convert to lowercase for easier matching
+    def __init__(self, text: Union[str, DocumentContext], engine: Optional[KeywordClassifierEngine] = None):
+        """
+        :param text: Raw document text, or the shared `DocumentContext` of the
+                     document (its lowercased text is reused, not recomputed).
+        :param engine: Compiled rule engine; defaults to one built from CLASSIFICATION_RULES.
+        """
+        if not isinstance(text, DocumentContext):
+            text = DocumentContext.from_text(text)
+        self.context = text
+        self.text = text.text_lower # Lowercase for easier matching
+        self.engine = engine or _DEFAULT_ENGINE
+
+    @classmethod
+    def version_fingerprint(cls, engine: Optional[KeywordClassifierEngine] = None) -> str:
+        """Identifies the classification logic of `engine` (default: CLASSIFICATION_RULES)."""
+        return (engine or _DEFAULT_ENGINE).fingerprint
+
+    def classify_with_confidence(self) -> ClassificationResult:
+        """
+        Scores every document type in a single pass over the text and returns the best
+        match with its confidence and the scores of all candidate types.
+        """
+        return self.engine.classify(self.text)
 
     def classify(self) -> Optional[str]:
         """
@@ -22,28 +134,10 @@ class DocumentClassifier:
         Returns the document type as a string (e.g., "certificado_final", "factura")
         or None if the type cannot be determined.
         """
-        # This is a very basic example. A real implementation would be more robust.
-        if "certificado final de obra" in self.text:
-            return "certificado_final"
-        elif "factura" in self.text and "cliente" in self.text and "total" in self.text:
-            return "factura"
-        elif "memoria de actuación" in self.text: # Example for another type
-            return "memoria_actuacion"
-        # ... add rules for other document types ...
-
-        # Placeholder for the 12 types, assuming some keywords
-        # This is highly dependent on the actual content of those 12 document types.
-        # For a real system, these rules would need to be carefully defined or a ML model trained.
-        # Example:
-        # elif "document_type_3_keyword_1" in self.text and "document_type_3_keyword_2" in self.text:
-        #     return "document_type_3"
-        # ... up to document_type_12
-
-        # if self.text contains keywords for type X: return "type_X"
-        print(f"Attempting to classify document based on text snippet: '{self.text[:200]}...'")
-        # In a real scenario, this would use more sophisticated logic or a trained model.
-        # For now, it needs to be expanded with rules for all 12 document types.
-        return None # Default if no type is matched
+        result = self.classify_with_confidence()
+        if result.document_type is None:
+            print(f"Attempting to classify document based on text snippet: '{self.text[:200]}...'")
+        return result.document_type
 
 if __name__ == '__main__':
     example_text_cf = "Este es un Certificado Final de Obra..."
@@ -5,6 +5,10 @@
 # TEXTRACT_S3_BUCKET = "your-textract-s3-bucket"
 # DATABASE_URL = "sqlite:///./documents.db" # Example for SQLAlchemy
 
+# OCR result cache (aws_lib/ocr_cache.py) is configured through the environment:
+# OCR_CACHE_DIR = "/var/cache/document_processor/ocr" # Enables the cache when set
+# OCR_CACHE_MAX_BYTES = 536870912 # LRU eviction threshold (default 512 MB)
+
 # Logging configuration
 LOG_LEVEL = "INFO"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -17,6 +21,67 @@ LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 #     # ... other 9 types
 # ]
 
+# Background processing queue (db/job_queue.py, worker_pool.py)
+UPLOAD_DIR = "uploaded_documents" # Where uploaded files are stored until processed
+UPLOAD_S3_BUCKET = None # If set, uploads are streamed to this bucket (multipart) instead of UPLOAD_DIR
+UPLOAD_S3_PREFIX = "uploads/"
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024 # Bytes read from the client per chunk (also the S3 part size)
+QUEUE_WORKERS = 4 # Worker threads consuming the queue inside the API process
+QUEUE_LEASE_SECONDS = 900 # A running job not heard from for this long is handed to another worker
+QUEUE_MAX_ATTEMPTS = 3
+QUEUE_POLL_INTERVAL_SECONDS = 1.0 # Idle workers check the queue this often
+QUEUE_HEARTBEAT_SECONDS = 60 # Running jobs renew their lease this often, so long stages (OCR) are not reclaimed
+# Priority lanes: lower number is processed first. Uploads choose a lane
+# (usually the expected document type); unknown lanes fall back to "default".
+QUEUE_LANE_PRIORITIES = {
+    "factura": 10,
+    "certificado_final": 20,
+    "default": 50,
+    "memoria_actuacion": 80,
+}
+
+# SQLite connection pool (db/database.py)
+DB_POOL_MAX_CONNECTIONS = 16 # Upper bound on open connections per database file
+DB_BUSY_TIMEOUT_MS = 5000 # How long a writer waits for another writer before "database is locked"
+DB_STATEMENT_CACHE_SIZE = 256 # Prepared statements kept per connection
+DB_PRAGMAS = {
+    "journal_mode": "WAL", # Readers never block the (single) writer and vice versa
+    "synchronous": "NORMAL", # Durable in WAL mode except on power loss; far fewer fsyncs than FULL
+    "cache_size": -65536, # Negative means KiB: 64 MiB of page cache per connection
+    "mmap_size": 268435456, # Read pages through a 256 MiB memory map
+    "temp_store": "MEMORY",
+}
+DB_BULK_BATCH_SIZE = 1000 # Documents per transaction in store_documents_bulk
+DB_BULK_FLUSH_INTERVAL_SECONDS = 2.0 # Commit a partial batch after this long, so slow streams still persist
+
+# Pipeline instrumentation (metrics.py, exported by the API at /metrics)
+METRICS_FIELD_TIMING = True # Also time every extractor field rule, not just pipeline stages
+PROFILE_SAMPLE_RATE = 0.0 # Fraction of pipeline runs to profile (0 disables profiling)
+PROFILER = "cprofile" # "cprofile" or "pyinstrument" (if installed)
+PROFILE_DIR = None # Where sampled profiles are written (<document_id>.prof / .html); logged if None
+
+# Page-parallel OCR of large PDFs (aws_lib/page_parallel.py; needs pypdf to split PDFs locally)
+OCR_PAGE_PARALLEL_THRESHOLD = None # PDFs with at least this many pages are OCR'd as concurrent page-range jobs; None disables it
+OCR_PAGES_PER_JOB = 25 # Pages per page-range job
+OCR_MAX_PARALLEL_JOBS = 8 # Page-range jobs of one document in flight at once
+
+# OCR text archive (db/insert.py, reextract.py)
+RAW_TEXT_DIR = None # If set, OCR text of stored documents is archived here (raw_text_path) for offline re-extraction,
+                    # with their raw Textract blocks next to it (<id>.blocks/, see utils/block_store.py)
+# After a classifier change, incremental re-runs (rerun_planner.py) reclassify only unclassified
+# documents and those classified with less than this confidence
+RERUN_MIN_CLASSIFICATION_CONFIDENCE = 0.75
+
+# Questions about documents (rag.py): local vector index of document chunks (utils/vector_index.py)
+RAG_INDEX_DIR = "rag_index"
+RAG_EMBEDDING_MODEL = None # sentence-transformers model (if installed), e.g. "all-MiniLM-L6-v2"; None uses hashed word/trigram features
+RAG_EMBEDDING_DIM = 384 # Dimension of the hashed feature embeddings
+RAG_CHUNK_CHARS = 1000 # Document text is indexed in chunks of about this many characters
+RAG_CHUNK_OVERLAP_CHARS = 200
+RAG_TOP_K = 5 # Chunks retrieved per question
+RAG_IVF_MIN_VECTORS = 50_000 # Smaller indexes are searched exactly; larger ones through IVF lists
+RAG_IVF_NPROBE = 16 # IVF lists scanned per question (recall vs latency)
+
 # Parameters for validation rules (can be loaded from here or a DB)
 # e.g., MAX_VALID_DATE_CERTIFICADO_FINAL = "2026-06-30"
 
@@ -0,0 +1,125 @@
+# Contexto compartido por documento (texto OCR y sus variantes)
+
+# A `DocumentContext` is created once per document and handed to the classifier,
+# the extractor and the validator, so that the document is OCR'd exactly once and
+# its text is lowercased/normalized exactly once, no matter how many stages read it.
+
+import threading
+from functools import cached_property, partial
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from document_processor.utils.text_utils import normalize_text
+
+# A loader returns either the OCR text or a dict with "text" and "blocks".
+OCRLoader = Callable[[], Union[str, Dict[str, Any], None]]
+
+
+class DocumentContext:
+    """
+    Lazily computed, per-document OCR output.
+
+    The OCR call happens on first access to `text` or `blocks`; derived views
+    (`text_lower`, `normalized_text`) are computed on first use and cached.
+    """
+
+    def __init__(self, text: Optional[str] = None, blocks: Optional[List[dict]] = None,
+                 loader: Optional[OCRLoader] = None):
+        """
+        :param text: OCR text, if already available.
+        :param blocks: Raw Textract blocks, if already available.
+        :param loader: Callable that performs the OCR when `text` is not given.
+        """
+        self._text = text
+        self._blocks = blocks
+        self._loader = loader
+        self._loaded = text is not None or loader is None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_text(cls, text: str, blocks: Optional[List[dict]] = None) -> "DocumentContext":
+        """Builds a context around text that has already been OCR'd."""
+        return cls(text=text, blocks=blocks)
+
+    @classmethod
+    def from_s3(cls, bucket_name: str, document_key: str, region_name: str = "us-east-1") -> "DocumentContext":
+        """Builds a context whose OCR runs against a document in S3 on first use."""
+        from aws_lib.textract import detect_document_text
+        from document_processor.config import OCR_MAX_PARALLEL_JOBS, OCR_PAGE_PARALLEL_THRESHOLD, OCR_PAGES_PER_JOB
+        return cls(loader=partial(detect_document_text, bucket_name, document_key, region_name,
+                                  page_parallel_threshold=OCR_PAGE_PARALLEL_THRESHOLD,
+                                  pages_per_job=OCR_PAGES_PER_JOB, max_parallel_jobs=OCR_MAX_PARALLEL_JOBS))
+
+    @classmethod
+    def from_document_path(cls, document_path: str, textract_client=None,
+                           content_sha256: Optional[str] = None) -> "DocumentContext":
+        """
+        Builds a context for a local path or an S3 URI (s3://bucket/key).
+        Local files are sent to Textract through `textract_client`.
+        :param content_sha256: SHA-256 of a local file computed at upload time, if known.
+        """
+        if document_path.startswith("s3://"):
+            bucket_name, _, document_key = document_path[len("s3://"):].partition("/")
+            return cls.from_s3(bucket_name, document_key)
+        if textract_client is None:
+            from document_processor.utils.textract_utils import TextractClient
+            textract_client = TextractClient()
+        if content_sha256:
+            return cls(loader=partial(textract_client.extract_text, document_path, content_sha256=content_sha256))
+        return cls(loader=partial(textract_client.extract_text, document_path))
+
+    def __getstate__(self):
+        # Contexts are pickled to ship documents to worker processes. The lock cannot be
+        # pickled, the derived views are cheap to rebuild and would double the payload,
+        # and the loader is not needed once the OCR output is available.
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state.pop("text_lower", None)
+        state.pop("normalized_text", None)
+        if self._loaded:
+            state["_loader"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:  # Another thread loaded it while we waited
+                return
+            result = self._loader()
+            if isinstance(result, dict):
+                self._text = result.get("text")
+                self._blocks = result.get("blocks")
+            else:
+                self._text = result
+            self._loaded = True
+
+    @property
+    def is_loaded(self) -> bool:
+        """True once the OCR output is available (i.e. no OCR call is pending)."""
+        return self._loaded
+
+    @property
+    def text(self) -> Optional[str]:
+        """Raw OCR text. Triggers the OCR call on first access."""
+        self._ensure_loaded()
+        return self._text
+
+    @property
+    def blocks(self) -> List[dict]:
+        """Raw Textract blocks (empty if the OCR source did not provide them)."""
+        self._ensure_loaded()
+        return self._blocks or []
+
+    @cached_property
+    def text_lower(self) -> str:
+        """Lowercased OCR text, for case-insensitive keyword matching."""
+        return (self.text or "").lower()
+
+    @cached_property
+    def normalized_text(self) -> str:
+        """Lowercased, NFC-normalized text with collapsed whitespace."""
+        return normalize_text(self.text or "")
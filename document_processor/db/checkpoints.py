@@ -0,0 +1,127 @@
+# Puntos de control por etapa del pipeline (SQLite)
+
+# A pipeline run with checkpoints enabled saves the output of each completed stage in
+# the `pipeline_checkpoints` table: the OCR text after OCR, the document type after
+# classification, the extracted fields after extraction. When the same document is
+# processed again (a requeued job, or a job whose worker died), the pipeline resumes
+# after the last saved stage, so a failure in the cheap stages never repeats the OCR.
+#
+# The Textract blocks are not stored in the table. They are only kept where stored
+# documents keep them anyway: with RAW_TEXT_DIR set, in a block store at the path the
+# document's blocks will be archived at (see utils/block_store.py).
+#
+# A checkpoint is deleted once the document's final results have been stored.
+
+from .database import get_db_connection
+from document_processor.config import RAW_TEXT_DIR
+from document_processor.utils.file_utils import raw_text_archive_path
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Stages that leave a checkpoint, in pipeline order
+CHECKPOINT_STAGES = ("ocr", "classification", "extraction")
+
+
+def save_checkpoint(document_id: str, stage: str, raw_text: Optional[str] = None,
+                    blocks: Optional[List[dict]] = None, document_type: Optional[str] = None,
+                    classification_confidence: Optional[float] = None,
+                    fields: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Records that `stage` completed for a document, with that stage's output. Outputs of
+    earlier stages already saved are kept.
+    :param stage: One of CHECKPOINT_STAGES.
+    :param raw_text: OCR text ("ocr").
+    :param blocks: Raw Textract blocks ("ocr"); only kept if RAW_TEXT_DIR is set.
+    :param document_type: Classified type ("classification").
+    :param classification_confidence: Confidence of that classification ("classification").
+    :param fields: Extracted fields ("extraction").
+    :return: False if the checkpoint could not be saved (the run goes on without it).
+    """
+    if stage not in CHECKPOINT_STAGES:
+        raise ValueError(f"Unknown checkpoint stage {stage!r}; expected one of {CHECKPOINT_STAGES}.")
+    conn = None
+    try:
+        blocks_path = None
+        if blocks and RAW_TEXT_DIR:
+            from document_processor.utils.block_store import block_store_path, write_block_store # Needs NumPy
+            # Where the stored document's blocks will be archived, so they are written only once
+            blocks_path = write_block_store(block_store_path(raw_text_archive_path(document_id, RAW_TEXT_DIR)), blocks)
+        conn = get_db_connection()
+        conn.execute("""
+            INSERT INTO pipeline_checkpoints (
+                document_id, stage, raw_text, blocks_path, document_type, classification_confidence,
+                fields_json, updated_timestamp
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (document_id) DO UPDATE SET
+                stage = excluded.stage,
+                raw_text = COALESCE(excluded.raw_text, raw_text),
+                blocks_path = COALESCE(excluded.blocks_path, blocks_path),
+                document_type = COALESCE(excluded.document_type, document_type),
+                classification_confidence = COALESCE(excluded.classification_confidence, classification_confidence),
+                fields_json = COALESCE(excluded.fields_json, fields_json),
+                updated_timestamp = excluded.updated_timestamp
+        """, (document_id, stage, raw_text, blocks_path, document_type, classification_confidence,
+              json.dumps(fields) if fields is not None else None, datetime.now().isoformat()))
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.warning(f"Could not save the {stage} checkpoint of {document_id}: {e}", exc_info=True)
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def load_checkpoint(document_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the last checkpoint of a document as a dict with stage (the last completed
+    stage), raw_text, blocks (list or None), document_type, classification_confidence
+    and fields (dict or None), or None if there is none (or it cannot be read).
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        row = conn.execute("SELECT * FROM pipeline_checkpoints WHERE document_id = ?", (document_id,)).fetchone()
+    except Exception as e:
+        logger.warning(f"Could not read the checkpoint of {document_id}: {e}", exc_info=True)
+        return None
+    finally:
+        if conn:
+            conn.close()
+    if row is None:
+        return None
+    blocks = None
+    if row["blocks_path"]:
+        from document_processor.utils.block_store import BlockStore
+        try:
+            blocks = BlockStore(row["blocks_path"]).to_blocks()
+        except Exception as e:
+            logger.warning(f"Could not read the checkpointed blocks of {document_id}: {e}")
+    return {
+        "stage": row["stage"],
+        "raw_text": row["raw_text"],
+        "blocks": blocks,
+        "document_type": row["document_type"],
+        "classification_confidence": row["classification_confidence"],
+        "fields": json.loads(row["fields_json"]) if row["fields_json"] is not None else None,
+    }
+
+
+def delete_checkpoint(document_id: str) -> bool:
+    """Removes a document's checkpoint, once its final results are stored."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        conn.execute("DELETE FROM pipeline_checkpoints WHERE document_id = ?", (document_id,))
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error deleting the checkpoint of {document_id}: {e}", exc_info=True)
+        return False
+    finally:
+        if conn:
+            conn.close()
@@ -49,14 +49,327 @@
 
 # --- Simpler SQLite3 example (without ORM for now) ---
 import sqlite3
+import threading
+import time
+import logging
+from document_processor.config import (
+    DB_POOL_MAX_CONNECTIONS, DB_BUSY_TIMEOUT_MS, DB_STATEMENT_CACHE_SIZE, DB_PRAGMAS,
+)
+from document_processor.metrics import DB_ACQUIRE_SECONDS
+from typing import Dict, List, Optional
 # from config import DATABASE_URL # Assume DATABASE_URL = "documents.db" for this example
 DATABASE_FILE = "documents.db"
 
+logger = logging.getLogger(__name__)
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a pooled `sqlite3.Connection`. Everything is delegated to the
+    underlying connection except `close()`, which hands it back to the pool instead
+    of closing it, so existing `conn = get_db_connection() ... conn.close()` code
+    reuses connections without changes.
+
+    A nested acquire made while the thread's outer caller has a transaction open works
+    inside a savepoint: its `commit()` releases the savepoint (the changes are committed
+    with the outer transaction), its `rollback()` and an uncommitted `close()` undo only
+    its own changes.
+    """
+    __slots__ = ("_conn", "_pool", "_released", "_savepoint")
+
+    def __init__(self, conn: sqlite3.Connection, pool: "ConnectionPool", savepoint: Optional[str] = None):
+        self._conn = conn
+        self._pool = pool
+        self._released = False
+        self._savepoint = savepoint
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        if self._savepoint is None:
+            self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._savepoint is None:
+            return self._conn.__exit__(exc_type, exc, tb)
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def commit(self):
+        if self._savepoint is None:
+            self._conn.commit()
+            return
+        self._conn.execute(f"RELEASE SAVEPOINT {self._savepoint}")
+        self._savepoint = None # Later statements run directly in the outer transaction
+
+    def rollback(self):
+        if self._savepoint is None:
+            self._conn.rollback()
+            return
+        self._conn.execute(f"ROLLBACK TO SAVEPOINT {self._savepoint}")
+        self._conn.execute(f"RELEASE SAVEPOINT {self._savepoint}")
+        self._savepoint = None
+
+    def close(self):
+        if not self._released:
+            if self._savepoint is not None:
+                self.rollback() # Uncommitted nested work is undone, as on release
+            self._released = True
+            self._pool.release(self._conn)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of SQLite connections to one database file.
+
+    - A thread that already holds a connection gets the same one back (nested calls
+      share it, inside a savepoint if a transaction is open; see `PooledConnection`); otherwise an idle connection is reused or a new one is opened, up to
+      `max_connections`, after which callers wait for a release.
+    - Every connection is opened in WAL mode with the pragmas in `DB_PRAGMAS` and a
+      prepared-statement cache, and waits `busy_timeout_ms` on write contention.
+    - Uncommitted transactions are rolled back when a connection is released.
+    - Acquire times are recorded in the DB_ACQUIRE_SECONDS histogram (exported at
+      `/metrics`); `stats()` also reports them.
+    - After `close_all()`, connections still in use are closed when released, and new
+      acquires fail.
+    """
+
+    def __init__(self, database_file: str, max_connections: int = DB_POOL_MAX_CONNECTIONS,
+                 busy_timeout_ms: int = DB_BUSY_TIMEOUT_MS, statement_cache_size: int = DB_STATEMENT_CACHE_SIZE,
+                 pragmas: Dict[str, object] = DB_PRAGMAS):
+        self.database_file = database_file
+        self.max_connections = max_connections
+        self.busy_timeout_ms = busy_timeout_ms
+        self.statement_cache_size = statement_cache_size
+        self.pragmas = pragmas
+        self._available = threading.Condition()
+        self._idle: List[sqlite3.Connection] = []
+        self._all: List[sqlite3.Connection] = []
+        self._local = threading.local() # Connection currently held by this thread and its nesting depth
+        self._acquisitions = 0
+        self._waits = 0
+        self._total_acquire_seconds = 0.0
+        self._max_acquire_seconds = 0.0
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.database_file,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False, # Connections move between threads through the pool
+            cached_statements=self.statement_cache_size,
+        )
+        conn.row_factory = sqlite3.Row # Access columns by name
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """Returns a connection for the calling thread. Call `.close()` on it when done."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            savepoint = None
+            if held.in_transaction:
+                savepoint = f"pool_nested_{self._local.depth}"
+                held.execute(f"SAVEPOINT {savepoint}")
+            return PooledConnection(held, self, savepoint)
+
+        start = time.perf_counter()
+        waited = False
+        with self._available:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError(f"The connection pool for '{self.database_file}' is closed.")
+                if self._idle:
+                    conn = self._idle.pop() # Most recently used: warmest page cache
+                    break
+                if len(self._all) < self.max_connections:
+                    conn = None
+                    self._all.append(None) # Reserve the slot; connect outside the lock
+                    break
+                waited = True
+                self._available.wait()
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._available:
+                    self._all.remove(None)
+                    self._available.notify()
+                raise
+            with self._available:
+                self._all[self._all.index(None)] = conn
+
+        elapsed = time.perf_counter() - start
+        with self._available:
+            self._acquisitions += 1
+            self._waits += waited
+            self._total_acquire_seconds += elapsed
+            self._max_acquire_seconds = max(self._max_acquire_seconds, elapsed)
+        DB_ACQUIRE_SECONDS.observe(elapsed, self.database_file)
+        self._local.conn = conn
+        self._local.depth = 1
+        return PooledConnection(conn, self)
+
+    def release(self, conn: sqlite3.Connection):
+        """Returns a connection obtained from `acquire` (called by `PooledConnection.close`)."""
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback() # Never hand out a connection in the middle of someone else's transaction
+        with self._available:
+            if self._closed:
+                conn.close()
+                self._all.remove(conn)
+                return
+            self._idle.append(conn)
+            self._available.notify()
+
+    def close_all(self):
+        """
+        Closes the pool: idle connections now, connections still in use when released.
+        Callers waiting for a connection, and later acquires, get a ProgrammingError.
+        """
+        with self._available:
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+                self._all.remove(conn)
+            self._idle.clear()
+            self._available.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        """Connection counts and acquire-time metrics (seconds)."""
+        with self._available:
+            return {
+                "connections": len(self._all),
+                "idle_connections": len(self._idle),
+                "acquisitions": self._acquisitions,
+                "waits": self._waits,
+                "acquire_seconds_total": self._total_acquire_seconds,
+                "acquire_seconds_max": self._max_acquire_seconds,
+                "acquire_seconds_avg": self._total_acquire_seconds / self._acquisitions if self._acquisitions else 0.0,
+            }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """Returns the pool for the current DATABASE_FILE, creating it on first use."""
+    pool = _pools.get(DATABASE_FILE)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(DATABASE_FILE)
+            if pool is None:
+                pool = _pools[DATABASE_FILE] = ConnectionPool(DATABASE_FILE)
+                logger.info(f"SQLite connection pool created for '{DATABASE_FILE}'.")
+    return pool
+
+
 def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row # Access columns by name
-    return conn
+    """
+    Gets a pooled connection to the SQLite database.
+    `close()` returns it to the pool; the underlying connection stays open for reuse.
+    """
+    return get_connection_pool().acquire()
+
+
+def close_db_connections():
+    """
+    Closes every pool (e.g. at application shutdown); connections still in use are
+    closed when released. A later `get_db_connection` opens a new pool.
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
+
+# Schema migrations, applied in order by `initialize_database`. The schema version is
+# kept in SQLite's `PRAGMA user_version`; append new (version, description, statements)
+# entries with increasing versions and never edit an applied one.
+MIGRATIONS = [
+    (1, "Composite indexes for find_documents filters and keyset pagination", [
+        # Every listing is ordered by (upload_timestamp DESC, id DESC); one index per filter combination
+        "CREATE INDEX IF NOT EXISTS idx_documents_upload ON documents (upload_timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_documents_status_upload ON documents (processing_status, upload_timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_documents_type_upload ON documents (document_type_classified, upload_timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_documents_status_type_upload "
+        "ON documents (processing_status, document_type_classified, upload_timestamp, id)",
+    ]),
+    (2, "Per-stage processing timings", [
+        # Append-only, one row per pipeline stage run (see db/query.py for the latency
+        # percentiles). A document processed again adds new rows. The only index is the
+        # time range one, to keep bulk inserts cheap.
+        """
+        CREATE TABLE IF NOT EXISTS processing_events (
+            id INTEGER PRIMARY KEY,
+            document_id TEXT NOT NULL,
+            stage TEXT NOT NULL, -- (ocr, classification, extraction, validation, total)
+            document_type TEXT, -- Classified type at the time of the run
+            started_timestamp TEXT NOT NULL,
+            wall_seconds REAL NOT NULL,
+            cpu_seconds REAL NOT NULL,
+            FOREIGN KEY (document_id) REFERENCES documents (id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_processing_events_started ON processing_events (started_timestamp)",
+    ]),
+    (3, "Resumable pipeline checkpoints", [
+        # Output of the last completed stage of documents still in process (see db/checkpoints.py)
+        """
+        CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+            document_id TEXT PRIMARY KEY,
+            stage TEXT NOT NULL, -- Last completed stage (ocr, classification, extraction)
+            raw_text TEXT,
+            blocks_path TEXT, -- Block store with the raw Textract blocks, if kept
+            document_type TEXT,
+            fields_json TEXT,
+            updated_timestamp TEXT NOT NULL
+        )
+        """,
+    ]),
+    (4, "Stage version fingerprints and classification confidence", [
+        # Fingerprints of the logic behind each stored stage output (see utils/version_utils.py),
+        # read by the re-run planner (rerun_planner.py). NULL for documents stored before this.
+        "ALTER TABLE documents ADD COLUMN classification_confidence REAL",
+        "ALTER TABLE documents ADD COLUMN classifier_version TEXT",
+        "ALTER TABLE documents ADD COLUMN extractor_version TEXT",
+        "ALTER TABLE documents ADD COLUMN validator_version TEXT",
+        "ALTER TABLE pipeline_checkpoints ADD COLUMN classification_confidence REAL",
+    ]),
+]
+
+def apply_migrations(conn) -> int:
+    """
+    Applies pending MIGRATIONS, each in its own transaction. Returns the resulting schema version.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for migration_version, description, statements in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        try:
+            conn.execute("BEGIN") # sqlite3 does not open transactions implicitly for DDL
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(migration_version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = migration_version
+        logger.info(f"Applied schema migration {migration_version}: {description}")
+    return version
 
 def initialize_database():
     """
@@ -103,6 +416,32 @@ def initialize_database():
     )
     """)
 
+    # Durable background processing queue (see db/job_queue.py).
+    # One row per uploaded document; `stage` mirrors the pipeline's live processing_status.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS processing_jobs (
+        id TEXT PRIMARY KEY, -- Same as documents.id
+        document_path TEXT NOT NULL,
+        file_name TEXT NOT NULL,
+        file_type TEXT,
+        content_sha256 TEXT, -- Computed while the upload was streamed; reused as the OCR cache key
+        lane TEXT NOT NULL, -- Priority lane name (e.g., factura, memoria_actuacion, default)
+        priority INTEGER NOT NULL, -- Lower runs first
+        status TEXT NOT NULL, -- (queued, running, done, failed)
+        stage TEXT, -- Live pipeline status (processing_ocr, processing_extraction, ...)
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error_message TEXT,
+        enqueued_timestamp TEXT NOT NULL,
+        started_timestamp TEXT,
+        finished_timestamp TEXT,
+        lease_expires_timestamp TEXT -- Running jobs past their lease are requeued on restart
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_processing_jobs_dequeue
+    ON processing_jobs (status, priority, enqueued_timestamp)
+    """)
+
     # Potentially a table for RAG system to link document segments to embeddings or for quick lookup
     # cursor.execute("""
     # CREATE TABLE IF NOT EXISTS rag_document_segments (
@@ -115,6 +454,7 @@ def initialize_database():
     # """)
 
     conn.commit()
+    apply_migrations(conn)
     conn.close()
     print(f"Database '{DATABASE_FILE}' initialized/checked.")
 
@@ -57,68 +57,148 @@
 # --- Simpler SQLite3 example (without ORM) ---
 from .database import get_db_connection # Uses the simple sqlite3 connection
 # from models import ProcessedDocument # Pydantic model from main project
+from document_processor.config import DB_BULK_BATCH_SIZE, DB_BULK_FLUSH_INTERVAL_SECONDS, RAW_TEXT_DIR
+from document_processor.utils.file_utils import archive_raw_text
 from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import json
 import logging # For logging potential errors
+import time
 
 logger = logging.getLogger(__name__)
 
+_UPSERT_DOCUMENT_SQL = """
+    INSERT OR REPLACE INTO documents (
+        id, file_name, file_type, upload_timestamp,
+        processing_status, document_type_classified,
+        raw_text_path, error_message, last_updated_timestamp,
+        classification_confidence, classifier_version, extractor_version, validator_version
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_UPSERT_EXTRACTED_DATA_SQL = """
+    INSERT OR REPLACE INTO extracted_data (document_id, data_json)
+    VALUES (?, ?)
+"""
+_UPSERT_VALIDATION_RESULT_SQL = """
+    INSERT OR REPLACE INTO validation_results (document_id, is_overall_valid, results_json)
+    VALUES (?, ?, ?)
+"""
+_UPDATE_REEXTRACTED_DOCUMENT_SQL = """
+    UPDATE documents
+    SET processing_status = ?, document_type_classified = ?, error_message = ?, last_updated_timestamp = ?,
+        classification_confidence = ?, classifier_version = ?, extractor_version = ?, validator_version = ?
+    WHERE id = ?
+"""
+_INSERT_PROCESSING_EVENT_SQL = """
+    INSERT INTO processing_events (document_id, stage, document_type, started_timestamp, wall_seconds, cpu_seconds)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+_DELETE_EXTRACTED_DATA_SQL = "DELETE FROM extracted_data WHERE document_id = ?"
+_DELETE_VALIDATION_RESULT_SQL = "DELETE FROM validation_results WHERE document_id = ?"
+
+def _isoformat(timestamp) -> str:
+    return timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp
+
+def _version_columns(versions: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    versions = versions or {}
+    return versions.get("classifier"), versions.get("extractor"), versions.get("validator")
+
+def _archive_document(processed_doc_data: Dict[str, Any]) -> Optional[str]:
+    """
+    Archives a document's OCR text (and Textract blocks) under RAW_TEXT_DIR, if set and
+    not archived already, so it can be re-extracted later without OCR.
+    :return: The raw_text_path to store for the document (None if there is none).
+    """
+    raw_text_path = processed_doc_data.get("raw_text_path") # Path if raw text is stored separately
+    if raw_text_path is not None or not RAW_TEXT_DIR or not processed_doc_data.get("raw_text"):
+        return raw_text_path
+    doc_id = processed_doc_data["metadata"]["document_id"]
+    raw_text_path = archive_raw_text(doc_id, processed_doc_data["raw_text"], RAW_TEXT_DIR)
+    if processed_doc_data.get("raw_blocks"):
+        # Keep the full Textract output too, so tables/geometry never need another OCR run.
+        # (Imported here: the block store needs NumPy, which the API should not load at startup.)
+        from document_processor.utils.block_store import block_store_path, holds_blocks, write_block_store
+        blocks_path = block_store_path(raw_text_path)
+        try:
+            # A checkpointed run (db/checkpoints.py) has already written them there
+            if not holds_blocks(blocks_path, processed_doc_data["raw_blocks"]):
+                write_block_store(blocks_path, processed_doc_data["raw_blocks"])
+        except Exception as e:
+            logger.warning(f"Could not archive the Textract blocks of {doc_id}: {e}", exc_info=True)
+    return raw_text_path
+
+def _document_rows(processed_doc_data: Dict[str, Any],
+                   raw_text_path: Optional[str]) -> Tuple[tuple, Optional[tuple], Optional[tuple], List[tuple]]:
+    """
+    Builds the (documents, extracted_data, validation_results) parameter tuples for one
+    processed document, plus its processing_events rows. The second and third are None
+    when there is nothing to store. No side effects: archiving is `_archive_document`.
+    """
+    metadata = processed_doc_data.get("metadata", {})
+    doc_id = metadata.get("document_id")
+    now = datetime.now().isoformat()
+    extracted_data = processed_doc_data.get("extracted_data")
+    validation_result = processed_doc_data.get("validation_result")
+
+    document_row = (
+        doc_id,
+        metadata.get("file_name"),
+        metadata.get("file_type"),
+        metadata.get("upload_date", now), # Ensure upload_date is string
+        metadata.get("processing_status"),
+        extracted_data.get("document_type") if extracted_data else None,
+        raw_text_path,
+        metadata.get("error_message"),
+        now,
+        processed_doc_data.get("classification_confidence"),
+        *_version_columns(processed_doc_data.get("stage_versions")),
+    )
+    extracted_row = None
+    if extracted_data and extracted_data.get("fields"):
+        extracted_row = (doc_id, json.dumps(extracted_data.get("fields")))
+    validation_row = None
+    if validation_result:
+        validation_row = (
+            doc_id,
+            1 if validation_result.get("is_valid") else 0,
+            json.dumps(validation_result.get("details"))
+        )
+    document_type = document_row[5]
+    event_rows = [
+        (doc_id, event["stage"], document_type, _isoformat(event["started"]), event["wall_seconds"], event["cpu_seconds"])
+        for event in processed_doc_data.get("processing_events") or ()
+    ]
+    return document_row, extracted_row, validation_row, event_rows
+
 def store_document_data(processed_doc_data: dict): # Assuming processed_doc_data is a dict representation
     """
     Stores document metadata, extracted data, and validation results
     into respective SQLite tables.
     `processed_doc_data` should be a dictionary mirroring `ProcessedDocument` Pydantic model.
+    For many documents at once use `store_documents_bulk`.
     """
     conn = None
+    doc_id = processed_doc_data.get("metadata", {}).get("document_id")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        metadata = processed_doc_data.get("metadata", {})
-        doc_id = metadata.get("document_id")
-
         if not doc_id:
             logger.error("Cannot store document data: document_id is missing.")
             return False
 
-        # Upsert into 'documents' table (Insert or Replace)
-        cursor.execute("""
-            INSERT OR REPLACE INTO documents (
-                id, file_name, file_type, upload_timestamp,
-                processing_status, document_type_classified,
-                raw_text_path, error_message, last_updated_timestamp
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            doc_id,
-            metadata.get("file_name"),
-            metadata.get("file_type"),
-            metadata.get("upload_date", datetime.now().isoformat()), # Ensure upload_date is string
-            metadata.get("processing_status"),
-            processed_doc_data.get("extracted_data", {}).get("document_type") if processed_doc_data.get("extracted_data") else None,
-            processed_doc_data.get("raw_text_path"), # Path if raw text is stored separately
-            metadata.get("error_message"),
-            datetime.now().isoformat()
-        ))
+        raw_text_path = _archive_document(processed_doc_data)
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        document_row, extracted_row, validation_row, event_rows = _document_rows(processed_doc_data, raw_text_path)
 
+        # Upsert into 'documents' table (Insert or Replace)
+        cursor.execute(_UPSERT_DOCUMENT_SQL, document_row)
         # Upsert into 'extracted_data' table
-        extracted_data = processed_doc_data.get("extracted_data")
-        if extracted_data and extracted_data.get("fields"):
-            cursor.execute("""
-                INSERT OR REPLACE INTO extracted_data (document_id, data_json)
-                VALUES (?, ?)
-            """, (doc_id, json.dumps(extracted_data.get("fields"))))
-
+        if extracted_row:
+            cursor.execute(_UPSERT_EXTRACTED_DATA_SQL, extracted_row)
         # Upsert into 'validation_results' table
-        validation_result = processed_doc_data.get("validation_result")
-        if validation_result:
-            cursor.execute("""
-                INSERT OR REPLACE INTO validation_results (document_id, is_overall_valid, results_json)
-                VALUES (?, ?, ?)
-            """, (
-                doc_id,
-                1 if validation_result.get("is_valid") else 0,
-                json.dumps(validation_result.get("details"))
-            ))
+        if validation_row:
+            cursor.execute(_UPSERT_VALIDATION_RESULT_SQL, validation_row)
+        # Append the stage timings of this run
+        cursor.executemany(_INSERT_PROCESSING_EVENT_SQL, event_rows)
 
         conn.commit()
         logger.info(f"Data for document ID {doc_id} stored/updated successfully in SQLite.")
@@ -132,6 +212,125 @@ def store_document_data(processed_doc_data: dict): # Assuming processed_doc_data
         if conn:
             conn.close()
 
+def store_documents_bulk(processed_docs: Iterable[Any], batch_size: int = DB_BULK_BATCH_SIZE,
+                         flush_interval: float = DB_BULK_FLUSH_INTERVAL_SECONDS) -> int:
+    """
+    Stores many processed documents, grouping them into one transaction per batch and
+    writing each table with a single `executemany`, so a batch costs one commit instead
+    of one per document.
+    :param processed_docs: Iterable of `ProcessedDocument` models or their dict form.
+                           It is consumed lazily, so it can be a generator of results.
+    :param batch_size: Documents per transaction.
+    :param flush_interval: Maximum seconds a document waits in a partial batch; only
+                           checked when the next document arrives.
+    :return: Number of documents stored. A batch that fails is rolled back and logged.
+    """
+    document_rows, extracted_rows, validation_rows, event_rows = [], [], [], []
+    stored = 0
+    last_flush = time.monotonic()
+
+    def flush():
+        nonlocal stored
+        if not document_rows:
+            return
+        conn = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.executemany(_UPSERT_DOCUMENT_SQL, document_rows)
+            cursor.executemany(_UPSERT_EXTRACTED_DATA_SQL, extracted_rows)
+            cursor.executemany(_UPSERT_VALIDATION_RESULT_SQL, validation_rows)
+            cursor.executemany(_INSERT_PROCESSING_EVENT_SQL, event_rows)
+            conn.commit()
+            stored += len(document_rows)
+            logger.info(f"Stored a batch of {len(document_rows)} document(s) in SQLite.")
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logger.error(f"Error storing a batch of {len(document_rows)} document(s) in SQLite: {e}", exc_info=True)
+        finally:
+            if conn:
+                conn.close()
+            document_rows.clear()
+            extracted_rows.clear()
+            validation_rows.clear()
+            event_rows.clear()
+
+    for processed_doc in processed_docs:
+        processed_doc_data = processed_doc.model_dump(mode="json") if hasattr(processed_doc, "model_dump") else processed_doc
+        if not processed_doc_data.get("metadata", {}).get("document_id"):
+            logger.error("Skipping document without document_id in bulk store.")
+            continue
+        document_row, extracted_row, validation_row, document_event_rows = _document_rows(
+            processed_doc_data, _archive_document(processed_doc_data))
+        document_rows.append(document_row)
+        event_rows.extend(document_event_rows)
+        if extracted_row:
+            extracted_rows.append(extracted_row)
+        if validation_row:
+            validation_rows.append(validation_row)
+        if len(document_rows) >= batch_size or time.monotonic() - last_flush >= flush_interval:
+            flush()
+            last_flush = time.monotonic()
+    flush()
+    return stored
+
+def store_reextraction_results_bulk(updates: Iterable[Dict[str, Any]], batch_size: int = DB_BULK_BATCH_SIZE) -> int:
+    """
+    Writes the new results of re-extracted documents (see `reextract.py`), one transaction
+    per batch. Only the columns produced by classification, extraction and validation are
+    touched; file metadata and `raw_text_path` stay as they are.
+    :param updates: Iterable of dicts with id, processing_status, document_type, error_message,
+                    fields (None removes the stored extracted data), is_valid and details
+                    (is_valid None removes the stored validation result), and optionally
+                    classification_confidence and versions ({"classifier", "extractor",
+                    "validator"} fingerprints). Consumed lazily.
+    :param batch_size: Documents per transaction.
+    :return: Number of documents updated. A batch that fails is rolled back and logged.
+    """
+    batch: List[Dict[str, Any]] = []
+    stored = 0
+
+    def flush():
+        nonlocal stored
+        if not batch:
+            return
+        now = datetime.now().isoformat()
+        conn = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.executemany(_UPDATE_REEXTRACTED_DOCUMENT_SQL, [
+                (u["processing_status"], u["document_type"], u.get("error_message"), now,
+                 u.get("classification_confidence"), *_version_columns(u.get("versions")), u["id"]) for u in batch
+            ])
+            cursor.executemany(_UPSERT_EXTRACTED_DATA_SQL, [
+                (u["id"], json.dumps(u["fields"])) for u in batch if u.get("fields")
+            ])
+            cursor.executemany(_DELETE_EXTRACTED_DATA_SQL, [(u["id"],) for u in batch if not u.get("fields")])
+            cursor.executemany(_UPSERT_VALIDATION_RESULT_SQL, [
+                (u["id"], 1 if u["is_valid"] else 0, json.dumps(u.get("details"))) for u in batch if u.get("is_valid") is not None
+            ])
+            cursor.executemany(_DELETE_VALIDATION_RESULT_SQL, [(u["id"],) for u in batch if u.get("is_valid") is None])
+            conn.commit()
+            stored += len(batch)
+            logger.info(f"Stored re-extraction results for a batch of {len(batch)} document(s) in SQLite.")
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logger.error(f"Error storing re-extraction results for {len(batch)} document(s) in SQLite: {e}", exc_info=True)
+        finally:
+            if conn:
+                conn.close()
+            batch.clear()
+
+    for update in updates:
+        batch.append(update)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return stored
+
 # Example usage (simulation - ProcessedDocument Pydantic model would be used in practice)
 if __name__ == '__main__':
     # This requires models.py to be accessible and database.py to have run initialize_database()
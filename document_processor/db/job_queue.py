@@ -0,0 +1,195 @@
+# Cola persistente de trabajos de procesamiento (SQLite)
+
+# Jobs live in the `processing_jobs` table of the same SQLite database as the
+# documents, so queued work survives restarts. Workers claim jobs in priority
+# order under a lease; a job whose worker died is handed out again once its
+# lease expires.
+
+from .database import get_db_connection
+from document_processor.config import QUEUE_LANE_PRIORITIES, QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANE = "default"
+
+
+def lane_priority(lane: Optional[str]) -> int:
+    """Returns the numeric priority of a lane (lower runs first). Unknown lanes use the default lane."""
+    return QUEUE_LANE_PRIORITIES.get((lane or DEFAULT_LANE).lower(), QUEUE_LANE_PRIORITIES[DEFAULT_LANE])
+
+
+def enqueue_job(document_id: str, document_path: str, file_name: str, file_type: Optional[str],
+                lane: Optional[str] = None, content_sha256: Optional[str] = None) -> bool:
+    """
+    Adds a document to the processing queue.
+    :param lane: Priority lane, usually the expected document type (e.g. "factura").
+    :param content_sha256: SHA-256 of the stored document, if computed at upload time.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        lane = (lane or DEFAULT_LANE).lower()
+        conn.execute("""
+            INSERT INTO processing_jobs (
+                id, document_path, file_name, file_type, content_sha256, lane, priority,
+                status, stage, enqueued_timestamp
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', 'pending', ?)
+        """, (document_id, document_path, file_name, file_type, content_sha256, lane, lane_priority(lane),
+              datetime.now().isoformat()))
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error enqueuing document {document_id}: {e}", exc_info=True)
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def claim_next_job(lease_seconds: int = QUEUE_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+    """
+    Atomically takes the highest-priority queued job and marks it as running.
+    Running jobs whose lease has expired are put back in the queue first (or marked
+    failed after QUEUE_MAX_ATTEMPTS, dropping their checkpoints: no run resumes from
+    them). Returns the job row as a dict, or None if idle.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        now = datetime.now()
+        cursor.execute("BEGIN IMMEDIATE") # Serializes claimers across threads and processes
+        expired = "status = 'running' AND lease_expires_timestamp < ?"
+        failed_ids = [row["id"] for row in cursor.execute(
+            f"SELECT id FROM processing_jobs WHERE {expired} AND attempts >= ?", (now.isoformat(), QUEUE_MAX_ATTEMPTS)
+        )]
+        cursor.execute(f"""
+            UPDATE processing_jobs
+            SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                error_message = CASE WHEN attempts >= ? THEN 'Worker lease expired too many times.' ELSE error_message END,
+                finished_timestamp = CASE WHEN attempts >= ? THEN ? ELSE finished_timestamp END,
+                lease_expires_timestamp = NULL
+            WHERE {expired}
+        """, (QUEUE_MAX_ATTEMPTS, QUEUE_MAX_ATTEMPTS, QUEUE_MAX_ATTEMPTS, now.isoformat(), now.isoformat()))
+        if failed_ids:
+            cursor.execute(f"DELETE FROM pipeline_checkpoints WHERE document_id IN ({', '.join('?' * len(failed_ids))})",
+                           failed_ids)
+        cursor.execute("""
+            SELECT * FROM processing_jobs
+            WHERE status = 'queued'
+            ORDER BY priority, enqueued_timestamp
+            LIMIT 1
+        """)
+        row = cursor.fetchone()
+        if row is None:
+            conn.commit()
+            return None
+        cursor.execute("""
+            UPDATE processing_jobs
+            SET status = 'running', attempts = attempts + 1,
+                started_timestamp = ?, lease_expires_timestamp = ?
+            WHERE id = ?
+        """, (now.isoformat(), (now + timedelta(seconds=lease_seconds)).isoformat(), row["id"]))
+        conn.commit()
+        job = dict(row)
+        job["status"] = "running"
+        job["attempts"] += 1
+        return job
+    except Exception as e:
+        if conn and conn.in_transaction:
+            conn.rollback()
+        logger.error(f"Error claiming next processing job: {e}", exc_info=True)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+def _update_job(document_id: str, assignments: str, params: tuple, condition: str = "") -> bool:
+    conn = None
+    try:
+        conn = get_db_connection()
+        conn.execute(f"UPDATE processing_jobs SET {assignments} WHERE id = ? {condition}", params + (document_id,))
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error updating processing job {document_id}: {e}", exc_info=True)
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def update_job_stage(document_id: str, stage: str, lease_seconds: int = QUEUE_LEASE_SECONDS) -> bool:
+    """Records live pipeline progress for a running job and renews its lease."""
+    lease = (datetime.now() + timedelta(seconds=lease_seconds)).isoformat()
+    return _update_job(document_id, "stage = ?, lease_expires_timestamp = ?", (stage, lease))
+
+
+def renew_lease(document_id: str, lease_seconds: int = QUEUE_LEASE_SECONDS) -> bool:
+    """Extends the lease of a running job (worker heartbeat during long stages)."""
+    lease = (datetime.now() + timedelta(seconds=lease_seconds)).isoformat()
+    return _update_job(document_id, "lease_expires_timestamp = ?", (lease,), condition="AND status = 'running'")
+
+
+def complete_job(document_id: str, final_stage: str) -> bool:
+    """Marks a job as done; `final_stage` is the pipeline's final processing_status."""
+    return _update_job(
+        document_id,
+        "status = 'done', stage = ?, finished_timestamp = ?, lease_expires_timestamp = NULL",
+        (final_stage, datetime.now().isoformat()),
+    )
+
+
+def requeue_job(document_id: str, error_message: str) -> bool:
+    """
+    Puts a running job back in the queue after a failed attempt, to be retried (the
+    pipeline resumes from its checkpoint). `attempts` keeps counting across retries.
+    """
+    return _update_job(
+        document_id,
+        "status = 'queued', error_message = ?, lease_expires_timestamp = NULL",
+        (error_message,),
+    )
+
+
+def fail_job(document_id: str, error_message: str) -> bool:
+    """Marks a job as failed after an unexpected worker error."""
+    return _update_job(
+        document_id,
+        "status = 'failed', error_message = ?, finished_timestamp = ?, lease_expires_timestamp = NULL",
+        (error_message, datetime.now().isoformat()),
+    )
+
+
+def get_job(document_id: str) -> Optional[Dict[str, Any]]:
+    """Returns the queue row for a document, or None if it was never enqueued."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        row = conn.execute("SELECT * FROM processing_jobs WHERE id = ?", (document_id,)).fetchone()
+        return dict(row) if row else None
+    except Exception as e:
+        logger.error(f"Error fetching processing job {document_id}: {e}", exc_info=True)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+def count_jobs_by_status() -> Dict[str, int]:
+    """Returns the number of jobs per queue status, e.g. {"queued": 3, "running": 2}."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        rows = conn.execute("SELECT status, COUNT(*) AS n FROM processing_jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+    except Exception as e:
+        logger.error(f"Error counting processing jobs: {e}", exc_info=True)
+        return {}
+    finally:
+        if conn:
+            conn.close()
@@ -87,12 +87,55 @@
 # --- Simpler SQLite3 example (without ORM) ---
 from .database import get_db_connection # Uses the simple sqlite3 connection
 # from models import ProcessedDocument, DocumentMetadata, ExtractedData, ValidationResult # Pydantic models
+import base64
 import json
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Documents joined with their extracted data and validation results, so that full
+# details for any number of documents come back in one query instead of three per document.
+_DETAILS_SELECT = """
+    SELECT d.id, d.file_name, d.file_type, d.upload_timestamp, d.processing_status,
+           d.document_type_classified, d.raw_text_path, d.error_message,
+           e.data_json, v.is_overall_valid, v.results_json
+    FROM documents d
+    LEFT JOIN extracted_data e ON e.document_id = d.id
+    LEFT JOIN validation_results v ON v.document_id = d.id
+"""
+
+# Stay well below SQLite's limit on bound parameters per statement
+_MAX_IDS_PER_QUERY = 500
+
+def _row_to_details(row) -> Dict[str, Any]:
+    """Maps one row of `_DETAILS_SELECT` to a dict structured like the ProcessedDocument model."""
+    result = {
+        "metadata": {
+            "document_id": row["id"],
+            "file_name": row["file_name"],
+            "file_type": row["file_type"],
+            "upload_date": row["upload_timestamp"], # SQLite stores as TEXT, Pydantic model expects datetime
+            "processing_status": row["processing_status"],
+            "error_message": row["error_message"]
+        },
+        "extracted_data": None,
+        "validation_result": None,
+        "raw_text": None # Placeholder, assuming raw text might be loaded from raw_text_path
+    }
+    # If raw text is stored in a file, its path would be row["raw_text_path"]
+    if row["data_json"]:
+        result["extracted_data"] = {
+            "document_type": row["document_type_classified"], # From the main 'documents' table
+            "fields": json.loads(row["data_json"])
+        }
+    if row["is_overall_valid"] is not None:
+        result["validation_result"] = {
+            "is_valid": bool(row["is_overall_valid"]),
+            "details": json.loads(row["results_json"]) if row["results_json"] else {}
+        }
+    return result
+
 def get_document_details_by_id(doc_id: str) -> Optional[Dict[str, Any]]:
     """
     Retrieves all details for a document (metadata, extracted data, validation results)
@@ -101,51 +144,8 @@ def get_document_details_by_id(doc_id: str) -> Optional[Dict[str, Any]]:
     conn = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Fetch from documents table
-        cursor.execute("SELECT * FROM documents WHERE id = ?", (doc_id,))
-        doc_row = cursor.fetchone()
-
-        if not doc_row:
-            return None
-
-        result = {
-            "metadata": {
-                "document_id": doc_row["id"],
-                "file_name": doc_row["file_name"],
-                "file_type": doc_row["file_type"],
-                "upload_date": doc_row["upload_timestamp"], # SQLite stores as TEXT, Pydantic model expects datetime
-                "processing_status": doc_row["processing_status"],
-                "error_message": doc_row["error_message"]
-            },
-            "extracted_data": None,
-            "validation_result": None,
-            "raw_text": None # Placeholder, assuming raw text might be loaded from raw_text_path
-        }
-
-        # If raw text is stored in a file, its path would be doc_row["raw_text_path"]
-        # Here you could add logic to load it if needed.
-
-        # Fetch from extracted_data table
-        cursor.execute("SELECT data_json FROM extracted_data WHERE document_id = ?", (doc_id,))
-        extracted_row = cursor.fetchone()
-        if extracted_row and extracted_row["data_json"]:
-            result["extracted_data"] = {
-                "document_type": doc_row["document_type_classified"], # From the main 'documents' table
-                "fields": json.loads(extracted_row["data_json"])
-            }
-
-        # Fetch from validation_results table
-        cursor.execute("SELECT is_overall_valid, results_json FROM validation_results WHERE document_id = ?", (doc_id,))
-        validation_row = cursor.fetchone()
-        if validation_row:
-            result["validation_result"] = {
-                "is_valid": bool(validation_row["is_overall_valid"]),
-                "details": json.loads(validation_row["results_json"]) if validation_row["results_json"] else {}
-            }
-
-        return result # This dict should be parseable by ProcessedDocument(**result)
+        row = conn.execute(_DETAILS_SELECT + " WHERE d.id = ?", (doc_id,)).fetchone()
+        return _row_to_details(row) if row else None # This dict should be parseable by ProcessedDocument(**result)
 
     except Exception as e:
         logger.error(f"Error fetching document details for ID {doc_id} from SQLite: {e}", exc_info=True)
@@ -154,37 +154,69 @@ def get_document_details_by_id(doc_id: str) -> Optional[Dict[str, Any]]:
         if conn:
             conn.close()
 
-def find_documents(status: Optional[str] = None, doc_type: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+def get_documents_details(doc_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Retrieves full details (as in `get_document_details_by_id`) for many documents with
+    one joined query per 500 IDs.
+    Returns a dict keyed by document ID; IDs that do not exist are simply absent.
+    """
+    ids = list(dict.fromkeys(doc_ids)) # Deduplicate, keep order
+    details: Dict[str, Dict[str, Any]] = {}
+    if not ids:
+        return details
+    conn = None
+    try:
+        conn = get_db_connection()
+        for i in range(0, len(ids), _MAX_IDS_PER_QUERY):
+            chunk = ids[i:i + _MAX_IDS_PER_QUERY]
+            placeholders = ", ".join("?" * len(chunk))
+            for row in conn.execute(_DETAILS_SELECT + f" WHERE d.id IN ({placeholders})", chunk):
+                details[row["id"]] = _row_to_details(row)
+        return details
+    except Exception as e:
+        logger.error(f"Error fetching details for {len(ids)} document(s) from SQLite: {e}", exc_info=True)
+        return {}
+    finally:
+        if conn:
+            conn.close()
+
+def find_documents(status: Optional[str] = None, doc_type: Optional[str] = None, limit: int = 100,
+                   include_details: bool = False) -> List[Dict[str, Any]]:
     """
     Finds documents based on status or classified document type from SQLite.
-    Returns a list of document metadata dictionaries.
-    For full details, one would then call get_document_details_by_id for each.
+    Returns a list of document metadata dictionaries, newest first.
+    With `include_details=True` each entry is instead the full details dict (as returned
+    by `get_document_details_by_id`), fetched in the same single query.
     """
     conn = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        query = "SELECT id, file_name, processing_status, document_type_classified, upload_timestamp FROM documents WHERE 1=1"
+        if include_details:
+            query = _DETAILS_SELECT + " WHERE 1=1"
+            column_prefix = "d."
+        else:
+            query = "SELECT id, file_name, processing_status, document_type_classified, upload_timestamp FROM documents WHERE 1=1"
+            column_prefix = ""
         params = []
 
         if status:
-            query += " AND processing_status = ?"
+            query += f" AND {column_prefix}processing_status = ?"
             params.append(status)
         if doc_type:
-            query += " AND document_type_classified = ?"
+            query += f" AND {column_prefix}document_type_classified = ?"
             params.append(doc_type)
 
-        query += " ORDER BY upload_timestamp DESC LIMIT ?"
+        query += f" ORDER BY {column_prefix}upload_timestamp DESC, {column_prefix}id DESC LIMIT ?"
         params.append(limit)
 
         cursor.execute(query, tuple(params))
         rows = cursor.fetchall()
 
-        documents_summary = []
-        for row in rows:
-            documents_summary.append(dict(row)) # Convert sqlite3.Row to dict
-        return documents_summary
+        if include_details:
+            return [_row_to_details(row) for row in rows]
+        return [dict(row) for row in rows] # Convert sqlite3.Row to dict
 
     except Exception as e:
         logger.error(f"Error finding documents in SQLite: {e}", exc_info=True)
@@ -193,6 +225,213 @@ def find_documents(status: Optional[str] = None, doc_type: Optional[str] = None,
         if conn:
             conn.close()
 
+def encode_cursor(upload_timestamp: str, doc_id: str) -> str:
+    """Encodes the position after a document as an opaque, URL-safe pagination cursor."""
+    raw = json.dumps([upload_timestamp, doc_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decodes a cursor from `encode_cursor`. Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        upload_timestamp, doc_id = json.loads(raw)
+        if not isinstance(upload_timestamp, str) or not isinstance(doc_id, str):
+            raise TypeError("cursor fields must be strings")
+        return upload_timestamp, doc_id
+    except Exception as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from e
+
+def _documents_page_query(status: Optional[str], doc_type: Optional[str], after: Optional[Tuple[str, str]],
+                          page_size: int, include_details: bool) -> Tuple[str, tuple]:
+    """The SQL and parameters of one `find_documents_page` page (one row more than `page_size`)."""
+    if include_details:
+        query = _DETAILS_SELECT + " WHERE 1=1"
+    else:
+        query = "SELECT d.id, d.file_name, d.processing_status, d.document_type_classified, d.upload_timestamp FROM documents d WHERE 1=1"
+    params: List[Any] = []
+
+    if status:
+        query += " AND d.processing_status = ?"
+        params.append(status)
+    if doc_type:
+        query += " AND d.document_type_classified = ?"
+        params.append(doc_type)
+    if after:
+        query += " AND (d.upload_timestamp, d.id) < (?, ?)"
+        params.extend(after)
+
+    query += " ORDER BY d.upload_timestamp DESC, d.id DESC LIMIT ?"
+    params.append(page_size + 1) # One extra row tells whether another page exists
+    return query, tuple(params)
+
+def find_documents_page(status: Optional[str] = None, doc_type: Optional[str] = None, page_size: int = 100,
+                        cursor: Optional[str] = None, include_details: bool = False) -> Dict[str, Any]:
+    """
+    Keyset-paginated version of `find_documents` (newest first). Each page seeks directly
+    to its position through the (filter, upload_timestamp, id) indexes, so deep pages cost
+    the same as the first one.
+    :param cursor: `next_cursor` of the previous page; None for the first page.
+    :return: {"documents": [...], "next_cursor": str or None when there are no more pages}.
+    :raises ValueError: If `cursor` is malformed.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    conn = None
+    try:
+        conn = get_db_connection()
+        query, params = _documents_page_query(status, doc_type, after, page_size, include_details)
+        rows = conn.execute(query, params).fetchall()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1]["upload_timestamp"], rows[-1]["id"]) if has_more else None
+        documents = [_row_to_details(row) for row in rows] if include_details else [dict(row) for row in rows]
+        return {"documents": documents, "next_cursor": next_cursor}
+
+    except Exception as e:
+        logger.error(f"Error paginating documents in SQLite: {e}", exc_info=True)
+        return {"documents": [], "next_cursor": None}
+    finally:
+        if conn:
+            conn.close()
+
+def iter_documents_with_raw_text(doc_type: Optional[str] = None, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Streams every document whose OCR text was archived (`raw_text_path` set), with its
+    stored extraction and validation results, in id order. See `iter_stored_documents`.
+    """
+    return iter_stored_documents(doc_type, page_size, raw_text_only=True)
+
+def iter_stored_documents(doc_type: Optional[str] = None, page_size: int = 1000,
+                          raw_text_only: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Streams stored documents with their stored extraction and validation results, in
+    id order. Pages are read by keyset on the primary key, each with its own short-lived
+    connection, so a scan over millions of rows neither holds a read transaction open
+    nor slows down on later pages.
+    :param doc_type: Only documents classified as this type.
+    :param raw_text_only: Only documents whose OCR text was archived (`raw_text_path` set).
+    :return: Iterator of dicts with id, processing_status, document_type_classified,
+             raw_text_path (None if not archived), fields (dict or None), is_valid,
+             details, classification_confidence and versions (stored stage fingerprints).
+    """
+    after = ""
+    while True:
+        conn = None
+        try:
+            conn = get_db_connection()
+            query = """
+                SELECT d.id, d.processing_status, d.document_type_classified, d.raw_text_path,
+                       d.classification_confidence, d.classifier_version, d.extractor_version, d.validator_version,
+                       ed.data_json, vr.is_overall_valid, vr.results_json
+                FROM documents d
+                LEFT JOIN extracted_data ed ON ed.document_id = d.id
+                LEFT JOIN validation_results vr ON vr.document_id = d.id
+                WHERE d.id > ?
+            """
+            params: List[Any] = [after]
+            if raw_text_only:
+                query += " AND d.raw_text_path IS NOT NULL"
+            if doc_type:
+                query += " AND d.document_type_classified = ?"
+                params.append(doc_type)
+            query += " ORDER BY d.id LIMIT ?"
+            params.append(page_size)
+            rows = conn.execute(query, tuple(params)).fetchall()
+        except Exception as e:
+            logger.error(f"Error reading stored documents from SQLite: {e}", exc_info=True)
+            return
+        finally:
+            if conn:
+                conn.close()
+
+        for row in rows:
+            yield {
+                "id": row["id"],
+                "processing_status": row["processing_status"],
+                "document_type_classified": row["document_type_classified"],
+                "raw_text_path": row["raw_text_path"],
+                "fields": json.loads(row["data_json"]) if row["data_json"] else None,
+                "is_valid": bool(row["is_overall_valid"]) if row["is_overall_valid"] is not None else None,
+                "details": json.loads(row["results_json"]) if row["results_json"] else None,
+                "classification_confidence": row["classification_confidence"],
+                "versions": {"classifier": row["classifier_version"], "extractor": row["extractor_version"],
+                             "validator": row["validator_version"]},
+            }
+        if len(rows) < page_size:
+            return
+        after = rows[-1]["id"]
+
+# Grouping keys accepted by `get_stage_latency_percentiles`, and their SQL expressions.
+# Timestamps are ISO 8601 text, so the day is their first ten characters.
+_LATENCY_GROUPS = {
+    "stage": "stage",
+    "document_type": "document_type",
+    "day": "substr(started_timestamp, 1, 10)",
+}
+_LATENCY_CLOCKS = {"wall": "wall_seconds", "cpu": "cpu_seconds"}
+_LATENCY_PERCENTILES = (50, 95, 99)
+
+def get_stage_latency_percentiles(group_by: Iterable[str] = ("stage",), stage: Optional[str] = None,
+                                  doc_type: Optional[str] = None, since: Optional[str] = None,
+                                  until: Optional[str] = None, clock: str = "wall") -> List[Dict[str, Any]]:
+    """
+    Latency percentiles (p50, p95, p99) of the stage timings in `processing_events`,
+    computed in SQL with window functions. Percentiles use the nearest-rank method, so
+    each one is an observed duration.
+    :param group_by: Any of "stage", "document_type" and "day" (YYYY-MM-DD of the stage's start).
+    :param stage: Only this stage (ocr, classification, extraction, validation, total).
+    :param doc_type: Only documents classified as this type.
+    :param since: Only stages started at or after this ISO timestamp (or date).
+    :param until: Only stages started before this ISO timestamp (or date).
+    :param clock: "wall" or "cpu" seconds.
+    :return: One dict per group, ordered by the group keys, with the group keys and
+             count, mean, max, p50, p95 and p99 (seconds).
+    :raises ValueError: If a grouping key or the clock is unknown.
+    """
+    group_by = list(dict.fromkeys(group_by))
+    unknown = [key for key in group_by if key not in _LATENCY_GROUPS]
+    if unknown or clock not in _LATENCY_CLOCKS:
+        raise ValueError(f"Unknown grouping key(s) {unknown} or clock {clock!r}; "
+                         f"expected keys from {list(_LATENCY_GROUPS)} and a clock from {list(_LATENCY_CLOCKS)}.")
+
+    conditions, params = [], []
+    for column, value in (("stage = ?", stage), ("document_type = ?", doc_type),
+                          ("started_timestamp >= ?", since), ("started_timestamp < ?", until)):
+        if value is not None:
+            conditions.append(column)
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    group_columns = "".join(f"{_LATENCY_GROUPS[key]} AS {key}, " for key in group_by)
+    partition = f"PARTITION BY {', '.join(group_by)}" if group_by else ""
+    grouping = f"GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}" if group_by else ""
+    # Nearest rank: the p-th percentile is the smallest value whose position is >= p% of the count
+    percentiles = "".join(
+        f", MIN(CASE WHEN position * 100 >= {p} * total THEN seconds END) AS p{p}" for p in _LATENCY_PERCENTILES
+    )
+    query = f"""
+        WITH events AS (
+            SELECT {group_columns}{_LATENCY_CLOCKS[clock]} AS seconds
+            FROM processing_events {where}
+        ), ranked AS (
+            SELECT *, ROW_NUMBER() OVER ({partition} ORDER BY seconds) AS position,
+                      COUNT(*) OVER ({partition}) AS total
+            FROM events
+        )
+        SELECT {"".join(f"{key}, " for key in group_by)}COUNT(*) AS count, AVG(seconds) AS mean, MAX(seconds) AS max
+               {percentiles}
+        FROM ranked {grouping}
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        rows = conn.execute(query, tuple(params)).fetchall()
+        return [dict(row) for row in rows if row["count"]] # Without groups, an empty table yields one row of NULLs
+    except Exception as e:
+        logger.error(f"Error computing stage latency percentiles in SQLite: {e}", exc_info=True)
+        return []
+    finally:
+        if conn:
+            conn.close()
+
 # Example usage (simulation)
 if __name__ == '__main__':
     # Requires database.py to have run initialize_database() and insert.py to have added data
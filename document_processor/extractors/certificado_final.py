@@ -1,23 +1,15 @@
 from document_processor.base.base_extractor import BaseExtractor
-import re
+from document_processor.base.extraction_rules import ExtractionRuleSet, KeywordField, RegexField
+
+# Compiled once at import; see base/extraction_rules.py
+CERTIFICADO_FINAL_RULES = ExtractionRuleSet([
+    KeywordField("firmas", all_of=("director de obra", "director de ejecución")),
+    RegexField("fecha", (r"\b(\d{2}/\d{2}/\d{4})\b",)),
+    KeywordField("observaciones", any_of=("observaciones", "reparos")),
+], name="certificado_final")
 
 class CertificadoFinalExtractor(BaseExtractor):
-    def __init__(self, bucket_name: str, document_key: str):
-        super().__init__(bucket_name, document_key)
+    rules = CERTIFICADO_FINAL_RULES
 
     def extract(self) -> dict:
-        return {
-            "firmas": self._extraer_firmas(),
-            "fecha": self._extraer_fecha(),
-            "observaciones": self._extraer_observaciones()
-        }
-
-    def _extraer_firmas(self):
-        return "director de obra" in self.text.lower() and "director de ejecución" in self.text.lower()
-
-    def _extraer_fecha(self):
-        match = re.search(r"\b(\d{2}/\d{2}/\d{4})\b", self.text)
-        return match.group(1) if match else None
-
-    def _extraer_observaciones(self):
-        return "observaciones" in self.text.lower() or "reparos" in self.text.lower()
+        return self.rules.extract(self.context)
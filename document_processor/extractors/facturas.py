@@ -1,9 +1,45 @@
 from document_processor.base.base_extractor import BaseExtractor
+from document_processor.base.extraction_rules import ConstantField, ExtractionRuleSet, RegexField
+from typing import Optional
 import re
 
+def _parse_importe(value: str) -> Optional[float]:
+    # Clean up the extracted number (remove currency, convert comma to dot for float)
+    total_str = value.replace('€', '').replace('$', '').replace('.', '').replace(',', '.')
+    try:
+        return float(total_str)
+    except ValueError:
+        return None
+
+# Example fields for an invoice:
+# - Numero de factura (Invoice number)
+# - Fecha de emision (Issue date)
+# - Fecha de vencimiento (Due date)
+# - Datos del emisor (Sender details: Nombre, NIF/CIF, Direccion)
+# - Datos del receptor (Receiver details: Nombre, NIF/CIF, Direccion)
+# - Lineas de factura (Invoice lines: Descripcion, Cantidad, Precio Unitario, Total Linea)
+# - Base imponible (Taxable base)
+# - IVA (VAT amount and percentage)
+# - Total factura (Total amount)
+# Compiled once at import; see base/extraction_rules.py
+FACTURA_RULES = ExtractionRuleSet([
+    # Example: "Factura Nº XXXXX" or "Invoice # XXXXX"
+    RegexField("numero_factura", (r"(?:factura n[ºo\.]?|invoice #)\s*([a-z0-9\-]+)",), flags=re.IGNORECASE),
+    # A date near "Fecha Factura" or "Date"; otherwise the first generic date, which might not be the invoice date.
+    # This is highly dependent on document layout.
+    RegexField("fecha_emision", (
+        r"(?:fecha factura|date)[:\s]*(\d{2}[-/]\d{2}[-/]\d{4})",
+        r"(\d{2}/\d{2}/\d{4})",
+    ), flags=re.IGNORECASE),
+    # "Total EUR", "Total:", "Amount Due" followed by a number
+    RegexField("total_factura", (r"(?:total|total factura|importe total|amount due)\s*[:€$]?\s*([\d\.,]+)",),
+               flags=re.IGNORECASE, transform=_parse_importe),
+    ConstantField("emisor_nombre", "Placeholder Emisor S.L."), # Placeholder
+    ConstantField("receptor_nombre", "Placeholder Cliente S.A."), # Placeholder
+], name="factura")
+
 class FacturaExtractor(BaseExtractor):
-    def __init__(self, bucket_name: str, document_key: str):
-        super().__init__(bucket_name, document_key)
+    rules = FACTURA_RULES
 
     def extract(self) -> dict:
         """
@@ -11,54 +47,7 @@ class FacturaExtractor(BaseExtractor):
         This is a placeholder and needs to be implemented with actual
         extraction logic for invoices.
         """
-        # Example fields for an invoice:
-        # - Numero de factura (Invoice number)
-        # - Fecha de emision (Issue date)
-        # - Fecha de vencimiento (Due date)
-        # - Datos del emisor (Sender details: Nombre, NIF/CIF, Direccion)
-        # - Datos del receptor (Receiver details: Nombre, NIF/CIF, Direccion)
-        # - Lineas de factura (Invoice lines: Descripcion, Cantidad, Precio Unitario, Total Linea)
-        # - Base imponible (Taxable base)
-        # - IVA (VAT amount and percentage)
-        # - Total factura (Total amount)
-
-        # Placeholder logic:
-        return {
-            "numero_factura": self._extraer_numero_factura(),
-            "fecha_emision": self._extraer_fecha_emision(),
-            "total_factura": self._extraer_total(),
-            "emisor_nombre": "Placeholder Emisor S.L.", # Placeholder
-            "receptor_nombre": "Placeholder Cliente S.A." # Placeholder
-        }
-
-    def _extraer_numero_factura(self):
-        # Example: search for "Factura Nº XXXXX" or "Invoice # XXXXX"
-        match = re.search(r"(?:Factura N[ºo\.]?|Invoice #)\s*([A-Za-z0-9\-]+)", self.text, re.IGNORECASE)
-        return match.group(1) if match else None
-
-    def _extraer_fecha_emision(self):
-        # Example: search for common date patterns near "Fecha Factura" or "Date"
-        # This is highly dependent on document layout.
-        match = re.search(r"(?:Fecha Factura|Date)[:\s]*(\d{2}[-/]\d{2}[-/]\d{4})", self.text, re.IGNORECASE)
-        if match:
-            return match.group(1)
-        # Try another common format or keyword
-        match = re.search(r"(\d{2}/\d{2}/\d{4})", self.text) # A generic date, might not be the invoice date
-        return match.group(1) if match else None
-
-
-    def _extraer_total(self):
-        # Example: search for "Total EUR", "Total:", "Amount Due" followed by a number
-        # This requires careful regex to capture currency symbols and decimal points
-        match = re.search(r"(?:TOTAL|Total Factura|Importe Total|Amount Due)\s*[:€$]?\s*([\d\.,]+)", self.text, re.IGNORECASE)
-        if match:
-            # Clean up the extracted number (remove currency, convert comma to dot for float)
-            total_str = match.group(1).replace('€', '').replace('$', '').replace('.', '').replace(',', '.')
-            try:
-                return float(total_str)
-            except ValueError:
-                return None
-        return None
+        return self.rules.extract(self.context)
 
 if __name__ == '__main__':
     sample_invoice_text = """
@@ -76,36 +65,19 @@ if __name__ == '__main__':
     IVA (21%): 42.00
     Total Factura: 242.00 EUR
     """
-    # The __main__ block needs to be updated or removed as it relies on old constructor
-    # For now, let's comment it out or adapt it if we have sample S3 documents.
-    # extractor = FacturaExtractor("some-bucket", "some-key/sample_invoice_text.pdf")
-    # data = extractor.extract()
-    # print("Extracted Invoice Data (Placeholder):")
-    pass # Placeholder for now
-    # for key, value in data.items():
-    #     print(f"- {key}: {value}")
-
-    # sample_invoice_text_2 = """
-    # Invoice # INV-789
-    # Date: 01/01/2024
-    # Amount Due $ 150.55
-    # """
-    # extractor_2 = FacturaExtractor("some-bucket", "some-key/sample_invoice_text_2.pdf")
-    # data_2 = extractor_2.extract()
-    # print("\nExtracted Invoice Data 2 (Placeholder):")
-    # for key, value in data_2.items():
-    #     print(f"- {key}: {value}")
-    print("FacturaExtractor __main__ block needs update for S3 functionality.")
-    # for key, value in data.items(): # data is commented out
-    #     print(f"- {key}: {value}")
+    extractor = FacturaExtractor(sample_invoice_text)
+    data = extractor.extract()
+    print("Extracted Invoice Data:")
+    for key, value in data.items():
+        print(f"- {key}: {value}")
 
-    # sample_invoice_text_2 = """
+    sample_invoice_text_2 = """
     Invoice # INV-789
     Date: 01/01/2024
     Amount Due $ 150.55
     """
     extractor_2 = FacturaExtractor(sample_invoice_text_2)
     data_2 = extractor_2.extract()
-    print("\nExtracted Invoice Data 2 (Placeholder):")
+    print("\nExtracted Invoice Data 2:")
     for key, value in data_2.items():
         print(f"- {key}: {value}")
@@ -1,9 +1,28 @@
 from document_processor.base.base_extractor import BaseExtractor
+from document_processor.base.extraction_rules import ConstantField, ExtractionRuleSet, RegexField
 import re
 
+def _resumen_snippet(value: str) -> str:
+    return value.strip()[:500] + "..." # Return a snippet
+
+# Compiled once at import; see base/extraction_rules.py
+MEMORIA_ACTUACION_RULES = ExtractionRuleSet([
+    # Example: lines starting with "Título:", "Proyecto:", "Actuación:"
+    RegexField("titulo_proyecto", (r"^(?:título del proyecto|proyecto|actuación)[:\s]*(.+)$",),
+               flags=re.IGNORECASE | re.MULTILINE, transform=str.strip),
+    # Example: "Fecha de Elaboración:" or a date near the title
+    RegexField("fecha_elaboracion", (r"(?:fecha de elaboración|fecha)[:\s]*(\d{2}[-/]\d{2}[-/]\d{4})",),
+               flags=re.IGNORECASE),
+    ConstantField("entidad_promotora", "Placeholder Entidad"), # Placeholder
+    # Text after a "Resumen Ejecutivo" / "Resumen" heading, up to the next heading.
+    # This is complex as it might span multiple paragraphs.
+    RegexField("resumen", (r"(?:resumen ejecutivo|resumen)\s*[:\n](.*?)(?:\n\n\w+[:\n]|\Z)",),
+               flags=re.IGNORECASE | re.DOTALL | re.MULTILINE, transform=_resumen_snippet,
+               default="Resumen no encontrado o lógica no implementada."),
+], name="memoria_actuacion")
+
 class MemoriaActuacionExtractor(BaseExtractor):
-    def __init__(self, bucket_name: str, document_key: str):
-        super().__init__(bucket_name, document_key)
+    rules = MEMORIA_ACTUACION_RULES
 
     def extract(self) -> dict:
         """
@@ -23,33 +42,7 @@ class MemoriaActuacionExtractor(BaseExtractor):
         - Descripción de la Actuación (Description of Action)
         - Resultados Esperados/Obtenidos (Expected/Obtained Results)
         """
-        # Placeholder logic:
-        return {
-            "titulo_proyecto": self._extraer_titulo(),
-            "fecha_elaboracion": self._extraer_fecha(),
-            "entidad_promotora": "Placeholder Entidad", # Placeholder
-            "resumen": self._extraer_resumen() # Placeholder
-        }
-
-    def _extraer_titulo(self):
-        # Example: search for lines starting with "Título:", "Proyecto:", "Actuación:"
-        match = re.search(r"^(?:Título del Proyecto|Proyecto|Actuación)[:\s]*(.+)$", self.text, re.IGNORECASE | re.MULTILINE)
-        return match.group(1).strip() if match else None
-
-    def _extraer_fecha(self):
-        # Example: search for "Fecha de Elaboración:" or a date near the title
-        match = re.search(r"(?:Fecha de Elaboración|Fecha)[:\s]*(\d{2}[-/]\d{2}[-/]\d{4})", self.text, re.IGNORECASE)
-        return match.group(1) if match else None
-
-    def _extraer_resumen(self):
-        # Example: look for a section titled "Resumen Ejecutivo" or "Resumen"
-        # This is complex as it might span multiple paragraphs.
-        # A simple approach might be to capture text after a "Resumen" heading.
-        match = re.search(r"(?:Resumen Ejecutivo|Resumen)\s*[:\n](.*?)(?:\n\n\w+[:\n]|\Z)", self.text, re.IGNORECASE | re.DOTALL | re.MULTILINE)
-        if match:
-            return match.group(1).strip()[:500] + "..." # Return a snippet
-        return "Resumen no encontrado o lógica no implementada."
-
+        return self.rules.extract(self.context)
 
 if __name__ == '__main__':
     sample_memoria_text = """
@@ -67,25 +60,22 @@ if __name__ == '__main__':
     1. Introducción
     ...
     """
-    # The __main__ block needs to be updated or removed as it relies on old constructor
-    # For now, let's comment it out or adapt it if we have sample S3 documents.
-    # extractor = MemoriaActuacionExtractor("some-bucket", "some-key/sample_memoria_text.pdf")
-    # data = extractor.extract()
-    # print("Extracted Memoria de Actuación Data (Placeholder):")
-    # for key, value in data.items():
-    #     print(f"- {key}: {value}")
+    extractor = MemoriaActuacionExtractor(sample_memoria_text)
+    data = extractor.extract()
+    print("Extracted Memoria de Actuación Data:")
+    for key, value in data.items():
+        print(f"- {key}: {value}")
 
-    # sample_memoria_text_2 = """
-    # Proyecto: Mejora Eficiencia Energética
-    # Fecha: 01/02/2023
+    sample_memoria_text_2 = """
+Proyecto: Mejora Eficiencia Energética
+Fecha: 01/02/2023
 
-    # Resumen
-    # Este proyecto busca reducir el consumo energético en un 20%.
-    # Se implementarán nuevas tecnologías y se optimizarán procesos.
-    # """
-    # extractor_2 = MemoriaActuacionExtractor("some-bucket", "some-key/sample_memoria_text_2.pdf")
-    # data_2 = extractor_2.extract()
-    # print("\nExtracted Memoria de Actuación Data 2 (Placeholder):")
-    # for key, value in data_2.items():
-    #     print(f"- {key}: {value}")
-    print("MemoriaActuacionExtractor __main__ block needs update for S3 functionality.")
+Resumen
+Este proyecto busca reducir el consumo energético en un 20%.
+Se implementarán nuevas tecnologías y se optimizarán procesos.
+"""
+    extractor_2 = MemoriaActuacionExtractor(sample_memoria_text_2)
+    data_2 = extractor_2.extract()
+    print("\nExtracted Memoria de Actuación Data 2:")
+    for key, value in data_2.items():
+        print(f"- {key}: {value}")
@@ -17,6 +17,17 @@
 # for documents uploaded via HTTP. `main.py` could be used for batch processing
 # or other non-API driven workflows.
 
+import argparse
+import json
+import logging
+import sys
+from typing import Iterable, Iterator
+
+from document_processor.batch import BatchPipelineRunner, DEFAULT_OCR_WORKERS
+from document_processor.config import LOG_LEVEL, LOG_FORMAT, DB_BULK_BATCH_SIZE
+from document_processor.models import ProcessedDocument
+from document_processor.reextract import DEFAULT_CHUNK_SIZE as DEFAULT_REEXTRACT_CHUNK_SIZE, ReextractionRunner
+
 # Example (conceptual):
 # from pipeline import DocumentProcessingPipeline
 # from config import WATCHED_FOLDER, PROCESSED_FOLDER, ERROR_FOLDER
@@ -27,6 +38,7 @@
 # def setup_logging():
 #     # Basic logging setup, could be more sophisticated using config.py
 #     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# (See `setup_logging` below for the version used by the batch CLI.)
 
 # def process_single_document(doc_path, file_name, file_type):
 #     logging.info(f"Processing document: {doc_path}")
@@ -60,9 +72,129 @@
 #         time.sleep(10) # Check every 10 seconds
 
 
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Document Processor batch runner")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser("batch", help="Process many documents concurrently.")
+    batch.add_argument("documents", nargs="*", help="Local paths, s3:// URIs, or S3 keys when --bucket is given.")
+    batch.add_argument("--from-file", help="Read additional documents from this file, one per line.")
+    batch.add_argument("--bucket", help="S3 bucket for documents given as plain keys.")
+    batch.add_argument("--ocr-workers", type=int, default=DEFAULT_OCR_WORKERS,
+                       help="Documents OCR'd concurrently (I/O-bound stage).")
+    batch.add_argument("--cpu-workers", type=int, default=None,
+                       help="Processes for classification/extraction/validation (default: CPU count, 0 = inline).")
+    batch.add_argument("--max-in-flight", type=int, default=None,
+                       help="Maximum documents in progress at once (default: 2 x --ocr-workers).")
+    batch.add_argument("--store", action="store_true",
+                       help="Persist results in the SQLite database (bulk inserts).")
+    batch.add_argument("--store-batch-size", type=int, default=DB_BULK_BATCH_SIZE,
+                       help="Documents per database transaction with --store.")
+
+    reextract = subparsers.add_parser("reextract",
+                                      help="Re-run classification/extraction/validation over archived OCR text.")
+    reextract.add_argument("--document-type", help="Only documents currently classified as this type.")
+    reextract.add_argument("--workers", type=int, default=None,
+                           help="Worker processes (default: CPU count, 0 = inline).")
+    reextract.add_argument("--chunk-size", type=int, default=DEFAULT_REEXTRACT_CHUNK_SIZE,
+                           help="Documents per worker task.")
+    reextract.add_argument("--dry-run", action="store_true", help="Report the diff without writing it.")
+    reextract.add_argument("--diff-out", help="Write one JSON line per changed document to this file.")
+    reextract.add_argument("--store-batch-size", type=int, default=DB_BULK_BATCH_SIZE,
+                           help="Changed documents per database transaction.")
+    reextract.add_argument("--incremental", action="store_true",
+                           help="Only re-run the stages whose classifier/extractor/validator version changed.")
+    return parser
+
+
+def iter_batch_inputs(args) -> Iterator[str]:
+    """Yields document locations from the command line and --from-file, lazily."""
+    def to_location(document: str) -> str:
+        if args.bucket and not document.startswith("s3://"):
+            return f"s3://{args.bucket}/{document.lstrip('/')}"
+        return document
+
+    for document in args.documents:
+        yield to_location(document)
+    if args.from_file:
+        with open(args.from_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield to_location(line.strip())
+
+
+def run_batch(args) -> int:
+    """Runs the batch pipeline and prints one JSON line per document as it finishes."""
+    runner = BatchPipelineRunner(
+        ocr_workers=args.ocr_workers,
+        cpu_workers=args.cpu_workers,
+        max_in_flight=args.max_in_flight,
+    )
+    failed = 0
+
+    def report(results: Iterable[ProcessedDocument]) -> Iterator[ProcessedDocument]:
+        nonlocal failed
+        for result in results:
+            if result.metadata.processing_status.startswith("error"):
+                failed += 1
+            print(json.dumps({
+                "document_id": result.metadata.document_id,
+                "file_name": result.metadata.file_name,
+                "status": result.metadata.processing_status,
+                "error_message": result.metadata.error_message,
+                "document_type": result.extracted_data.document_type if result.extracted_data else None,
+            }, ensure_ascii=False), flush=True)
+            yield result
+
+    results = report(runner.run(iter_batch_inputs(args)))
+    if args.store:
+        from document_processor.db.database import initialize_database
+        from document_processor.db.insert import store_documents_bulk
+        initialize_database()
+        stored = store_documents_bulk(results, batch_size=args.store_batch_size)
+        logging.info(f"Stored {stored} document(s) in the database.")
+    else:
+        for _ in results:
+            pass
+    logging.info(f"Batch finished with {failed} failed document(s).")
+    return 1 if failed else 0
+
+
+def run_reextract(args) -> int:
+    """Re-extracts stored documents and prints the report as JSON."""
+    from document_processor.db.database import initialize_database
+    initialize_database()
+    runner = ReextractionRunner(workers=args.workers, chunk_size=args.chunk_size,
+                                store=not args.dry_run, store_batch_size=args.store_batch_size,
+                                incremental=args.incremental)
+    diff_file = open(args.diff_out, "w", encoding="utf-8") if args.diff_out else None
+    try:
+        def write_diff(outcome):
+            diff_file.write(json.dumps({"document_id": outcome["id"], "changes": outcome["changes"]}, ensure_ascii=False) + "\n")
+        report = runner.run(doc_type=args.document_type, on_change=write_diff if diff_file else None)
+    finally:
+        if diff_file:
+            diff_file.close()
+    print(json.dumps(report.as_dict(), ensure_ascii=False, indent=2))
+    return 1 if report.outcomes["error"] else 0
+
+
+def setup_logging():
+    logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT, stream=sys.stderr)
+
+
 if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    if args.command == "batch":
+        setup_logging()
+        sys.exit(run_batch(args))
+    if args.command == "reextract":
+        setup_logging()
+        sys.exit(run_reextract(args))
+
     print("Document Processor Main Orchestrator - Conceptual")
-    print("This script would typically run a batch process or watch a folder.")
+    print("Run 'python -m document_processor.main batch <paths...>' to process documents in batch.")
+    print("Run 'python -m document_processor.main reextract' to re-process stored documents from their archived text.")
     print("For API interaction, run 'uvicorn api:app --reload' from 'document_processor' directory.")
     # To run a folder watching example (conceptual):
     # Ensure WATCHED_FOLDER, PROCESSED_FOLDER, ERROR_FOLDER are defined in config.py
@@ -71,4 +203,3 @@ if __name__ == "__main__":
     #     watch_folder_for_processing()
     # except KeyboardInterrupt:
     #     print("Shutting down document processor.")
-    pass
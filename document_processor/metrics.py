@@ -0,0 +1,243 @@
+# Métricas de rendimiento del pipeline (tiempos por etapa, histogramas, perfiles)
+
+# The pipeline records wall and CPU time for every stage (OCR, classification,
+# extraction, validation) and for every extractor field rule into histograms, which the
+# API exports in the Prometheus text format at `/metrics`. Percentiles (p50/p95/p99)
+# per stage come from the histogram buckets on the Prometheus side.
+# The SQLite connection pool (db/database.py) records its acquire times here too.
+#
+# CPU time is the calling thread's (`time.thread_time`), since pipelines run on worker
+# threads. Metrics live in the process that records them: documents processed in the
+# batch runner's worker processes are not visible to the API's `/metrics`.
+#
+# For the documents behind a slow percentile, a fraction of pipeline runs can be
+# profiled (PROFILE_SAMPLE_RATE): with cProfile by default, or pyinstrument if selected
+# and installed. Profiles are written to PROFILE_DIR, or logged if it is not set.
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import io
+import logging
+import os
+import random
+import threading
+import time
+
+from document_processor.config import (
+    METRICS_FIELD_TIMING, PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILER,
+)
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the histogram buckets, from sub-millisecond rules to long OCR jobs
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class _Series:
+    __slots__ = ("bucket_counts", "count", "sum")
+
+    def __init__(self, bucket_count: int):
+        self.bucket_counts = [0] * (bucket_count + 1) # Last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram:
+    """A Prometheus-style histogram with labels. Thread-safe."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        self.observe_many(((value, label_values),))
+
+    def observe_many(self, observations: Iterable[Tuple[float, Tuple[str, ...]]]):
+        """Records several (value, label values) observations under one lock acquisition."""
+        buckets = self.buckets
+        with self._lock:
+            for value, label_values in observations:
+                series = self._series.get(label_values)
+                if series is None:
+                    series = self._series[label_values] = _Series(len(buckets))
+                series.bucket_counts[bisect_left(buckets, value)] += 1
+                series.count += 1
+                series.sum += value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[List[int], int, float]]:
+        """{label values: (non-cumulative bucket counts, count, sum)}."""
+        with self._lock:
+            return {labels: (list(s.bucket_counts), s.count, s.sum) for labels, s in self._series.items()}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (bucket_counts, count, total) in sorted(self.snapshot().items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, label_values))
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total!r}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str],
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Returns the histogram `name`, creating it on first use."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, documentation, label_names, buckets)
+            return metric
+
+    def clear(self):
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "document_processor_stage_seconds", "Wall and CPU time per pipeline stage.", ("stage", "clock"),
+)
+FIELD_RULE_SECONDS = REGISTRY.histogram(
+    "document_processor_field_rule_seconds", "Wall and CPU time per extractor field rule.", ("rules", "field", "clock"),
+)
+
+DB_ACQUIRE_SECONDS = REGISTRY.histogram(
+    "document_processor_db_acquire_seconds", "Time to get a connection from the SQLite pool.", ("database",),
+)
+
+
+class StageTiming(NamedTuple):
+    stage: str
+    wall_seconds: float
+    cpu_seconds: float
+    started: float # Unix time at which the stage started
+
+
+@contextmanager
+def stage_timer(stage: str, timings: Optional[List[StageTiming]] = None) -> Iterator[None]:
+    """
+    Times the enclosed block as pipeline stage `stage` (also when it raises), records it
+    in STAGE_SECONDS and appends it to `timings`, if given.
+    """
+    started, wall_start, cpu_start = time.time(), time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+        STAGE_SECONDS.observe_many(((wall, (stage, "wall")), (cpu, (stage, "cpu"))))
+        if timings is not None:
+            timings.append(StageTiming(stage, wall, cpu, started))
+
+
+def field_timing_enabled() -> bool:
+    return METRICS_FIELD_TIMING
+
+
+def record_field_rules(rules: str, timings: Sequence[Tuple[str, float, float]]):
+    """Records (field, wall seconds, CPU seconds) timings of one extraction with rule set `rules`."""
+    FIELD_RULE_SECONDS.observe_many(
+        observation for field, wall, cpu in timings
+        for observation in ((wall, (rules, field, "wall")), (cpu, (rules, field, "cpu")))
+    )
+
+
+@contextmanager
+def maybe_profile(document_id: str, sample_rate: Optional[float] = None) -> Iterator[bool]:
+    """
+    Profiles the enclosed block for a random `sample_rate` fraction of calls (default
+    PROFILE_SAMPLE_RATE) and yields whether this call is profiled. One run is profiled
+    at a time: profilers are per-interpreter, so a sampled run that overlaps another is
+    left unprofiled.
+    """
+    rate = PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or random.random() >= rate or not _profiling.acquire(blocking=False):
+        yield False
+        return
+    try:
+        with _profile(document_id):
+            yield True
+    finally:
+        _profiling.release()
+
+
+_profiling = threading.Lock()
+
+
+@contextmanager
+def _profile(document_id: str) -> Iterator[None]:
+    if PROFILER == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed; profiling with cProfile instead.")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                html = profiler.output_html()
+                _save_profile(document_id, ".html", lambda path: _write_text(path, html), profiler.output_text())
+            return
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(25)
+        _save_profile(document_id, ".prof", profiler.dump_stats, summary.getvalue())
+
+
+def _save_profile(document_id: str, extension: str, write: Callable[[str], None], summary: str):
+    """Writes a profile to PROFILE_DIR with `write(path)`, or logs its summary if PROFILE_DIR is not set."""
+    if not PROFILE_DIR:
+        logger.info(f"Profile of {document_id}:\n{summary}")
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{document_id}{extension}")
+    write(path)
+    logger.info(f"Profile of {document_id} written to {path}")
+
+
+def _write_text(path: str, content: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
@@ -20,11 +20,27 @@ class ValidationResult(BaseModel):
     is_valid: bool
     details: Dict[str, Any] # Detailed validation checks
 
+class StageVersions(BaseModel):
+    # Version fingerprints of the logic that produced each stage's stored output (see utils/version_utils.py)
+    classifier: Optional[str] = None
+    extractor: Optional[str] = None
+    validator: Optional[str] = None
+
+class ProcessingEvent(BaseModel):
+    stage: str # ocr, classification, extraction, validation or total
+    started: datetime
+    wall_seconds: float
+    cpu_seconds: float
+
 class ProcessedDocument(BaseModel):
     metadata: DocumentMetadata
     extracted_data: Optional[ExtractedData] = None
     validation_result: Optional[ValidationResult] = None
     raw_text: Optional[str] = None # Store raw text from OCR
+    raw_blocks: Optional[List[Dict[str, Any]]] = None # Raw Textract blocks, archived next to the text (see utils/block_store.py)
+    processing_events: List[ProcessingEvent] = [] # Stage timings of the run, stored in the processing_events table
+    classification_confidence: Optional[float] = None
+    stage_versions: StageVersions = StageVersions()
 
 # Example for a specific document type if needed for API request/response
 class CertificadoFinalData(BaseModel):
@@ -21,28 +21,51 @@
 #
 # This processed data can then be queried via the API or used by the RAG system.
 
-# from utils.textract_utils import TextractClient # Assuming Textract client
-# from classifier import DocumentClassifier
-# from processor_factory import get_processor
+from document_processor.utils.textract_utils import TextractClient
+from document_processor.classifier import DocumentClassifier
+from document_processor.context import DocumentContext
+from document_processor.db.checkpoints import CHECKPOINT_STAGES, load_checkpoint, save_checkpoint
+from document_processor.metrics import StageTiming, maybe_profile, stage_timer
+from document_processor.processor_factory import get_processor
 # from db.insert import store_document_data # Assuming DB insert functions
-# from models import ProcessedDocument, DocumentMetadata, ExtractedData, ValidationResult # Pydantic models
-# import uuid
-# from datetime import datetime
-# import logging
+from document_processor.models import ProcessedDocument, DocumentMetadata, ExtractedData, ValidationResult, ProcessingEvent, StageVersions # Pydantic models
+from typing import Any, Callable, Dict, List, Optional
+import uuid
+from datetime import datetime
+import logging
 
 # logging.basicConfig(level=logging.INFO)
-# logger = logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
 
 class DocumentProcessingPipeline:
-    def __init__(self, document_path: str, file_name: str, file_type: str):
+    def __init__(self, document_path: str, file_name: str, file_type: str,
+                 textract_client: Optional[TextractClient] = None,
+                 context: Optional[DocumentContext] = None, document_id: Optional[str] = None,
+                 on_status_change: Optional[Callable[[str, str], None]] = None,
+                 content_sha256: Optional[str] = None, checkpoints: bool = False,
+                 resume_from: Optional[Dict[str, Any]] = None):
         self.document_path = document_path # Could be a local path or S3 URI
         self.file_name = file_name
         self.file_type = file_type
-        self.document_id = str(uuid.uuid4())
+        self.document_id = document_id or str(uuid.uuid4())
+        self.on_status_change = on_status_change # Called as on_status_change(document_id, status)
+        # Save each completed stage's output and resume after the last saved stage (see db/checkpoints.py)
+        self.checkpoints = checkpoints
+        # Outputs of stages that need not run again, shaped like `load_checkpoint`'s result,
+        # plus optional "versions" of those stages (e.g. from rerun_planner.py)
+        self.resume_from = resume_from
 
-        # Initialize clients and components (these would be properly initialized with config)
-        # self.textract_client = TextractClient()
+        # One context per document: OCR and text normalization happen once and are
+        # shared by classification, extraction and validation. A caller that already
+        # has the OCR output (e.g. the batch runner) passes it in as `context`.
+        if context is None:
+            # Initialize clients and components (these would be properly initialized with config)
+            self.textract_client = textract_client or TextractClient()
+            context = DocumentContext.from_document_path(self.document_path, self.textract_client, content_sha256)
+        else:
+            self.textract_client = textract_client
         # self.db_inserter = ... # Instance for DB operations
+        self.context = context
 
         self.metadata = DocumentMetadata(
             document_id=self.document_id,
@@ -52,86 +75,131 @@ class DocumentProcessingPipeline:
             processing_status="pending"
         )
         self.raw_text = None
+        self.stage_timings: List[StageTiming] = [] # Filled by run(), in stage order
         self.extracted_data_model = None
         self.validation_result_model = None
+        self.classification_confidence: Optional[float] = None
+        self.stage_versions = StageVersions() # Fingerprints of the stages whose output the result holds
 
+    def _set_status(self, status: str):
+        self.metadata.processing_status = status
+        if self.on_status_change is not None:
+            try:
+                self.on_status_change(self.document_id, status)
+            except Exception as e: # Progress reporting must never break processing
+                logger.warning(f"Status callback failed for {self.document_id} ({status}): {e}")
 
     def run(self) -> ProcessedDocument:
         """
         Executes the full document processing pipeline.
+        Each stage's wall and CPU time is recorded (see metrics.py) and kept in
+        `stage_timings` and the result's `processing_events`; a sampled fraction of
+        runs is profiled. With `checkpoints`, stages completed by an earlier run of the
+        same document are not run (or timed) again.
         """
+        with maybe_profile(self.document_id):
+            with stage_timer("total", self.stage_timings):
+                result = self._run_stages()
+            result.processing_events = self._processing_events() # Now including "total"
+            return result
+
+    def _run_stages(self) -> ProcessedDocument:
         logger.info(f"Starting processing for document: {self.file_name} (ID: {self.document_id})")
-        self.metadata.processing_status = "processing_ocr"
-        # 1. Extract text using OCR (e.g., AWS Textract)
-        #    This is a placeholder. Actual implementation will call Textract.
-        #    self.raw_text = self.textract_client.extract_text(self.document_path)
-        self.raw_text = f"Simulated extracted text for {self.file_name}. Contenido del documento..."
-        if not self.raw_text:
+        checkpoint = self.resume_from
+        if checkpoint is None and self.checkpoints:
+            checkpoint = load_checkpoint(self.document_id)
+        resumed_versions = (checkpoint or {}).get("versions") or {}
+        # Index in CHECKPOINT_STAGES of the last stage completed by an earlier run; -1 if none
+        resume_after = CHECKPOINT_STAGES.index(checkpoint["stage"]) if checkpoint else -1
+        if checkpoint:
+            logger.info(f"Resuming {self.document_id} after its {checkpoint['stage']} stage")
+            self.context = DocumentContext.from_text(checkpoint["raw_text"], checkpoint["blocks"])
+        self._set_status("processing_ocr")
+        # 1. Extract text using OCR (e.g., AWS Textract). This is the only OCR call for the document.
+        if resume_after >= 0:
+            # May be empty when only validation runs again, on stored fields (see reextract.py)
+            self.raw_text = self.context.text or ""
+        else:
+            with stage_timer("ocr", self.stage_timings):
+                self.raw_text = self.context.text
+            if self.raw_text:
+                self._checkpoint("ocr", raw_text=self.raw_text, blocks=self.context.blocks)
+        if not self.raw_text and resume_after < 0:
             logger.error(f"OCR failed for {self.document_id}")
-            self.metadata.processing_status = "error_ocr"
+            self._set_status("error_ocr")
             self.metadata.error_message = "OCR failed or document is empty."
             # self.store_initial_status() # Store error status
             return self._build_processed_document()
 
         logger.info(f"OCR successful for {self.document_id}. Text length: {len(self.raw_text)}")
-        self.metadata.processing_status = "processing_classification"
+        self._set_status("processing_classification")
 
         # 2. Classify document type
-        # classifier = DocumentClassifier(self.raw_text)
-        # doc_type = classifier.classify()
-        doc_type = "simulated_doc_type" # Placeholder
+        if resume_after >= 1:
+            doc_type = checkpoint["document_type"]
+            self.classification_confidence = checkpoint.get("classification_confidence")
+            self.stage_versions.classifier = resumed_versions.get("classifier") or DocumentClassifier.version_fingerprint()
+        else:
+            with stage_timer("classification", self.stage_timings):
+                classifier = DocumentClassifier(self.context)
+                classification = classifier.classify_with_confidence()
+            doc_type = classification.document_type
+            self.classification_confidence = classification.confidence
+            self.stage_versions.classifier = classifier.engine.fingerprint
+            if doc_type:
+                self._checkpoint("classification", document_type=doc_type,
+                                 classification_confidence=classification.confidence)
         if not doc_type:
             logger.warning(f"Could not classify document {self.document_id}")
-            self.metadata.processing_status = "error_classification"
+            self._set_status("error_classification")
             self.metadata.error_message = "Document type could not be determined."
             # self.store_classification_failure()
             return self._build_processed_document()
 
         logger.info(f"Document {self.document_id} classified as: {doc_type}")
-        self.metadata.processing_status = "processing_extraction"
+        self._set_status("processing_extraction")
 
         # 3. Get appropriate processor (extractor & validator) using Factory
-        # processor = get_processor(doc_type, self.raw_text) # from processor_factory.py
-        # if not processor:
-        #     logger.error(f"No processor found for document type: {doc_type} (ID: {self.document_id})")
-        #     self.metadata.processing_status = "error_no_processor"
-        #     self.metadata.error_message = f"No processor available for document type '{doc_type}'."
-        #     # self.store_processor_failure()
-        #     return self._build_processed_document()
-
-        # Placeholder for processor
-        class MockProcessor:
-            def __init__(self, text, doc_type_name):
-                self.text = text
-                self.doc_type_name = doc_type_name
-            def extract(self): return {"sim_field_1": "value1", "doc_type": self.doc_type_name}
-            def validate(self, data): return {"is_valid": True, "details": {"sim_check": "passed"}}
-
-        processor = MockProcessor(self.raw_text, doc_type)
-
+        processor = get_processor(doc_type, self.context) # from processor_factory.py
+        if not processor:
+            logger.error(f"No processor found for document type: {doc_type} (ID: {self.document_id})")
+            self._set_status("error_no_processor")
+            self.metadata.error_message = f"No processor available for document type '{doc_type}'."
+            # self.store_processor_failure()
+            return self._build_processed_document()
 
         # 4. Extract data
         try:
-            extracted_fields = processor.extract()
+            if resume_after >= 2:
+                extracted_fields = checkpoint["fields"]
+                extractor_version = resumed_versions.get("extractor") or processor.extractor.version_fingerprint()
+            else:
+                with stage_timer("extraction", self.stage_timings):
+                    extracted_fields = processor.extract()
+                extractor_version = processor.extractor.version_fingerprint()
+                self._checkpoint("extraction", fields=extracted_fields)
             self.extracted_data_model = ExtractedData(document_type=doc_type, fields=extracted_fields)
+            self.stage_versions.extractor = extractor_version
             logger.info(f"Data extracted for {self.document_id}: {extracted_fields}")
-            self.metadata.processing_status = "processing_validation"
+            self._set_status("processing_validation")
         except Exception as e:
             logger.error(f"Error during data extraction for {self.document_id} ({doc_type}): {e}", exc_info=True)
-            self.metadata.processing_status = "error_extraction"
+            self._set_status("error_extraction")
             self.metadata.error_message = f"Extraction failed: {str(e)}"
             # self.store_extraction_failure()
             return self._build_processed_document()
 
         # 5. Validate data
         try:
-            validation_output = processor.validate(self.extracted_data_model.fields)
+            with stage_timer("validation", self.stage_timings):
+                validation_output = processor.validate(self.extracted_data_model.fields)
             self.validation_result_model = ValidationResult(**validation_output)
+            self.stage_versions.validator = processor.validator_class.version_fingerprint()
             logger.info(f"Data validated for {self.document_id}: {self.validation_result_model.is_valid}")
-            self.metadata.processing_status = "completed" if self.validation_result_model.is_valid else "completed_with_validation_issues"
+            self._set_status("completed" if self.validation_result_model.is_valid else "completed_with_validation_issues")
         except Exception as e:
             logger.error(f"Error during data validation for {self.document_id} ({doc_type}): {e}", exc_info=True)
-            self.metadata.processing_status = "error_validation"
+            self._set_status("error_validation")
             self.metadata.error_message = f"Validation failed: {str(e)}"
             # self.store_validation_failure()
             return self._build_processed_document()
@@ -143,14 +211,29 @@ class DocumentProcessingPipeline:
 
         return self._build_processed_document()
 
+    def _checkpoint(self, stage: str, **outputs):
+        if self.checkpoints:
+            save_checkpoint(self.document_id, stage, **outputs)
+
     def _build_processed_document(self) -> ProcessedDocument:
         return ProcessedDocument(
             metadata=self.metadata,
             raw_text=self.raw_text,
+            raw_blocks=(self.context.blocks or None) if self.context.is_loaded else None,
             extracted_data=self.extracted_data_model,
-            validation_result=self.validation_result_model
+            validation_result=self.validation_result_model,
+            processing_events=self._processing_events(),
+            classification_confidence=self.classification_confidence,
+            stage_versions=self.stage_versions.model_copy(),
         )
 
+    def _processing_events(self) -> List[ProcessingEvent]:
+        return [
+            ProcessingEvent(stage=t.stage, started=datetime.fromtimestamp(t.started),
+                            wall_seconds=t.wall_seconds, cpu_seconds=t.cpu_seconds)
+            for t in self.stage_timings
+        ]
+
 if __name__ == "__main__":
     # This is a mock execution.
     # In a real scenario, this would be triggered by main.py or an API call.
@@ -1,75 +1,176 @@
 # Selecciona extractor y validador según tipo de documento
 
-# from extractors.certificado_final import CertificadoFinalExtractor
-# from validators.certificado_final_validator import CertificadoFinalValidator
-# from extractors.facturas import FacturaExtractor # Assuming it exists
-# from validators.facturas_validator import FacturaValidator # Assuming it exists
-# from extractors.memoria_actuacion import MemoriaActuacionExtractor # Assuming it exists
-# from validators.memoria_actuacion_validator import MemoriaActuacionValidator # Assuming it exists
-# ... import other extractors and validators for all 12 types
-
-# from base.base_extractor import BaseExtractor
-# from base.base_validator import BaseValidator
-# from typing import Optional, Type
-# import logging
-
-# logger = logging.getLogger(__name__)
-
-# Placeholder for actual Extractor/Validator classes
-# These would be imported from their respective modules
-class BaseExtractor:
-    def __init__(self, text): self.text = text
-    def extract(self): raise NotImplementedError
-class BaseValidator:
-    def __init__(self, data): self.data = data
-    def validate(self): raise NotImplementedError
-
-class CertificadoFinalExtractor(BaseExtractor):
-    def extract(self): return {"type": "CertificadoFinal", "extracted_field": "CF data"}
-class CertificadoFinalValidator(BaseValidator):
-    def validate(self): return {"is_valid": True, "validated_field": "CF valid"}
-
-class FacturaExtractor(BaseExtractor):
-    def extract(self): return {"type": "Factura", "extracted_field": "Factura data"}
-class FacturaValidator(BaseValidator):
-    def validate(self): return {"is_valid": True, "validated_field": "Factura valid"}
-
-# ... define mock extractors/validators for other types up to 12
-
+# Document types map to an (extractor, validator) pair through a registry:
+#
+# - built-in types are listed in `PROCESSOR_MAPPING` as "module:Class" strings, so their
+#   modules (and what they pull in, e.g. textractor/boto3) are only imported the first
+#   time a document of that type is processed, not when the API or a worker starts;
+# - plugin modules register classes with the `@register_extractor` / `@register_validator`
+#   decorators, or with `register_processor`;
+# - installed packages can provide types through the `document_processor.processors`
+#   entry point group: the entry point name is the document type, and loading it imports
+#   the module that registers it. It is only loaded when that type is first requested.
+#
+# Resolved classes are cached. Extraction rule sets and other compiled rules live at
+# module level in the extractor/validator modules, so they are compiled once per process
+# and shared by every document of that type.
+
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Callable, Dict, Optional, Tuple, Type, Union
+import logging
+import threading
+
+from document_processor.base.base_validator import BaseValidator
+from document_processor.context import DocumentContext
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "document_processor.processors"
+
+# Built-in processors, as "module:Class" references resolved on first use
 PROCESSOR_MAPPING = {
     "certificado_final": {
-        "extractor": CertificadoFinalExtractor,
-        "validator": CertificadoFinalValidator,
+        "extractor": "document_processor.extractors.certificado_final:CertificadoFinalExtractor",
+        "validator": "document_processor.validators.certificado_final_validator:CertificadoFinalValidator",
     },
     "factura": {
-        "extractor": FacturaExtractor, # Placeholder, to be implemented
-        "validator": FacturaValidator, # Placeholder, to be implemented
+        "extractor": "document_processor.extractors.facturas:FacturaExtractor",
+        "validator": "document_processor.validators.facturas_validator:FacturaValidator",
     },
     "memoria_actuacion": {
-        # "extractor": MemoriaActuacionExtractor, # Placeholder
-        # "validator": MemoriaActuacionValidator, # Placeholder
+        "extractor": "document_processor.extractors.memoria_actuacion:MemoriaActuacionExtractor",
+        "validator": "document_processor.validators.memoria_actuacion_validator:MemoriaActuacionValidator",
     },
-    # ... Add mappings for all 12 document types
-    # "document_type_3": {
-    # "extractor": DocumentType3Extractor,
-    # "validator": DocumentType3Validator,
-    # },
-    # ...
-    # "document_type_12": {
-    # "extractor": DocumentType12Extractor,
-    # "validator": DocumentType12Validator,
-    # },
+    # ... the remaining document types register themselves (decorators or entry points)
+}
+
+ClassRef = Union[str, type] # A class, or a "module:Class" reference to import lazily
+
+_registry: Dict[str, Dict[str, ClassRef]] = {
+    document_type: dict(refs) for document_type, refs in PROCESSOR_MAPPING.items()
 }
+_resolved: Dict[str, Tuple[type, type]] = {}
+_entry_points_tried = set()
+_lock = threading.RLock()
+
+
+def register_processor(document_type: str, extractor: Optional[ClassRef] = None,
+                       validator: Optional[ClassRef] = None):
+    """
+    Registers (or replaces) the extractor and/or validator of a document type.
+    :param extractor: Extractor class, or "module:Class" to import on first use.
+    :param validator: Validator class, or "module:Class" to import on first use.
+    """
+    document_type = document_type.lower()
+    with _lock:
+        refs = _registry.setdefault(document_type, {})
+        if extractor is not None:
+            refs["extractor"] = extractor
+        if validator is not None:
+            refs["validator"] = validator
+        _resolved.pop(document_type, None)
+
+
+def register_extractor(document_type: str) -> Callable[[type], type]:
+    """Class decorator registering an extractor for `document_type`."""
+    def decorator(cls: type) -> type:
+        register_processor(document_type, extractor=cls)
+        return cls
+    return decorator
+
+
+def register_validator(document_type: str) -> Callable[[type], type]:
+    """Class decorator registering a validator for `document_type`."""
+    def decorator(cls: type) -> type:
+        register_processor(document_type, validator=cls)
+        return cls
+    return decorator
+
+
+def _import_class(ref: ClassRef) -> type:
+    if not isinstance(ref, str):
+        return ref
+    module_name, _, class_name = ref.partition(":")
+    return getattr(import_module(module_name), class_name)
+
+
+def _load_entry_point(document_type: str):
+    """Imports the plugin registered for `document_type` under ENTRY_POINT_GROUP, at most once."""
+    if document_type in _entry_points_tried:
+        return
+    _entry_points_tried.add(document_type)
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP, name=document_type):
+        try:
+            entry_point.load() # Importing the plugin registers it
+        except Exception as e:
+            logger.error(f"Could not load processor plugin {entry_point.value} for '{document_type}': {e}", exc_info=True)
+
+
+def get_processor_classes(document_type: str) -> Optional[Tuple[type, type]]:
+    """
+    Returns the (extractor class, validator class) of a document type, importing their
+    modules on first use, or None if the type has no complete registration.
+    """
+    document_type = document_type.lower()
+    classes = _resolved.get(document_type)
+    if classes is not None:
+        return classes
+    with _lock:
+        if document_type not in _registry:
+            _load_entry_point(document_type)
+        refs = _registry.get(document_type, {})
+        if "extractor" not in refs or "validator" not in refs:
+            logger.warning(f"No complete processor registered for document type: {document_type}")
+            return None
+        classes = (_import_class(refs["extractor"]), _import_class(refs["validator"]))
+        _resolved[document_type] = classes
+        return classes
+
+
+def get_processor_fingerprints(document_type: str) -> Optional[Tuple[str, str]]:
+    """
+    (extractor, validator) version fingerprints of a document type, or None if the type
+    has no complete registration.
+    """
+    classes = get_processor_classes(document_type)
+    if classes is None:
+        return None
+    extractor_cls, validator_cls = classes
+    return extractor_cls.version_fingerprint(), validator_cls.version_fingerprint()
+
+
+def registered_document_types() -> Tuple[str, ...]:
+    """Document types registered so far (entry point plugins appear once loaded)."""
+    return tuple(sorted(_registry))
+
+
+def _as_validation_result(output: dict) -> dict:
+    """
+    Validators report their checks as a flat dict with an overall "valido" flag;
+    the pipeline stores {"is_valid", "details"}.
+    """
+    if "is_valid" in output and "details" in output:
+        return output
+    return {"is_valid": bool(output.get("valido", output.get("is_valid", False))), "details": output}
 
 
 class DocumentProcessor:
     """
     A wrapper class that holds both an extractor and a validator for a given document type.
+    The validator is created once per document and reused by later `validate` calls.
     """
-    def __init__(self, extractor_class: Type[BaseExtractor], validator_class: Type[BaseValidator], text: str):
-        self.extractor = extractor_class(text)
+    __slots__ = ("context", "extractor", "validator_class", "validator", "extracted_data")
+
+    def __init__(self, extractor_class: type, validator_class: Type[BaseValidator],
+                 text: Union[str, DocumentContext]):
+        # Extractor and validator share one context, so the document is OCR'd
+        # and normalized once regardless of how many stages read it.
+        self.context = text if isinstance(text, DocumentContext) else DocumentContext.from_text(text)
+        self.extractor = extractor_class(context=self.context)
         # Validator is instantiated later with extracted data
         self.validator_class = validator_class
+        self.validator = None
         self.extracted_data = None
 
     def extract(self) -> dict:
@@ -77,39 +178,35 @@ class DocumentProcessor:
         return self.extracted_data
 
     def validate(self, data: Optional[dict] = None) -> dict:
+        """
+        Validates `data` (or the last extracted data).
+        :return: {"is_valid": bool, "details": {...checks}}.
+        """
         if data is None and self.extracted_data is None:
             raise ValueError("No data provided or extracted to validate.")
         data_to_validate = data if data is not None else self.extracted_data
 
-        validator_instance = self.validator_class(data_to_validate)
-        return validator_instance.validate()
+        if self.validator is None:
+            self.validator = self.validator_class(data_to_validate, context=self.context)
+        else:
+            self.validator.data = data_to_validate
+        return _as_validation_result(self.validator.validate())
 
 
-def get_processor(document_type: str, text: str) -> Optional[DocumentProcessor]:
+def get_processor(document_type: str, text: Union[str, DocumentContext]) -> Optional[DocumentProcessor]:
     """
     Factory function to get the appropriate processor (extractor and validator pair)
     for a given document type.
+    `text` may be the raw text or the document's shared `DocumentContext`.
     """
-    # logger.info(f"Attempting to get processor for document type: {document_type}")
-    processor_config = PROCESSOR_MAPPING.get(document_type.lower())
-
-    if processor_config:
-        extractor_cls = processor_config.get("extractor")
-        validator_cls = processor_config.get("validator")
-
-        if extractor_cls and validator_cls:
-            # logger.info(f"Found processor for {document_type}.")
-            return DocumentProcessor(extractor_cls, validator_cls, text)
-        else:
-            # logger.warning(f"Incomplete processor configuration for type: {document_type}. Missing extractor or validator.")
-            pass
-    else:
-        # logger.warning(f"No processor configuration found for document type: {document_type}")
-        pass
-    return None
+    classes = get_processor_classes(document_type)
+    if classes is None:
+        return None
+    extractor_cls, validator_cls = classes
+    return DocumentProcessor(extractor_cls, validator_cls, text)
 
 if __name__ == '__main__':
-    sample_text_cf = "Certificado Final de Obra. Director: Juan. Fecha: 01/01/2023"
+    sample_text_cf = "Certificado Final de Obra. Director de Obra y Director de Ejecución. Fecha: 01/01/2023"
     processor_cf = get_processor("certificado_final", sample_text_cf)
     if processor_cf:
         extracted = processor_cf.extract()
@@ -119,7 +216,7 @@ if __name__ == '__main__':
     else:
         print("Certificado Final processor not found.")
 
-    sample_text_factura = "Factura No. 123. Total: $500"
+    sample_text_factura = "Factura No. 123. Fecha Factura: 01/02/2024. Total: 500,00"
     processor_factura = get_processor("factura", sample_text_factura)
     if processor_factura:
         extracted = processor_factura.extract()
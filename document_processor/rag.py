@@ -1,117 +1,202 @@
 # Interfaz RAG (Retrieval Augmented Generation) para preguntas sobre documentos
 
-# This module will allow users to ask natural language questions about
-# the processed documents and their status.
-
-# It will typically involve:
-# 1. An embedding model to convert questions and document content into vectors.
-# 2. A vector store (e.g., FAISS, Pinecone, ChromaDB) to store document vectors and query efficiently.
-# 3. A Large Language Model (LLM) to generate answers based on retrieved context.
-# 4. Integration with the document database (`db/query.py`) to fetch relevant document details.
-
-# from db.query import get_document_by_id, find_documents # Example DB query functions
-# from sentence_transformers import SentenceTransformer # For embeddings
-# import faiss # Example vector store
-# import numpy as np
+# This module lets users ask natural language questions about the processed documents.
+#
+# 1. Document text is split into overlapping chunks, embedded and added to a local
+#    vector index (utils/vector_index.py): NumPy, memory-mapped files under
+#    RAG_INDEX_DIR, exact search for small indexes and IVF lists for large ones.
+# 2. A question is embedded the same way and the RAG_TOP_K closest chunks are retrieved.
+# 3. A Large Language Model (LLM) would generate the answer from the retrieved chunks;
+#    until one is integrated, the answer lists them.
+#
+# Embeddings come from a sentence-transformers model if RAG_EMBEDDING_MODEL is set (and
+# the package is installed). Otherwise, texts are embedded by hashing their words and
+# character trigrams into RAG_EMBEDDING_DIM dimensions: no model, no external service,
+# lexical rather than semantic similarity. An index is tied to the embeddings it was
+# built with; changing them requires a new RAG_INDEX_DIR.
+
 # from some_llm_library import LLM # Placeholder for an LLM client
 
-# Placeholder for a simple RAG system.
-# A real implementation would be much more complex.
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+import logging
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+from document_processor.config import (
+    RAG_CHUNK_CHARS, RAG_CHUNK_OVERLAP_CHARS, RAG_EMBEDDING_DIM, RAG_EMBEDDING_MODEL, RAG_INDEX_DIR,
+    RAG_IVF_MIN_VECTORS, RAG_IVF_NPROBE, RAG_TOP_K,
+)
+from document_processor.utils.vector_index import VectorIndex, normalize_rows
+
+logger = logging.getLogger(__name__)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """Embeds texts by feature hashing their words and character trigrams (signed, L2-normalized)."""
+
+    def __init__(self, dim: int = RAG_EMBEDDING_DIM):
+        self.dim = dim
+
+    @staticmethod
+    def features(text: str) -> List[str]:
+        # Lowercase, without accents: "Factura" and "FACTURA", "Certificación" and "certificacion" match
+        text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+        features = []
+        for word in _WORD_PATTERN.findall(text):
+            features.append(word)
+            padded = f" {word} "
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self.features(text)
+            if not features:
+                continue
+            # crc32, unlike hash(), is the same in every process
+            hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+            signs = np.where(hashes & 0x80000000, 1.0, -1.0)
+            embeddings[row] = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+        return normalize_rows(embeddings)
+
+
+class SentenceTransformerEmbedder:
+    """Embeds texts with a sentence-transformers model (requires the package)."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+
+def get_default_embedder():
+    if RAG_EMBEDDING_MODEL:
+        try:
+            return SentenceTransformerEmbedder(RAG_EMBEDDING_MODEL)
+        except ImportError:
+            logger.warning(f"sentence-transformers is not installed; embedding with hashed features instead of {RAG_EMBEDDING_MODEL}.")
+    return HashingEmbedder()
+
+
+def chunk_text(text: str, chunk_chars: int = RAG_CHUNK_CHARS, overlap_chars: int = RAG_CHUNK_OVERLAP_CHARS) -> List[str]:
+    """
+    Splits text into chunks of at most about `chunk_chars` characters, cut at whitespace,
+    each starting about `overlap_chars` before the previous one ended.
+    """
+    text = re.sub(r"\s+", " ", text or "").strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            cut = text.rfind(" ", start + 1, end)
+            end = cut if cut > start else end
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        next_start = text.find(" ", max(end - overlap_chars, start + 1), end)
+        start = next_start + 1 if next_start != -1 else end
+    return chunks
+
 
 class DocumentRAGSystem:
-    def __init__(self):
-        # self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2') # Load a sentence transformer model
-        # self.vector_store = None # Initialize your vector store (e.g., FAISS index)
-        # self.documents_data = [] # Store metadata and text for retrieval
+    def __init__(self, index_dir: str = RAG_INDEX_DIR, embedder: Any = None,
+                 ivf_min_vectors: int = RAG_IVF_MIN_VECTORS, nprobe: int = RAG_IVF_NPROBE):
+        """
+        Opens (or creates) the vector index of document chunks in `index_dir`.
+        :param embedder: Object with `dim` and `encode(texts) -> (n x dim) array`;
+                         defaults to RAG_EMBEDDING_MODEL or hashed features.
+        :param ivf_min_vectors: Indexes with fewer chunks are searched exactly.
+        :param nprobe: IVF lists scanned per question.
+        """
+        self.embedder = embedder or get_default_embedder()
+        self.index = VectorIndex(index_dir, dim=self.embedder.dim, nprobe=nprobe, ivf_min_vectors=ivf_min_vectors)
         # self.llm = LLM() # Initialize your LLM client
-        print("RAG System Initialized (mock).")
-        # In a real system, this would load existing document embeddings or prepare for new ones.
+        logger.info(f"RAG index at {index_dir} opened with {len(self.index)} chunks.")
 
-    def add_document_to_vector_store(self, doc_id: str, text_content: str, metadata: dict):
+    def add_document_to_vector_store(self, doc_id: str, text_content: str, metadata: dict) -> int:
+        """
+        Adds a document's text, in chunks, and metadata to the vector index. Adding a
+        document again adds its chunks again.
+        :return: Number of chunks added.
+        """
+        return self.add_documents([(doc_id, text_content, metadata)])
+
+    def add_documents(self, documents: Iterable[Tuple[str, str, dict]]) -> int:
+        """
+        Adds (doc_id, text, metadata) documents with one embedding call and one index
+        append for all their chunks; the way to load many documents.
+        :return: Number of chunks added.
+        """
+        texts, payloads = [], []
+        for doc_id, text_content, metadata in documents:
+            for number, chunk in enumerate(chunk_text(text_content)):
+                texts.append(chunk)
+                payloads.append({"doc_id": doc_id, "chunk": number, "text": chunk, "metadata": metadata})
+        if not texts:
+            return 0
+        self.index.add(self.embedder.encode(texts), payloads)
+        logger.info(f"Added {len(texts)} chunks of {len({p['doc_id'] for p in payloads})} documents to the RAG index.")
+        return len(texts)
+
+    def retrieve(self, question: str, k: int = RAG_TOP_K) -> List[Dict[str, Any]]:
         """
-        Adds a document's text and metadata to the RAG system.
-        - Generates embedding for text_content.
-        - Stores embedding in vector store.
-        - Stores text_content and metadata for retrieval.
+        The chunks closest to the question, best first: dicts with doc_id, chunk, text,
+        metadata and score (cosine similarity).
         """
-        # embedding = self.embedding_model.encode(text_content)
-        # self.vector_store.add(np.array([embedding]))
-        # self.documents_data.append({"id": doc_id, "text": text_content, "metadata": metadata})
-        print(f"Document {doc_id} (mock) added to RAG vector store.")
+        return self.retrieve_many([question], k)[0]
+
+    def retrieve_many(self, questions: Sequence[str], k: int = RAG_TOP_K) -> List[List[Dict[str, Any]]]:
+        """`retrieve` for a batch of questions, searched in one pass over the index."""
+        scores, ids = self.index.search(self.embedder.encode(questions), k)
+        results = []
+        for question_scores, question_ids in zip(scores, ids):
+            found = question_ids >= 0
+            payloads = self.index.payloads(question_ids[found])
+            results.append([dict(payload, score=float(score)) for payload, score in zip(payloads, question_scores[found])])
+        return results
 
     def query(self, question: str) -> str:
         """
         Answers a natural language question based on the documents.
         """
-        print(f"RAG Query: '{question}'")
+        logger.info(f"RAG Query: '{question}'")
+        retrieved = [chunk for chunk in self.retrieve(question) if chunk["score"] > 0]
 
-        # 1. Embed the question
-        # question_embedding = self.embedding_model.encode(question)
-
-        # 2. Retrieve relevant document chunks from vector store
-        # D, I = self.vector_store.search(np.array([question_embedding]), k=3) # Retrieve top 3 relevant chunks
-        # retrieved_docs_info = [self.documents_data[i] for i in I[0]]
-
-        # For now, simulate retrieval based on keywords or DB query
-        retrieved_context = self._simulate_retrieval(question)
-
-        if not retrieved_context:
+        if not retrieved:
             return "I couldn't find any relevant information in the documents to answer your question."
 
-        # 3. Construct a prompt for the LLM
-        # prompt = f"Based on the following documents:\n"
-        # for doc_info in retrieved_docs_info:
-        #     prompt += f"- Document ID {doc_info['id']}: {doc_info['text'][:500]}...\n" # Snippet of text
+        # prompt = "Based on the following documents:\n"
+        # for chunk in retrieved:
+        #     prompt += f"- Document ID {chunk['doc_id']}: {chunk['text'][:500]}\n"
         # prompt += f"\nQuestion: {question}\nAnswer:"
-
-        # simulated_prompt = f"Context: {retrieved_context}\nQuestion: {question}\nAnswer:"
-        # print(f"Simulated prompt for LLM: {simulated_prompt}")
-
-        # 4. Get answer from LLM
         # answer = self.llm.generate(prompt)
 
-        simulated_answer = f"Based on simulated retrieval, the answer to '{question}' is: {retrieved_context}"
-        return simulated_answer
+        # Without an LLM, the answer is the retrieved context itself
+        sources = "\n".join(f"- {chunk['doc_id']} ({chunk['score']:.2f}): {chunk['text'][:200]}" for chunk in retrieved)
+        return f"Most relevant passages for '{question}':\n{sources}"
 
-    def _simulate_retrieval(self, question: str) -> str:
-        """
-        Simulates document retrieval.
-        In a real system, this would query the vector store and/or the main database.
-        """
-        # This is a very basic simulation.
-        # It could use db.query to find documents matching certain criteria from the question.
-        # For example, if the question is "What is the status of document X?"
-        # it could call: db.query.get_document_status_by_name("X")
-
-        question_lower = question.lower()
-        if "status of document" in question_lower:
-            # Simulate fetching from db.query (which isn't fully implemented yet)
-            # parts = question_lower.split("document")
-            # doc_name_query = parts[-1].strip().replace("?", "")
-            # status = db.query.get_document_status_by_name(doc_name_query) # Fictional function
-            return f"Simulated: The status of a document mentioned in your query is 'Processed'."
-        elif "certificado final" in question_lower:
-            return "Simulated: Retrieved information about 'Certificado Final' documents."
-        elif "factura" in question_lower:
-            return "Simulated: Retrieved information about 'Factura' documents."
-
-        return "Simulated: General information retrieved that might be relevant."
 
 if __name__ == '__main__':
-    rag_system = DocumentRAGSystem()
+    import tempfile
+    logging.basicConfig(level=logging.INFO)
+    rag_system = DocumentRAGSystem(index_dir=tempfile.mkdtemp(prefix="rag_index_"))
 
     # Simulate adding some documents (in a real system, this happens after processing)
     rag_system.add_document_to_vector_store("doc123", "This is the content of Certificado Final XYZ.", {"type": "certificado_final"})
-    rag_system.add_document_to_vector_store("doc456", "Invoice ABC for services.", {"type": "factura"})
-
-    question1 = "What is the status of document XYZ?"
-    answer1 = rag_system.query(question1)
-    print(f"Q1: {question1}\nA1: {answer1}\n")
+    rag_system.add_document_to_vector_store("doc456", "Invoice ABC for services. Factura número 456.", {"type": "factura"})
 
-    question2 = "Tell me about Certificado Final documents."
-    answer2 = rag_system.query(question2)
-    print(f"Q2: {question2}\nA2: {answer2}\n")
+    question1 = "Tell me about Certificado Final documents."
+    print(f"Q1: {question1}\nA1: {rag_system.query(question1)}\n")
 
-    question3 = "How many invoices were processed last month?"
-    answer3 = rag_system.query(question3) # This would require more sophisticated DB query integration
-    print(f"Q3: {question3}\nA3: {answer3}\n")
+    question2 = "Which factura is number 456?"
+    print(f"Q2: {question2}\nA2: {rag_system.query(question2)}\n")
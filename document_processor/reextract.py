@@ -0,0 +1,273 @@
+# Reextracción masiva sobre el corpus OCR almacenado
+
+# After a change to a classifier rule, an extractor regex or a validator rule, every
+# historical document has to be processed again. The OCR text of stored documents is
+# archived at `documents.raw_text_path` (see RAW_TEXT_DIR), so this never calls Textract:
+#
+# - the documents table is streamed by keyset pages (`iter_stored_documents`);
+# - chunks of documents go to a process pool, where each worker reads the archived text
+#   and runs the current classification, extraction and validation stages, then diffs
+#   the result against what is stored. Only changed documents travel back;
+# - changes are written with `store_reextraction_results_bulk`, one transaction per batch.
+#
+# Run incrementally, the stored stage version fingerprints decide which documents are
+# processed at all and from which stage (see rerun_planner.py): after a validator-only
+# deploy, only documents of that type are re-validated, on their stored fields. Those
+# need no archived text, so incremental runs scan every stored document
+# (`iter_stored_documents`) and only the ones whose plan needs the text require it.
+
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import json
+import logging
+import os
+
+from document_processor.batch import _InlineExecutor
+from document_processor.config import DB_BULK_BATCH_SIZE
+from document_processor.context import DocumentContext
+from document_processor.db.insert import store_reextraction_results_bulk
+from document_processor.db.query import iter_documents_with_raw_text, iter_stored_documents
+from document_processor.pipeline import DocumentProcessingPipeline
+from document_processor.rerun_planner import RerunPlanner
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 256 # Documents per task sent to a worker process
+
+
+def _quiet_worker_logging():
+    # Per-document INFO logs from the pipeline would dominate the cost of a re-extraction
+    logging.getLogger("document_processor.pipeline").setLevel(logging.WARNING)
+
+
+def _json_normalized(value: Any) -> Any:
+    """The value as it reads back from the database (tuples become lists, etc.)."""
+    return json.loads(json.dumps(value)) if value is not None else None
+
+
+def _diff(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]], prefix: str) -> Dict[str, List[Any]]:
+    old, new = old or {}, new or {}
+    return {
+        f"{prefix}.{key}": [old.get(key), new.get(key)]
+        for key in sorted(set(old) | set(new))
+        if old.get(key) != new.get(key)
+    }
+
+
+def _resume_point(document: Dict[str, Any], text: str) -> Optional[Dict[str, Any]]:
+    """
+    The stored outputs of the stages before `document["rerun_from"]` (set from the re-run
+    plan), for the pipeline to resume after; None to run every stage.
+    """
+    start_stage = document.get("rerun_from")
+    if start_stage in (None, "classification"):
+        return None
+    return {
+        "stage": "classification" if start_stage == "extraction" else "extraction",
+        "raw_text": text,
+        "blocks": None,
+        "document_type": document["document_type_classified"],
+        "classification_confidence": document.get("classification_confidence"),
+        "fields": document["fields"],
+        "versions": document.get("versions"),
+    }
+
+
+def reextract_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Runs the current pipeline stages over one stored document's archived OCR text and
+    compares the outcome with the stored one.
+    :param document: A row from `iter_stored_documents`. With a "rerun_from" stage
+                     (see rerun_planner.py), earlier stages are not run; their stored
+                     output is used instead. Validation alone runs on the stored fields,
+                     without reading the archived text.
+    :return: {"id", "outcome" ("changed", "unchanged", "missing_text"), "changes", "update"}.
+             `changes` maps "fields.<name>", "details.<name>", "versions.<stage>",
+             "document_type", "processing_status" and "is_valid" to [old, new]; `update`
+             is the row for `store_reextraction_results_bulk` (None unless changed).
+    """
+    result = {"id": document["id"], "outcome": "missing_text", "changes": {}, "update": None}
+    text = ""
+    if document.get("rerun_from") != "validation":
+        if not document.get("raw_text_path"):
+            logger.warning(f"{document['id']} has no archived text to re-extract from.")
+            return result
+        try:
+            with open(document["raw_text_path"], "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError as e:
+            logger.warning(f"Archived text of {document['id']} unreadable at {document['raw_text_path']}: {e}")
+            return result
+
+    pipeline = DocumentProcessingPipeline(
+        document_path=document.get("raw_text_path") or "", file_name="", file_type="",
+        context=DocumentContext.from_text(text), document_id=document["id"],
+        resume_from=_resume_point(document, text),
+    )
+    processed = pipeline.run()
+    fields = _json_normalized(processed.extracted_data.fields) if processed.extracted_data else None
+    validation = processed.validation_result
+    details = _json_normalized(validation.details) if validation else None
+    new = {
+        "document_type": processed.extracted_data.document_type if processed.extracted_data else document["document_type_classified"],
+        "processing_status": processed.metadata.processing_status,
+        "is_valid": validation.is_valid if validation else None,
+    }
+
+    changes = {key: [document[stored_key], new[key]]
+               for key, stored_key in (("document_type", "document_type_classified"),
+                                       ("processing_status", "processing_status"),
+                                       ("is_valid", "is_valid"))
+               if document[stored_key] != new[key]}
+    changes.update(_diff(document["fields"], fields, "fields"))
+    changes.update(_diff(document["details"], details, "details"))
+    versions = processed.stage_versions.model_dump()
+    changes.update(_diff(document.get("versions"), versions, "versions"))
+
+    result["changes"] = changes
+    if not changes:
+        result["outcome"] = "unchanged"
+        return result
+    result["outcome"] = "changed"
+    result["update"] = dict(new, id=document["id"], fields=fields, details=details,
+                            error_message=processed.metadata.error_message, versions=versions,
+                            classification_confidence=processed.classification_confidence)
+    return result
+
+
+def _reextract_chunk(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Module-level so it can be shipped to worker processes. Unchanged documents are not returned."""
+    outcomes = []
+    for document in documents:
+        try:
+            outcome = reextract_document(document)
+        except Exception as e:
+            logger.error(f"Re-extraction failed for {document['id']}: {e}", exc_info=True)
+            outcome = {"id": document["id"], "outcome": "error", "changes": {}, "update": None, "error": str(e)}
+        if outcome["outcome"] == "unchanged":
+            outcome = {"id": document["id"], "outcome": "unchanged"}
+        outcomes.append(outcome)
+    return outcomes
+
+
+class ReextractionReport:
+    """Aggregated outcome of a re-extraction run."""
+    def __init__(self):
+        self.outcomes = Counter() # changed / unchanged / missing_text / error / up_to_date (not re-run)
+        self.changed_keys = Counter() # e.g. "fields.total_factura" -> number of documents
+        self.plan_reasons = Counter() # Incremental runs: documents per re-run plan reason
+        self.stored = 0
+
+    def add(self, outcome: Dict[str, Any]):
+        self.outcomes[outcome["outcome"]] += 1
+        self.changed_keys.update(outcome.get("changes", {}).keys())
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "scanned": sum(self.outcomes.values()),
+            "outcomes": dict(self.outcomes),
+            "changed_keys": dict(self.changed_keys.most_common()),
+            "plan_reasons": dict(self.plan_reasons.most_common()),
+            "stored": self.stored,
+        }
+
+
+class ReextractionRunner:
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 store: bool = True, store_batch_size: int = DB_BULK_BATCH_SIZE,
+                 incremental: bool = False, planner: Optional[RerunPlanner] = None):
+        """
+        :param workers: Worker processes. Defaults to the number of CPUs; 0 runs everything
+                        in the caller's thread.
+        :param chunk_size: Documents per worker task; larger chunks amortize inter-process overhead.
+        :param store: Write changed documents back. False makes it a dry run (diff only).
+        :param store_batch_size: Changed documents per write transaction.
+        :param incremental: Only re-run the stages whose version changed since each
+                            document was stored (see rerun_planner.py).
+        :param planner: Re-run planner for incremental runs; a default one is created if omitted.
+        """
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.store = store
+        self.store_batch_size = store_batch_size
+        self.incremental = incremental
+        self.planner = planner or (RerunPlanner() if incremental else None)
+
+    def _executor(self):
+        if self.workers == 0:
+            return _InlineExecutor()
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_quiet_worker_logging)
+
+    def _chunks(self, documents: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        chunk = []
+        for document in documents:
+            chunk.append(document)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def iter_outcomes(self, documents: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Re-extracts `documents` in parallel and yields one outcome per document, in
+        completion order. At most two chunks per worker are in flight, which bounds memory.
+        """
+        chunks = self._chunks(documents)
+        max_in_flight = 2 * max(self.workers, 1)
+        with self._executor() as executor:
+            pending = set()
+            for chunk in chunks:
+                pending.add(executor.submit(_reextract_chunk, chunk))
+                if len(pending) >= max_in_flight:
+                    break
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        pending.add(executor.submit(_reextract_chunk, chunk))
+
+    def _planned(self, documents: Iterable[Dict[str, Any]], report: ReextractionReport) -> Iterator[Dict[str, Any]]:
+        """The documents that need a re-run, each with the stage to start at ("rerun_from")."""
+        for document in documents:
+            plan = self.planner.plan(document)
+            report.plan_reasons[plan.reason] += 1
+            if plan.start_stage is None:
+                report.outcomes["up_to_date"] += 1
+                continue
+            yield dict(document, rerun_from=plan.start_stage)
+
+    def run(self, doc_type: Optional[str] = None,
+            on_change: Optional[Callable[[Dict[str, Any]], None]] = None) -> ReextractionReport:
+        """
+        Re-extracts every stored document with archived OCR text (only the affected
+        ones, from the affected stage on, if incremental; documents to re-validate need
+        no archived text).
+        :param doc_type: Only documents currently classified as this type.
+        :param on_change: Called with the outcome of every changed document (e.g. to write a diff file).
+        :return: The aggregated report.
+        """
+        report = ReextractionReport()
+        if self.incremental:
+            documents = self._planned(iter_stored_documents(doc_type), report)
+        else:
+            documents = iter_documents_with_raw_text(doc_type)
+
+        def changed_updates() -> Iterator[Dict[str, Any]]:
+            for outcome in self.iter_outcomes(documents):
+                report.add(outcome)
+                if outcome["outcome"] == "changed":
+                    if on_change is not None:
+                        on_change(outcome)
+                    yield outcome["update"]
+
+        if self.store:
+            report.stored = store_reextraction_results_bulk(changed_updates(), batch_size=self.store_batch_size)
+        else:
+            for _ in changed_updates():
+                pass
+        logger.info(f"Re-extraction finished: {report.as_dict()}")
+        return report
@@ -0,0 +1,92 @@
+# Plan mínimo de re-ejecución tras un despliegue
+
+# Every stored document records the version fingerprint of the classifier, extractor
+# and validator that produced its results (see utils/version_utils.py). After a deploy,
+# `RerunPlanner` compares them with the fingerprints of the code now running and picks,
+# per document, the first stage that has to run again:
+#
+# - no stored fingerprints (stored before they existed): everything, from classification;
+# - classifier changed: only unclassified documents and those classified with low
+#   confidence (RERUN_MIN_CLASSIFICATION_CONFIDENCE) are classified again;
+# - extractor of the document's type changed: extraction and validation;
+# - only the validator changed: validation, on the stored fields.
+#
+# Stages before the planned one keep their stored output. `ReextractionRunner` uses the
+# plan when run incrementally (see reextract.py).
+
+from collections import Counter
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from document_processor.classifier import DocumentClassifier
+from document_processor.config import RERUN_MIN_CLASSIFICATION_CONFIDENCE
+from document_processor.processor_factory import get_processor_fingerprints
+
+# Stages a re-run can start at, in pipeline order (OCR is never repeated)
+RERUN_STAGES = ("classification", "extraction", "validation")
+
+
+class RerunPlan(NamedTuple):
+    document_id: str
+    start_stage: Optional[str] # First stage to run again; None if the document is up to date
+    reason: str
+
+
+class RerunPlanner:
+    def __init__(self, min_classification_confidence: float = RERUN_MIN_CLASSIFICATION_CONFIDENCE,
+                 classifier_version: Optional[str] = None):
+        """
+        :param min_classification_confidence: After a classifier change, documents classified
+                                              with at least this confidence keep their type.
+        :param classifier_version: Current classifier fingerprint; defaults to the running one.
+        """
+        self.min_classification_confidence = min_classification_confidence
+        self.classifier_version = classifier_version or DocumentClassifier.version_fingerprint()
+        self._processor_versions: Dict[str, Optional[Tuple[str, str]]] = {}
+
+    def processor_versions(self, document_type: str) -> Optional[Tuple[str, str]]:
+        """Current (extractor, validator) fingerprints of a type, computed once per type."""
+        if document_type not in self._processor_versions:
+            self._processor_versions[document_type] = get_processor_fingerprints(document_type)
+        return self._processor_versions[document_type]
+
+    def plan(self, document: Dict[str, Any]) -> RerunPlan:
+        """
+        :param document: A row from `iter_stored_documents` (with its stored
+                         versions, classification_confidence and fields).
+        """
+        document_id = document["id"]
+        versions = document.get("versions") or {}
+        document_type = document.get("document_type_classified")
+        if versions.get("classifier") is None:
+            return RerunPlan(document_id, "classification", "no stored versions")
+        if versions["classifier"] != self.classifier_version:
+            confidence = document.get("classification_confidence")
+            if document_type is None:
+                return RerunPlan(document_id, "classification", "classifier changed, unclassified")
+            if confidence is None or confidence < self.min_classification_confidence:
+                return RerunPlan(document_id, "classification", "classifier changed, low confidence")
+        if document_type is None:
+            return RerunPlan(document_id, None, "up to date")
+
+        current = self.processor_versions(document_type)
+        if current is None:
+            return RerunPlan(document_id, None, "no processor for type")
+        extractor_version, validator_version = current
+        if versions.get("extractor") != extractor_version:
+            return RerunPlan(document_id, "extraction", "extractor changed")
+        if versions.get("validator") != validator_version:
+            if document.get("fields") is None:
+                return RerunPlan(document_id, "extraction", "validator changed, no stored fields")
+            return RerunPlan(document_id, "validation", "validator changed")
+        return RerunPlan(document_id, None, "up to date")
+
+
+def summarize_plan(documents: Iterable[Dict[str, Any]], planner: Optional[RerunPlanner] = None) -> Dict[str, Any]:
+    """Number of documents per start stage and per reason, without running anything (a dry run of a backfill)."""
+    planner = planner or RerunPlanner()
+    stages, reasons = Counter(), Counter()
+    for document in documents:
+        plan = planner.plan(document)
+        stages[plan.start_stage or "none"] += 1
+        reasons[plan.reason] += 1
+    return {"scanned": sum(stages.values()), "start_stages": dict(stages), "reasons": dict(reasons)}
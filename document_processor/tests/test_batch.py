@@ -0,0 +1,72 @@
+import threading
+import pytest
+from document_processor.batch import BatchPipelineRunner
+
+class FakeTextractClient:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def extract_text(self, document_path):
+        with self._lock:
+            self.calls.append(document_path)
+        if "fail_ocr" in document_path:
+            raise RuntimeError("Textract unavailable")
+        if "empty" in document_path:
+            return None
+        return "CERTIFICADO FINAL DE OBRA\nDirector de Obra y Director de Ejecución\nFecha: 15/05/2025"
+
+@pytest.mark.parametrize("cpu_workers", [0, 2])
+def test_batch_runner_processes_every_document_once(cpu_workers):
+    client = FakeTextractClient()
+    runner = BatchPipelineRunner(ocr_workers=4, cpu_workers=cpu_workers, textract_client=client)
+    paths = [f"docs/cert_{i}.pdf" for i in range(10)]
+
+    results = list(runner.run(paths))
+
+    assert sorted(r.metadata.file_name for r in results) == sorted(p.split("/")[-1] for p in paths)
+    assert sorted(client.calls) == sorted(paths)
+    assert all(r.extracted_data.document_type == "certificado_final" for r in results)
+    assert len({r.metadata.document_id for r in results}) == len(paths)
+
+def test_batch_runner_reports_ocr_failures_per_document():
+    client = FakeTextractClient()
+    runner = BatchPipelineRunner(ocr_workers=2, cpu_workers=0, textract_client=client)
+
+    results = {r.metadata.file_name: r for r in runner.run(["a/fail_ocr.pdf", "a/empty.pdf", "a/ok.pdf"])}
+
+    assert results["fail_ocr.pdf"].metadata.processing_status == "error_ocr"
+    assert "Textract unavailable" in results["fail_ocr.pdf"].metadata.error_message
+    assert results["empty.pdf"].metadata.processing_status == "error_ocr"
+    assert results["ok.pdf"].metadata.processing_status != "error_ocr"
+
+def test_batch_runner_bounds_documents_in_flight():
+    client = FakeTextractClient()
+    runner = BatchPipelineRunner(ocr_workers=2, cpu_workers=0, max_in_flight=3, textract_client=client)
+    paths = (f"docs/{i}.pdf" for i in range(20))
+
+    stream = runner.run(paths)
+    next(stream)
+    # Inputs are pulled lazily: only max_in_flight documents start before the first result is consumed
+    assert len(client.calls) <= 3
+    assert len(list(stream)) == 19
+
+def test_batch_runner_attaches_raw_blocks():
+    class BlocksTextractClient(FakeTextractClient):
+        def extract_text(self, document_path):
+            text = super().extract_text(document_path)
+            return {"text": text, "blocks": [{"BlockType": "LINE", "Id": document_path, "Text": text}]}
+
+    runner = BatchPipelineRunner(ocr_workers=2, cpu_workers=2, textract_client=BlocksTextractClient())
+    results = list(runner.run(["a/one.pdf", "a/two.pdf"]))
+    assert sorted(r.raw_blocks[0]["Id"] for r in results) == ["a/one.pdf", "a/two.pdf"]
+
+def test_batch_runner_reports_the_ocr_stage_timing():
+    runner = BatchPipelineRunner(ocr_workers=2, cpu_workers=2, textract_client=FakeTextractClient())
+
+    (result,) = runner.run(["docs/cert.pdf"])
+
+    events = {event.stage: event for event in result.processing_events}
+    assert [event.stage for event in result.processing_events] == ["ocr", "classification", "extraction", "validation", "total"]
+    assert events["total"].started == events["ocr"].started
+    assert events["total"].wall_seconds >= events["ocr"].wall_seconds + events["extraction"].wall_seconds
@@ -0,0 +1,88 @@
+import random
+import subprocess
+import sys
+import numpy as np
+import pytest
+from datetime import date
+from document_processor.base.base_validator import BaseValidator, compare_batch_with_scalar
+from document_processor.utils import vector_utils as vu
+from document_processor.utils.date_utils import parse_day_month_year
+from document_processor.validators.facturas_validator import FacturaValidator
+from document_processor.validators.certificado_final_validator import CertificadoFinalValidator
+from document_processor.validators.memoria_actuacion_validator import MemoriaActuacionValidator
+
+DATES = [None, "", "15/05/2024", "15-05-2024", "15/05-2024", "31/02/2024", "29/02/2024", "29/02/2023", "00/05/2024",
+         "15/13/2024", "01/01/0000", "5/5/2024", " 5/05/2024", "15/05/2024 ", "2024-05-15", "01/01/2099",
+         "30/06/2026", "29/06/2026", "31/12/2019", "01/01/2021", "１５/05/2024", "abc", "99/99/9999", "15.05.2024"]
+
+def random_records(fields, values, count=300, seed=7):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        record = {}
+        for field in fields:
+            if rng.random() > 0.1: # Leave some fields out entirely
+                record[field] = rng.choice(values[field])
+        records.append(record)
+    return records
+
+def assert_agrees(validator_class, records):
+    # compare_batch_with_scalar raises AssertionError on the first record where they differ
+    compare_batch_with_scalar(validator_class, records, runs=1)
+
+def test_factura_batch_matches_scalar():
+    values = {
+        "numero_factura": [None, "F-1", "", "123"],
+        "fecha_emision": DATES,
+        "total_factura": [None, 0, -1, 12.5, "242.00", "abc", "", float("nan"), "1e3", True],
+    }
+    assert_agrees(FacturaValidator, random_records(values, values))
+
+def test_certificado_batch_matches_scalar():
+    values = {"firmas": [None, False, True, [], ["Director de Obra"]], "fecha": DATES, "observaciones": [None, False, True, "Sin incidencias"]}
+    assert_agrees(CertificadoFinalValidator, random_records(values, values))
+
+def test_memoria_batch_matches_scalar():
+    values = {
+        "titulo_proyecto": [None, "", "Corto", "Proyecto de rehabilitación", ["a", "b"], ["a", "b", "c", "d", "e", "f"]],
+        "fecha_elaboracion": DATES + [date.today().strftime("%d/%m/%Y")],
+        "resumen": [None, "Breve", "Un resumen suficientemente largo del proyecto."],
+    }
+    assert_agrees(MemoriaActuacionValidator, random_records(values, values))
+
+def test_validators_and_storage_do_not_import_numpy():
+    # Only the batch path needs NumPy; the API imports these modules at startup
+    code = ("import sys, document_processor.base.base_validator, document_processor.processor_factory, "
+            "document_processor.db.insert, document_processor.db.checkpoints; print('numpy' in sys.modules)")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == "False"
+
+def test_text_lengths_measure_values_not_their_str():
+    column = vu.object_column([None, "", "Corto", ["a", "b"], ("x",), 12, {"k": "v"}])
+    assert vu.text_lengths(column).tolist() == [-1, 0, 5, 2, 1, -1, 1]
+
+@pytest.mark.parametrize("dash_to_slash", [False, True])
+def test_day_month_year_column_matches_scalar(dash_to_slash):
+    column = vu.object_column(DATES)
+    parsed = vu.parse_day_month_year_column(column, dash_to_slash=dash_to_slash)
+    for value, result in zip(DATES, parsed):
+        expected = parse_day_month_year(value.replace("-", "/") if dash_to_slash else value) if value else None
+        assert (None if np.isnat(result) else result.astype(date)) == expected, value
+
+def test_default_validate_batch_loops_scalar_validate():
+    class LengthValidator(BaseValidator):
+        batch_fields = {"nombre": ""}
+
+        def validate(self) -> dict:
+            return {"valido": len(self.data.get("nombre", "")) > 3}
+
+    columns = LengthValidator.columns_from_records([{"nombre": "Ana"}, {"nombre": "Beatriz"}, {}])
+    assert LengthValidator.validate_batch(columns)["valido"].tolist() == [False, True, False]
+
+def test_validate_batch_accepts_dict_of_arrays():
+    columns = {
+        "numero_factura": np.array(["F-1", None], dtype=object),
+        "fecha_emision": np.array(["01/02/2024", "01/02/2024"], dtype=object),
+        "total_factura": np.array([10.0, 10.0]),
+    }
+    assert FacturaValidator.validate_batch(columns)["valido"].tolist() == [True, False]
@@ -0,0 +1,71 @@
+import os
+import numpy as np
+import pytest
+from datetime import datetime
+from document_processor.db import database, insert
+from document_processor.db.query import iter_documents_with_raw_text
+from document_processor.models import DocumentMetadata, ProcessedDocument
+from document_processor.utils.block_store import BlockStore, block_store_path, write_block_store
+from document_processor.utils.table_utils import _synthetic_response, parse_textract_tables
+
+BLOCKS = [
+    {"BlockType": "PAGE", "Id": "page-1", "Page": 1, "Geometry": {"BoundingBox": {"Left": 0.0, "Top": 0.0, "Width": 1.0, "Height": 1.0}},
+     "Relationships": [{"Type": "CHILD", "Ids": ["line-1", "missing-id"]}]},
+    {"BlockType": "LINE", "Id": "line-1", "Page": 1, "Text": "Firma: José", "Confidence": 99.5,
+     "Geometry": {"BoundingBox": {"Left": 0.25, "Top": 0.5, "Width": 0.5, "Height": 0.125},
+                  "Polygon": [{"X": 0.25, "Y": 0.5}, {"X": 0.75, "Y": 0.5}, {"X": 0.75, "Y": 0.625}]},
+     "Relationships": [{"Type": "CHILD", "Ids": ["word-1", "word-2"]}]},
+    {"BlockType": "WORD", "Id": "word-1", "Page": 1, "Text": "Firma:", "TextType": "PRINTED", "Confidence": 99.0},
+    {"BlockType": "WORD", "Id": "word-2", "Page": 1, "Text": "José", "TextType": "HANDWRITING", "Confidence": 80.5},
+    {"BlockType": "SELECTION_ELEMENT", "Id": "sel-1", "Page": 2, "SelectionStatus": "SELECTED", "Confidence": 90.0},
+    {"BlockType": "KEY_VALUE_SET", "Id": "kv-1", "Page": 2, "EntityTypes": ["KEY"],
+     "Relationships": [{"Type": "VALUE", "Ids": ["sel-1"]}, {"Type": "CHILD", "Ids": ["word-1"]}]},
+]
+
+def test_round_trip(tmp_path):
+    store = BlockStore(write_block_store(str(tmp_path / "doc.blocks"), BLOCKS))
+    expected = [dict(block) for block in BLOCKS]
+    expected[0]["Relationships"] = [{"Type": "CHILD", "Ids": ["line-1"]}] # Dangling Ids are dropped
+    assert store.to_blocks() == expected
+    assert [block["Id"] for block in store.to_blocks(["WORD"])] == ["word-1", "word-2"]
+
+def test_column_readers(tmp_path):
+    store = BlockStore(write_block_store(str(tmp_path / "doc.blocks"), BLOCKS))
+    assert len(store) == len(BLOCKS)
+    assert isinstance(store.column("page"), np.memmap)
+    assert store.rows(block_type="WORD").tolist() == [2, 3]
+    assert store.rows(page=2).tolist() == [4, 5]
+    assert store.rows(block_type="TABLE").tolist() == []
+    assert store.texts(store.related(1)) == ["Firma:", "José"]
+    assert store.related(5, "VALUE").tolist() == [4]
+    assert store.entity_types(5) == ["KEY"]
+    assert store.text(0) == ""
+    assert np.isnan(store.column("confidence")[0])
+
+def test_tables_from_store_match_tables_from_response(tmp_path):
+    response = _synthetic_response(pages=3, rows=4)
+    blocks = [block for page in response for block in page["Blocks"]]
+    store = BlockStore(write_block_store(str(tmp_path / "doc.blocks"), blocks))
+    from_store = parse_textract_tables(store.to_blocks(["TABLE", "CELL", "WORD"]))
+    assert [t.to_records() for t in from_store] == [t.to_records() for t in parse_textract_tables(response)]
+
+def test_rewrite_replaces_store(tmp_path):
+    path = str(tmp_path / "doc.blocks")
+    write_block_store(path, BLOCKS)
+    assert len(BlockStore(write_block_store(path, BLOCKS[:2]))) == 2
+    assert len(BlockStore(write_block_store(path, []))) == 0
+
+def test_blocks_are_archived_next_to_raw_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_FILE", str(tmp_path / "documents.db"))
+    monkeypatch.setattr(insert, "RAW_TEXT_DIR", str(tmp_path / "raw_text"))
+    database.initialize_database()
+    try:
+        metadata = DocumentMetadata(document_id="doc-1", file_name="doc-1.pdf", file_type=".pdf",
+                                    upload_date=datetime(2024, 1, 1), processing_status="completed")
+        insert.store_documents_bulk([ProcessedDocument(metadata=metadata, raw_text="Firma: José", raw_blocks=BLOCKS)])
+        (document,) = iter_documents_with_raw_text()
+        path = block_store_path(document["raw_text_path"])
+        assert os.path.dirname(path) == os.path.dirname(document["raw_text_path"])
+        assert BlockStore(path).texts([1]) == ["Firma: José"]
+    finally:
+        database.close_db_connections()
@@ -0,0 +1,70 @@
+import random
+import pytest
+from document_processor.classifier import (
+    DocumentClassifier, DocumentTypeRule, KeywordClassifierEngine,
+)
+from document_processor.utils.text_utils import trie_regex_pattern
+
+@pytest.mark.parametrize("text_input, expected_type", [
+    ("CERTIFICADO FINAL DE OBRA\nFirma del Director de Obra: ...", "certificado_final"),
+    ("Factura Nº 12345\nCliente: Juan Pérez\nTotal: 100.00 EUR", "factura"),
+    ("MEMORIA DE ACTUACIÓN\nProyecto: Alfa\nObjetivos: Detallar el alcance...", "memoria_actuacion"),
+    ("Un texto genérico sin palabras clave específicas.", None),
+    ("", None),
+    ("Este es un certificado final de obra pero sin la firma del director de obra.", None), # Vetoed
+    ("Solo la palabra factura no es suficiente.", None), # Missing required keywords
+    ("Certificado final de obra. Factura del cliente, total 100.", "certificado_final"), # Rule order wins
+])
+def test_default_rules(text_input, expected_type):
+    assert DocumentClassifier(text_input).classify() == expected_type
+
+def test_confidence_and_scores_of_all_candidates():
+    text = "Factura Nº 1. Cliente: X. Base imponible 100, IVA 21, Total 121."
+    result = DocumentClassifier(text).classify_with_confidence()
+    assert result.document_type == "factura"
+    assert result.confidence == pytest.approx(6.0 / 6.5) # All but "nif"
+
+    result = DocumentClassifier(text + " Certificado final de obra adjunto.").classify_with_confidence()
+    assert result.document_type == "certificado_final" # Earlier rule, even with a lower confidence
+    assert result.confidence == pytest.approx(3.0 / 5.0)
+    assert set(result.scores) == {"factura", "certificado_final"}
+
+def test_first_qualifying_rule_wins():
+    engine = KeywordClassifierEngine([
+        DocumentTypeRule("a", keywords={"alfa": 1.0, "comun": 1.0}, min_score=2.0),
+        DocumentTypeRule("b", keywords={"beta": 1.0, "comun": 1.0}, min_score=1.0),
+    ])
+    assert engine.classify("alfa beta comun").document_type == "a"
+    assert engine.classify("beta comun").document_type == "b"
+    assert engine.classify("comun").document_type == "b" # Below a's min_score
+    assert engine.classify("nada").document_type is None
+
+def test_negative_weights_penalize():
+    engine = KeywordClassifierEngine([
+        DocumentTypeRule("acta", keywords={"acta": 2.0, "borrador": -2.0}, min_score=1.0),
+    ])
+    assert engine.classify("acta de recepción").document_type == "acta"
+    assert engine.classify("borrador de acta").document_type is None
+
+def test_overlapping_and_nested_keywords_are_all_found():
+    engine = KeywordClassifierEngine([DocumentTypeRule("x", keywords={
+        "factura": 1, "factura nº": 1, "nº de pedido": 1, "total": 1, "subtotal": 1, "ura": 1,
+    })])
+    assert engine.find_keywords("factura nº de pedido; subtotal") == {
+        "factura", "factura nº", "nº de pedido", "total", "subtotal", "ura",
+    }
+
+def test_scan_matches_naive_substring_checks_on_many_keywords():
+    rng = random.Random(7)
+    alphabet = "abcde "
+    vocabulary = {"".join(rng.choice(alphabet) for _ in range(rng.randint(2, 6))).strip() or "a" for _ in range(300)}
+    engine = KeywordClassifierEngine([DocumentTypeRule("x", keywords={k: 1.0 for k in vocabulary})])
+    for _ in range(20):
+        text = "".join(rng.choice(alphabet) for _ in range(500))
+        assert engine.find_keywords(text) == {k for k in vocabulary if k in text}
+
+def test_trie_pattern_prefers_longest_keyword():
+    import re
+    assert re.match(trie_regex_pattern(["fac", "factura", "facturas"]), "facturas").group() == "facturas"
+    assert re.match(trie_regex_pattern(["fac", "factura", "facturas"]), "factur").group() == "fac"
+
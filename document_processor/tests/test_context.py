@@ -0,0 +1,76 @@
+import pickle
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from operator import methodcaller
+from unittest.mock import MagicMock, patch
+from document_processor.context import DocumentContext
+from document_processor.classifier import DocumentClassifier
+from document_processor.extractors.certificado_final import CertificadoFinalExtractor
+from document_processor.validators.certificado_final_validator import CertificadoFinalValidator
+
+example_text = """
+    CERTIFICADO FINAL DE OBRA
+    Firmado por el Director de Obra y Director de Ejecución
+    Fecha: 15/05/2025
+    Sin   observaciones.
+"""
+
+def test_context_loads_lazily_and_once():
+    loader = MagicMock(return_value={"text": example_text, "blocks": [{"BlockType": "LINE"}]})
+    context = DocumentContext(loader=loader)
+    assert not context.is_loaded
+    loader.assert_not_called()
+
+    assert context.text == example_text
+    assert context.blocks == [{"BlockType": "LINE"}]
+    assert "certificado final de obra" in context.text_lower
+    assert "sin observaciones." in context.normalized_text
+    loader.assert_called_once()
+
+def test_classifier_and_extractor_share_one_ocr_call():
+    loader = MagicMock(return_value=example_text)
+    context = DocumentContext(loader=loader)
+
+    assert DocumentClassifier(context).classify() == "certificado_final"
+    result = CertificadoFinalExtractor(context=context).extract()
+
+    assert result["firmas"] is True
+    assert result["fecha"] == "15/05/2025"
+    loader.assert_called_once()
+
+@patch('document_processor.base.base_extractor.extract_text_from_document')
+def test_extractor_defers_ocr_until_extract(mock_extract_text):
+    mock_extract_text.return_value = example_text
+    extractor = CertificadoFinalExtractor(bucket_name="test-bucket", document_key="test-key.pdf")
+    mock_extract_text.assert_not_called()
+    extractor.extract()
+    extractor.extract()
+    mock_extract_text.assert_called_once_with("test-bucket", "test-key.pdf", "us-east-1")
+
+def test_extractor_accepts_text_or_context():
+    context = DocumentContext.from_text(example_text)
+    assert CertificadoFinalExtractor(example_text).extract() == CertificadoFinalExtractor(context).extract()
+    assert CertificadoFinalExtractor(context).context is context
+    with pytest.raises(ValueError):
+        CertificadoFinalExtractor(example_text, context=context)
+    with pytest.raises(ValueError):
+        CertificadoFinalExtractor()
+
+def test_loaded_context_pickles_without_loader_or_derived_views():
+    context = DocumentContext(loader=lambda: example_text) # A lambda cannot be pickled
+    assert "certificado" in context.text_lower
+
+    restored = pickle.loads(pickle.dumps(context))
+
+    assert restored.is_loaded and restored.text == example_text
+    assert "text_lower" not in restored.__dict__
+    assert restored.text_lower == context.text_lower
+
+def test_extractors_and_validators_run_in_worker_processes():
+    extractors = [CertificadoFinalExtractor(example_text), CertificadoFinalExtractor(example_text.replace("Obra", "X"))]
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(methodcaller("extract"), extractors))
+        validations = list(executor.map(methodcaller("validate"), [CertificadoFinalValidator(r) for r in results]))
+
+    assert results == [extractor.extract() for extractor in extractors]
+    assert validations == [CertificadoFinalValidator(r).validate() for r in results]
@@ -0,0 +1,239 @@
+import threading
+import pytest
+from document_processor.db import database
+from document_processor.db.database import ConnectionPool
+from document_processor.db.insert import store_document_data
+from document_processor.db.query import find_documents
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "documents.db")
+    monkeypatch.setattr(database, "DATABASE_FILE", path)
+    database.initialize_database()
+    yield path
+    database.close_db_connections()
+
+def test_connections_are_reused_and_use_wal(db_file):
+    pool = ConnectionPool(db_file)
+    first = pool.acquire()
+    raw = first._conn
+    assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert first.execute("PRAGMA synchronous").fetchone()[0] == 1 # NORMAL
+    first.close()
+
+    second = pool.acquire()
+    assert second._conn is raw
+    second.close()
+    assert pool.stats()["connections"] == 1
+    assert pool.stats()["acquisitions"] == 2
+    pool.close_all()
+
+def test_nested_acquire_in_one_thread_shares_the_connection(db_file):
+    pool = ConnectionPool(db_file)
+    outer = pool.acquire()
+    inner = pool.acquire()
+    assert inner._conn is outer._conn
+    inner.close()
+    assert pool.stats()["idle_connections"] == 0 # Still held by the outer caller
+    outer.close()
+    assert pool.stats()["idle_connections"] == 1
+    pool.close_all()
+
+INSERT_DOCUMENT = "INSERT INTO documents (id, file_name, upload_timestamp, processing_status) VALUES (?, 'x.pdf', 'now', 'pending')"
+
+def test_nested_commit_does_not_commit_the_outer_transaction(db_file):
+    pool = ConnectionPool(db_file)
+    outer = pool.acquire()
+    outer.execute(INSERT_DOCUMENT, ("outer",))
+    inner = pool.acquire()
+    inner.execute(INSERT_DOCUMENT, ("inner",))
+    inner.commit() # Only releases the nested savepoint
+    inner.close()
+    discarded = pool.acquire()
+    discarded.execute(INSERT_DOCUMENT, ("discarded",))
+    discarded.close() # Uncommitted nested work is undone, the outer transaction stays open
+    assert outer.in_transaction
+    outer.rollback()
+    assert outer.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 0
+
+    outer.execute(INSERT_DOCUMENT, ("outer",))
+    with pool.acquire() as inner:
+        inner.execute(INSERT_DOCUMENT, ("inner",))
+    inner.close()
+    discarded = pool.acquire()
+    discarded.execute(INSERT_DOCUMENT, ("discarded",))
+    discarded.close()
+    outer.commit()
+    outer.close()
+    conn = pool.acquire()
+    assert [r[0] for r in conn.execute("SELECT id FROM documents ORDER BY id")] == ["inner", "outer"]
+    conn.close()
+    pool.close_all()
+
+def test_acquire_times_are_exported_as_metrics(db_file):
+    from document_processor.metrics import DB_ACQUIRE_SECONDS, REGISTRY
+    DB_ACQUIRE_SECONDS.clear()
+    pool = ConnectionPool(db_file)
+    pool.acquire().close()
+    pool.acquire().close()
+    assert DB_ACQUIRE_SECONDS.snapshot()[(db_file,)][1] == 2
+    assert "document_processor_db_acquire_seconds_count" in REGISTRY.render()
+    pool.close_all()
+
+def test_release_rolls_back_uncommitted_work(db_file):
+    pool = ConnectionPool(db_file)
+    conn = pool.acquire()
+    conn.execute("INSERT INTO documents (id, file_name, upload_timestamp, processing_status) VALUES ('x', 'x.pdf', 'now', 'pending')")
+    conn.close()
+
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 0
+    conn.close()
+    pool.close_all()
+
+def test_pool_bounds_connections_and_records_waits(db_file):
+    pool = ConnectionPool(db_file, max_connections=1)
+    held = pool.acquire()
+    acquired = threading.Event()
+
+    def other_thread():
+        pool.acquire().close()
+        acquired.set()
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    assert not acquired.wait(0.2) # Blocked: the only connection is in use
+    held.close()
+    thread.join(5)
+    assert acquired.is_set()
+    assert pool.stats()["waits"] == 1
+    assert pool.stats()["connections"] == 1
+    pool.close_all()
+
+def test_connections_in_use_are_closed_when_released_after_close_all(db_file):
+    import sqlite3
+    pool = ConnectionPool(db_file, max_connections=1)
+    held = pool.acquire()
+    raw = held._conn
+    errors = []
+
+    def waiting_thread():
+        try:
+            pool.acquire()
+        except sqlite3.ProgrammingError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=waiting_thread)
+    thread.start()
+    pool.close_all()
+    thread.join(5)
+    assert len(errors) == 1 # The waiter is not handed the connection
+    assert held.execute("SELECT 1").fetchone()[0] == 1 # Still usable until released
+    held.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        raw.execute("SELECT 1")
+    assert pool.stats()["connections"] == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        pool.acquire()
+
+def test_close_db_connections_retires_the_pools(db_file):
+    conn = database.get_db_connection()
+    pool = database.get_connection_pool()
+    database.close_db_connections()
+    conn.close()
+    assert pool.stats()["connections"] == 0
+    assert database.get_connection_pool() is not pool
+    database.get_db_connection().close()
+
+def test_concurrent_writers_and_readers_do_not_lock(db_file):
+    errors = []
+
+    def writer(n):
+        for i in range(20):
+            ok = store_document_data({"metadata": {
+                "document_id": f"doc-{n}-{i}", "file_name": "a.pdf", "file_type": ".pdf",
+                "upload_date": "2024-01-01T00:00:00", "processing_status": "completed",
+            }})
+            if not ok:
+                errors.append((n, i))
+
+    def reader():
+        for _ in range(20):
+            find_documents(limit=10)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    threads += [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(find_documents(limit=1000)) == 80
+
+def _processed_doc(doc_id, with_data=True):
+    doc = {"metadata": {
+        "document_id": doc_id, "file_name": f"{doc_id}.pdf", "file_type": ".pdf",
+        "upload_date": "2024-01-01T00:00:00", "processing_status": "completed",
+    }}
+    if with_data:
+        doc["extracted_data"] = {"document_type": "factura", "fields": {"total": 100}}
+        doc["validation_result"] = {"is_valid": True, "details": {"total": "ok"}}
+    return doc
+
+def test_store_documents_bulk_commits_once_per_batch(db_file, monkeypatch):
+    from document_processor.db import insert
+    from document_processor.db.query import get_document_details_by_id
+    commits = []
+    real_get_db_connection = insert.get_db_connection
+
+    class CommitCountingConnection:
+        def __init__(self, conn):
+            self.conn = conn
+        def commit(self):
+            commits.append(1)
+            self.conn.commit()
+        def __getattr__(self, name):
+            return getattr(self.conn, name)
+
+    monkeypatch.setattr(insert, "get_db_connection", lambda: CommitCountingConnection(real_get_db_connection()))
+
+    docs = (_processed_doc(f"doc-{i}", with_data=i % 2 == 0) for i in range(25))
+    assert insert.store_documents_bulk(docs, batch_size=10, flush_interval=3600) == 25
+
+    assert len(commits) == 3 # 10 + 10 + 5
+    assert get_document_details_by_id("doc-4")["extracted_data"]["fields"] == {"total": 100}
+    assert get_document_details_by_id("doc-4")["validation_result"]["is_valid"] is True
+    assert get_document_details_by_id("doc-5")["extracted_data"] is None
+
+def test_store_documents_bulk_flushes_partial_batch_after_interval(db_file):
+    from document_processor.db import insert
+    seen_before_next = []
+
+    def slow_stream():
+        yield _processed_doc("doc-1")
+        yield _processed_doc("doc-2") # flush_interval=0 flushes as each document arrives
+        seen_before_next.append(len(find_documents(limit=10)))
+        yield _processed_doc("doc-3")
+
+    assert insert.store_documents_bulk(slow_stream(), batch_size=1000, flush_interval=0) == 3
+    assert seen_before_next == [2]
+
+def test_store_documents_bulk_accepts_models_and_skips_missing_ids(db_file):
+    from datetime import datetime
+    from document_processor.db import insert
+    from document_processor.models import DocumentMetadata, ProcessedDocument
+    model = ProcessedDocument(metadata=DocumentMetadata(
+        document_id="model-1", file_name="m.pdf", file_type=".pdf",
+        upload_date=datetime(2024, 1, 1), processing_status="completed"))
+
+    assert insert.store_documents_bulk([model, {"metadata": {}}]) == 1
+    assert find_documents(limit=10)[0]["id"] == "model-1"
+
+def test_migrations_are_applied_once(db_file):
+    conn = database.get_db_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == database.MIGRATIONS[-1][0]
+    indexes = {row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_documents_status_type_upload" in indexes
+    assert database.apply_migrations(conn) == database.MIGRATIONS[-1][0] # Nothing left to apply
+    conn.close()
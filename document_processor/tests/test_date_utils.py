@@ -0,0 +1,49 @@
+import pytest
+from datetime import date, datetime
+from document_processor.utils.date_utils import (
+    COMMON_DATE_FORMATS, find_and_parse_dates, parse_date_string, parse_day_month_year,
+)
+
+def strptime_loop(date_str):
+    for fmt in COMMON_DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+@pytest.mark.parametrize("date_str", [
+    "15/05/2024", "5/5/2024", "15-05-2024", "2024-05-15", "2024/5/15", "15.05.2024", "05/15/2024",
+    "15 May 2024", "15   may   2024", "15 DECEMBER 2024", "20240515", "20231301", "30/02/2024", "31/02/2024",
+    "15.05-2024", "2024.05.15", "15/05/24", "0/5/2024", "001/12/2023", "1/ 5/2024", "15th May 2024", "Sept 2024",
+    "  15/05/2024  ", "abc", "99/99/9999",
+    "١٥/٠٥/٢٠٢٤", "٣/٤/٢٠٢٤", "15\u00a0May\u00a02024", # Non-ASCII digits are not dates; Unicode spaces separate
+])
+def test_engine_matches_strptime_formats(date_str):
+    assert parse_date_string(date_str) == strptime_loop(date_str)
+
+def test_spanish_month_names():
+    assert parse_date_string("15 de mayo de 2024") == date(2024, 5, 15)
+    assert parse_date_string("3 ene. 2024") == date(2024, 1, 3)
+    assert parse_date_string("1 Setiembre 2023") == date(2023, 9, 1)
+    assert parse_date_string("31 de febrero de 2024") is None
+    assert parse_date_string("15 de mayo del 2024") == date(2024, 5, 15)
+
+def test_custom_formats_still_use_them():
+    assert parse_date_string("2024|05|15", formats=["%Y|%m|%d"]) == date(2024, 5, 15)
+    assert parse_date_string("15/05/2024", formats=["%Y|%m|%d"]) is None
+
+@pytest.mark.parametrize("date_str", ["15/05/2024", "5/05/2024", " 5/05/2024", "15/5/2024", "15-05-2024", "2024/05/15", "32/01/2024", "", "15/05/2024 ", "１５/05/2024"])
+def test_parse_day_month_year_matches_strptime(date_str):
+    try:
+        expected = datetime.strptime(date_str, "%d/%m/%Y").date()
+    except ValueError:
+        expected = None
+    assert parse_day_month_year(date_str) == expected
+
+def test_find_and_parse_dates_in_text():
+    text = ("Emitida el 10/01/2023, revisión 2023-12-31. Reunión el 05 Feb 2024 y el 20.03.2024.\n"
+            "Código 20231120. Firmado el 3 de marzo de 2024. Inválida: 99/99/9999. Repetida: 10/01/2023.")
+    assert find_and_parse_dates(text) == [
+        date(2023, 1, 10), date(2023, 11, 20), date(2023, 12, 31), date(2024, 2, 5), date(2024, 3, 3), date(2024, 3, 20),
+    ]
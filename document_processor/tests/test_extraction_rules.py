@@ -0,0 +1,114 @@
+import re
+import pytest
+from document_processor.base.extraction_rules import ConstantField, ExtractionRuleSet, KeywordField, RegexField
+from document_processor.extractors.certificado_final import CertificadoFinalExtractor
+from document_processor.extractors.facturas import FacturaExtractor
+from document_processor.extractors.memoria_actuacion import MemoriaActuacionExtractor
+from document_processor.context import DocumentContext
+
+# --- Previous per-field implementations, used as the reference behaviour ---
+def reference_certificado(text):
+    match = re.search(r"\b(\d{2}/\d{2}/\d{4})\b", text)
+    return {
+        "firmas": "director de obra" in text.lower() and "director de ejecución" in text.lower(),
+        "fecha": match.group(1) if match else None,
+        "observaciones": "observaciones" in text.lower() or "reparos" in text.lower(),
+    }
+
+def reference_factura(text):
+    numero = re.search(r"(?:Factura N[ºo\.]?|Invoice #)\s*([A-Za-z0-9\-]+)", text, re.IGNORECASE)
+    fecha = re.search(r"(?:Fecha Factura|Date)[:\s]*(\d{2}[-/]\d{2}[-/]\d{4})", text, re.IGNORECASE) \
+        or re.search(r"(\d{2}/\d{2}/\d{4})", text)
+    total = re.search(r"(?:TOTAL|Total Factura|Importe Total|Amount Due)\s*[:€$]?\s*([\d\.,]+)", text, re.IGNORECASE)
+    total_value = None
+    if total:
+        try:
+            total_value = float(total.group(1).replace('€', '').replace('$', '').replace('.', '').replace(',', '.'))
+        except ValueError:
+            pass
+    return {
+        "numero_factura": numero.group(1) if numero else None,
+        "fecha_emision": fecha.group(1) if fecha else None,
+        "total_factura": total_value,
+        "emisor_nombre": "Placeholder Emisor S.L.",
+        "receptor_nombre": "Placeholder Cliente S.A.",
+    }
+
+def reference_memoria(text):
+    titulo = re.search(r"^(?:Título del Proyecto|Proyecto|Actuación)[:\s]*(.+)$", text, re.IGNORECASE | re.MULTILINE)
+    fecha = re.search(r"(?:Fecha de Elaboración|Fecha)[:\s]*(\d{2}[-/]\d{2}[-/]\d{4})", text, re.IGNORECASE)
+    resumen = re.search(r"(?:Resumen Ejecutivo|Resumen)\s*[:\n](.*?)(?:\n\n\w+[:\n]|\Z)", text, re.IGNORECASE | re.DOTALL | re.MULTILINE)
+    return {
+        "titulo_proyecto": titulo.group(1).strip() if titulo else None,
+        "fecha_elaboracion": fecha.group(1) if fecha else None,
+        "entidad_promotora": "Placeholder Entidad",
+        "resumen": resumen.group(1).strip()[:500] + "..." if resumen else "Resumen no encontrado o lógica no implementada.",
+    }
+
+FACTURA_TEXTS = [
+    "FACTURA Nº F2023-001\nFecha Factura: 25/12/2023\nEmisor: Proveedor\nCliente: Test\n"
+    "Concepto Cantidad Precio Total\nServicio X 1 100.00 100.00\nBase Imponible: 200.00\nIVA (21%): 42.00\nTotal Factura: 242.00 EUR",
+    "Invoice # INV-789\nDate: 01/01/2024\nAmount Due $ 150.55",
+    "Factura 12\nEmitida el 03/04/2024 con vencimiento 03/05/2024\nImporte Total: 1.234,56 €",
+    "Factura sin número ni fecha. Total: abc",
+    "",
+]
+MEMORIA_TEXTS = [
+    "MEMORIA DE ACTUACIÓN\n\nTítulo del Proyecto: Desarrollo de Nueva Plataforma\nFecha de Elaboración: 15/03/2024\n"
+    "Resumen Ejecutivo:\nEl presente documento describe el plan.\nSe detallan objetivos.\n\n1. Introducción\n...",
+    "Proyecto: Mejora Eficiencia Energética\nFecha: 01/02/2023\n\nResumen\nEste proyecto busca reducir el consumo.",
+    "    Proyecto: sangrado\nsin fecha ni resumen",
+]
+CERTIFICADO_TEXTS = [
+    "CERTIFICADO FINAL DE OBRA\nFirmado por el Director de Obra y Director de Ejecución\nFecha: 15/05/2025\nSin observaciones.",
+    "Certificado final de obra con reparos. Director de obra: X. 1/2/2024",
+    "",
+]
+
+@pytest.mark.parametrize("text", FACTURA_TEXTS)
+def test_factura_rules_match_previous_extractor(text):
+    assert FacturaExtractor(context=DocumentContext.from_text(text)).extract() == reference_factura(text)
+
+@pytest.mark.parametrize("text", MEMORIA_TEXTS)
+def test_memoria_rules_match_previous_extractor(text):
+    assert MemoriaActuacionExtractor(context=DocumentContext.from_text(text)).extract() == reference_memoria(text)
+
+@pytest.mark.parametrize("text", CERTIFICADO_TEXTS)
+def test_certificado_rules_match_previous_extractor(text):
+    assert CertificadoFinalExtractor(context=DocumentContext.from_text(text)).extract() == reference_certificado(text)
+
+def test_fields_are_matched_independently():
+    rules = ExtractionRuleSet([
+        RegexField("etiqueta", (r"(Ref: \d+)",)),
+        RegexField("numero", (r"(\d+)",)), # Only occurrence is inside the other field's match
+    ])
+    assert rules.extract("Ref: 42") == {"etiqueta": "Ref: 42", "numero": "42"}
+
+def test_pattern_priority_beats_position():
+    rules = ExtractionRuleSet([RegexField("fecha", (r"Emisión: (\S+)", r"(\d\d/\d\d)"), default="n/a")])
+    assert rules.extract("12/01 ... Emisión: 03/04") == {"fecha": "03/04"}
+    assert rules.extract("12/01 y 15/02") == {"fecha": "12/01"}
+    assert rules.extract("nada") == {"fecha": "n/a"}
+
+def test_keyword_and_constant_fields():
+    rules = ExtractionRuleSet([
+        KeywordField("firmada", all_of=("firma", "sello")),
+        KeywordField("con_reparos", any_of=("reparos", "observaciones")),
+        ConstantField("origen", "ocr"),
+    ])
+    assert rules.extract("FIRMA y SELLO, con Observaciones") == {"firmada": True, "con_reparos": True, "origen": "ocr"}
+    assert rules.extract("firma") == {"firmada": False, "con_reparos": False, "origen": "ocr"}
+
+def test_invalid_rules_are_rejected_at_compile_time():
+    with pytest.raises(ValueError):
+        ExtractionRuleSet([RegexField("a", (r"(?P<x>\d)",))])
+    with pytest.raises(ValueError):
+        ExtractionRuleSet([RegexField("a", (r"\d",))]) # No group 1
+    with pytest.raises(ValueError):
+        ExtractionRuleSet([ConstantField("a", 1), ConstantField("a", 2)])
+
+def test_case_insensitive_fields_keep_original_case_of_value():
+    rules = ExtractionRuleSet([RegexField("ref", (r"ref:\s*([a-z0-9]+)",), flags=re.IGNORECASE)])
+    assert rules.extract("REF: AbC12") == {"ref": "AbC12"}
+    # "İ" lowercases to two characters, so spans of the lowercased text are not usable
+    assert rules.extract("İİ REF: AbC12") == {"ref": "AbC12"}
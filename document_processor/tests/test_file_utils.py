@@ -0,0 +1,53 @@
+import hashlib
+import io
+import pytest
+from aws_lib.ocr_cache import OCRCache
+from document_processor.utils.file_utils import file_sha256, open_file_view, stream_to_file
+from document_processor.utils.textract_utils import TextractClient
+
+class ChunkCountingReader(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.read_sizes = []
+
+    def read(self, size=-1):
+        self.read_sizes.append(size)
+        return super().read(size)
+
+def test_stream_to_file_copies_in_chunks_and_hashes(tmp_path):
+    content = b"%PDF-1.4 " + bytes(range(256)) * 40
+    source = ChunkCountingReader(content)
+    stored = stream_to_file(source, str(tmp_path / "docs" / "a.pdf"), chunk_size=1000)
+
+    assert stored.size == len(content)
+    assert stored.sha256 == hashlib.sha256(content).hexdigest() == file_sha256(stored.path)
+    assert (tmp_path / "docs" / "a.pdf").read_bytes() == content
+    assert set(source.read_sizes) == {1000} # Never asked for the whole stream at once
+
+def test_stream_to_file_leaves_nothing_behind_on_error(tmp_path):
+    class FailingReader(io.BytesIO):
+        def read(self, size=-1):
+            raise IOError("client disconnected")
+
+    with pytest.raises(IOError):
+        stream_to_file(FailingReader(), str(tmp_path / "a.pdf"))
+    assert list(tmp_path.iterdir()) == []
+
+def test_open_file_view_maps_file_and_handles_empty_files(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"abc")
+    (tmp_path / "empty.pdf").write_bytes(b"")
+
+    with open_file_view(str(tmp_path / "a.pdf")) as view:
+        assert view[:] == b"abc"
+    with open_file_view(str(tmp_path / "empty.pdf")) as view:
+        assert len(view) == 0
+
+def test_textract_client_reuses_upload_hash_as_cache_key(tmp_path):
+    content = b"%PDF-1.4 fake content"
+    stored = stream_to_file(io.BytesIO(content), str(tmp_path / "a.pdf"))
+    client = TextractClient(ocr_cache=OCRCache(str(tmp_path / "cache")))
+
+    text = client.extract_text(stored.path, content_sha256=stored.sha256)
+    # Same content read through the mmap path without a known hash hits the same entry
+    assert client.extract_text(stored.path) == text
+    assert client.ocr_cache.stats()["hits"] == 1
@@ -0,0 +1,235 @@
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+from document_processor.db import database, job_queue
+from document_processor.db.query import get_document_details_by_id
+from document_processor.models import DocumentMetadata, ProcessedDocument
+from document_processor.worker_pool import QueueWorkerPool
+
+@pytest.fixture(autouse=True)
+def temp_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_FILE", str(tmp_path / "documents.db"))
+    database.initialize_database()
+    yield
+    database.close_db_connections()
+
+def test_jobs_are_claimed_by_lane_priority_then_fifo():
+    job_queue.enqueue_job("memoria-1", "/tmp/m1.pdf", "m1.pdf", ".pdf", lane="memoria_actuacion")
+    job_queue.enqueue_job("other-1", "/tmp/o1.pdf", "o1.pdf", ".pdf")
+    job_queue.enqueue_job("factura-1", "/tmp/f1.pdf", "f1.pdf", ".pdf", lane="factura")
+    job_queue.enqueue_job("factura-2", "/tmp/f2.pdf", "f2.pdf", ".pdf", lane="FACTURA")
+
+    claimed = [job_queue.claim_next_job()["id"] for _ in range(4)]
+
+    assert claimed == ["factura-1", "factura-2", "other-1", "memoria-1"]
+    assert job_queue.claim_next_job() is None
+    assert job_queue.count_jobs_by_status() == {"running": 4}
+
+def test_expired_lease_is_requeued_then_failed_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(job_queue, "QUEUE_MAX_ATTEMPTS", 2)
+    job_queue.enqueue_job("doc-1", "/tmp/d1.pdf", "d1.pdf", ".pdf")
+
+    assert job_queue.claim_next_job(lease_seconds=-1)["attempts"] == 1 # Worker "dies"
+    assert job_queue.claim_next_job(lease_seconds=-1)["attempts"] == 2 # Reclaimed, dies again
+    assert job_queue.get_job("doc-1")["finished_timestamp"] is None # Requeued, not finished
+    assert job_queue.claim_next_job() is None
+
+    job = job_queue.get_job("doc-1")
+    assert job["status"] == "failed"
+    assert "lease expired" in job["error_message"]
+    assert job["finished_timestamp"] is not None # As when a worker calls fail_job
+
+def test_jobs_failed_by_expired_leases_drop_their_checkpoints(monkeypatch):
+    from document_processor.db.checkpoints import load_checkpoint, save_checkpoint
+    monkeypatch.setattr(job_queue, "QUEUE_MAX_ATTEMPTS", 2)
+    job_queue.enqueue_job("doc-1", "/tmp/d1.pdf", "d1.pdf", ".pdf")
+    save_checkpoint("doc-1", "ocr", raw_text="FACTURA Nº F1")
+    save_checkpoint("doc-2", "ocr", raw_text="FACTURA Nº F2") # Another document's
+
+    job_queue.claim_next_job(lease_seconds=-1)
+    job_queue.claim_next_job(lease_seconds=-1) # Requeued: the retry resumes from the checkpoint
+    assert load_checkpoint("doc-1")["raw_text"] == "FACTURA Nº F1"
+
+    assert job_queue.claim_next_job() is None # Expired on the last attempt
+    assert job_queue.get_job("doc-1")["status"] == "failed"
+    assert load_checkpoint("doc-1") is None
+    assert load_checkpoint("doc-2") is not None
+
+def test_stage_updates_are_visible_while_running():
+    job_queue.enqueue_job("doc-1", "/tmp/d1.pdf", "d1.pdf", ".pdf")
+    job_queue.claim_next_job()
+    job_queue.update_job_stage("doc-1", "processing_extraction")
+
+    job = job_queue.get_job("doc-1")
+    assert (job["status"], job["stage"]) == ("running", "processing_extraction")
+
+def test_worker_pool_runs_pipeline_and_stores_result():
+    job_queue.enqueue_job("doc-1", "/tmp/d1.pdf", "d1.pdf", ".pdf")
+    stages_seen = []
+
+    def pipeline_factory(job, on_status_change):
+        def run():
+            on_status_change(job["id"], "processing_ocr")
+            stages_seen.append(job_queue.get_job(job["id"])["stage"])
+            metadata = DocumentMetadata(document_id=job["id"], file_name=job["file_name"],
+                                        file_type=job["file_type"], upload_date=datetime.now(),
+                                        processing_status="completed")
+            return ProcessedDocument(metadata=metadata)
+        return MagicMock(run=run)
+
+    pool = QueueWorkerPool(num_workers=1, pipeline_factory=pipeline_factory)
+    pool.process_job(job_queue.claim_next_job())
+
+    assert stages_seen == ["processing_ocr"]
+    job = job_queue.get_job("doc-1")
+    assert (job["status"], job["stage"]) == ("done", "completed")
+    assert get_document_details_by_id("doc-1")["metadata"]["processing_status"] == "completed"
+
+def test_worker_pool_retries_unexpected_errors_then_marks_job_failed(monkeypatch):
+    from document_processor import worker_pool
+    from document_processor.db import checkpoints
+    monkeypatch.setattr(worker_pool, "QUEUE_MAX_ATTEMPTS", 2)
+    job_queue.enqueue_job("doc-1", "/tmp/d1.pdf", "d1.pdf", ".pdf")
+    checkpoints.save_checkpoint("doc-1", "ocr", raw_text="FACTURA Nº F1")
+    pool = QueueWorkerPool(num_workers=1, pipeline_factory=MagicMock(side_effect=RuntimeError("boom")))
+
+    pool.process_job(job_queue.claim_next_job())
+    assert (job_queue.get_job("doc-1")["status"], job_queue.get_job("doc-1")["error_message"]) == ("queued", "boom")
+
+    pool.process_job(job_queue.claim_next_job())
+    job = job_queue.get_job("doc-1")
+    assert (job["status"], job["attempts"], job["error_message"]) == ("failed", 2, "boom")
+    assert checkpoints.load_checkpoint("doc-1") is None
+
+def test_heartbeat_renews_the_lease_during_long_stages():
+    import time
+    job_queue.enqueue_job("doc-1", "/tmp/d1.pdf", "d1.pdf", ".pdf")
+    job = job_queue.claim_next_job(lease_seconds=1)
+    initial_lease = job_queue.get_job("doc-1")["lease_expires_timestamp"]
+    leases = []
+
+    def run():
+        time.sleep(0.2) # A long OCR call, without stage updates
+        leases.append(job_queue.get_job("doc-1")["lease_expires_timestamp"])
+        metadata = DocumentMetadata(document_id="doc-1", file_name="d1.pdf", file_type=".pdf",
+                                    upload_date=datetime.now(), processing_status="completed")
+        return ProcessedDocument(metadata=metadata)
+
+    pool = QueueWorkerPool(num_workers=1, pipeline_factory=lambda job, cb: MagicMock(run=run), heartbeat_interval=0.05)
+    pool.process_job(job)
+
+    assert leases[0] > initial_lease
+    assert job_queue.get_job("doc-1")["status"] == "done"
+
+FACTURA_TEXT = "FACTURA Nº F1\nCliente: Test\nFecha Factura: 25/12/2023\nTotal: 242,00"
+
+class CountingTextractClient:
+    def __init__(self):
+        self.calls = 0
+
+    def extract_text(self, document_path):
+        self.calls += 1
+        return FACTURA_TEXT
+
+def test_failed_extraction_is_retried_from_its_ocr_checkpoint(monkeypatch):
+    from document_processor import pipeline as pipeline_module
+    from document_processor.db.checkpoints import load_checkpoint
+    from document_processor.pipeline import DocumentProcessingPipeline
+    client = CountingTextractClient()
+    failures = [RuntimeError("Throttled")]
+    real_get_processor = pipeline_module.get_processor
+
+    class FlakyProcessor:
+        def __init__(self, processor):
+            self.processor = processor
+        def extract(self):
+            if failures:
+                raise failures.pop()
+            return self.processor.extract()
+        def __getattr__(self, name):
+            return getattr(self.processor, name)
+
+    def pipeline_factory(job, on_status_change):
+        return DocumentProcessingPipeline(job["document_path"], job["file_name"], job["file_type"], textract_client=client,
+                                          document_id=job["id"], on_status_change=on_status_change, checkpoints=True)
+
+    monkeypatch.setattr(pipeline_module, "get_processor", lambda doc_type, context: FlakyProcessor(real_get_processor(doc_type, context)))
+    job_queue.enqueue_job("doc-1", "/tmp/f1.pdf", "f1.pdf", ".pdf", lane="factura")
+    pool = QueueWorkerPool(num_workers=1, pipeline_factory=pipeline_factory)
+
+    pool.process_job(job_queue.claim_next_job())
+    job = job_queue.get_job("doc-1")
+    assert (job["status"], job["error_message"]) == ("queued", "Extraction failed: Throttled")
+    assert load_checkpoint("doc-1")["stage"] == "classification"
+
+    pool.process_job(job_queue.claim_next_job())
+    job = job_queue.get_job("doc-1")
+    assert (job["status"], job["stage"], job["attempts"]) == ("done", "completed", 2)
+    assert client.calls == 1 # The retry resumed after classification
+    assert get_document_details_by_id("doc-1")["extracted_data"]["fields"]["numero_factura"] == "F1"
+    assert load_checkpoint("doc-1") is None
+
+def test_pipeline_resumes_after_extraction_checkpoint():
+    from document_processor.db.checkpoints import save_checkpoint
+    from document_processor.pipeline import DocumentProcessingPipeline
+    client = CountingTextractClient()
+    save_checkpoint("doc-1", "ocr", raw_text=FACTURA_TEXT)
+    save_checkpoint("doc-1", "classification", document_type="factura")
+    save_checkpoint("doc-1", "extraction", fields={"numero_factura": "F9", "fecha_emision": "25/12/2023"})
+
+    pipeline = DocumentProcessingPipeline("/tmp/f1.pdf", "f1.pdf", ".pdf", textract_client=client,
+                                          document_id="doc-1", checkpoints=True)
+    result = pipeline.run()
+
+    assert client.calls == 0
+    assert result.raw_text == FACTURA_TEXT
+    assert result.extracted_data.fields["numero_factura"] == "F9"
+    assert [t.stage for t in pipeline.stage_timings] == ["validation", "total"]
+
+def test_retries_stop_after_max_attempts(monkeypatch):
+    from document_processor import worker_pool
+    monkeypatch.setattr(worker_pool, "QUEUE_MAX_ATTEMPTS", 1)
+    job_queue.enqueue_job("doc-1", "/tmp/d1.pdf", "d1.pdf", ".pdf")
+
+    def run():
+        metadata = DocumentMetadata(document_id="doc-1", file_name="d1.pdf", file_type=".pdf", upload_date=datetime.now(),
+                                    processing_status="error_validation", error_message="Validation failed: boom")
+        return ProcessedDocument(metadata=metadata)
+    QueueWorkerPool(num_workers=1, pipeline_factory=lambda job, cb: MagicMock(run=run)).process_job(job_queue.claim_next_job())
+
+    assert job_queue.get_job("doc-1")["status"] == "done"
+    assert get_document_details_by_id("doc-1")["metadata"]["processing_status"] == "error_validation"
+
+def test_checkpointed_blocks_are_kept_with_the_raw_text_archive(tmp_path, monkeypatch):
+    from document_processor.db import checkpoints
+    blocks = [{"BlockType": "LINE", "Id": "line-1", "Page": 1, "Text": "FACTURA Nº F1"}]
+    assert checkpoints.save_checkpoint("doc-1", "ocr", raw_text="FACTURA Nº F1", blocks=blocks) # RAW_TEXT_DIR unset
+    assert checkpoints.load_checkpoint("doc-1")["blocks"] is None
+
+    monkeypatch.setattr(checkpoints, "RAW_TEXT_DIR", str(tmp_path / "raw_text"))
+    checkpoints.save_checkpoint("doc-2", "ocr", raw_text="FACTURA Nº F1", blocks=blocks)
+    checkpoints.save_checkpoint("doc-2", "classification", document_type="factura")
+    checkpoint = checkpoints.load_checkpoint("doc-2")
+    assert (checkpoint["stage"], checkpoint["raw_text"], checkpoint["blocks"]) == ("classification", "FACTURA Nº F1", blocks)
+    assert (tmp_path / "raw_text" / "do" / "doc-2.blocks").is_dir()
+
+def test_checkpointed_blocks_are_not_written_again_when_stored(tmp_path, monkeypatch):
+    from document_processor.db import checkpoints, insert
+    from document_processor.utils import block_store
+    raw_text_dir = str(tmp_path / "raw_text")
+    monkeypatch.setattr(checkpoints, "RAW_TEXT_DIR", raw_text_dir)
+    monkeypatch.setattr(insert, "RAW_TEXT_DIR", raw_text_dir)
+    blocks = [{"BlockType": "LINE", "Id": "line-1", "Page": 1, "Text": "FACTURA Nº F1"}]
+    checkpoints.save_checkpoint("doc-1", "ocr", raw_text="FACTURA Nº F1", blocks=blocks)
+    writes = []
+    write_block_store = block_store.write_block_store
+    monkeypatch.setattr(block_store, "write_block_store", lambda path, blocks: writes.append(path) or write_block_store(path, blocks))
+
+    document = {"metadata": {"document_id": "doc-1"}, "raw_text": "FACTURA Nº F1", "raw_blocks": blocks}
+    raw_text_path = insert._archive_document(document)
+    assert writes == []
+    assert block_store.BlockStore(block_store.block_store_path(raw_text_path)).to_blocks() == blocks
+
+    changed = blocks + [{"BlockType": "LINE", "Id": "line-2", "Page": 1, "Text": "Total: 242,00"}]
+    insert._archive_document(dict(document, raw_blocks=changed))
+    assert writes == [block_store.block_store_path(raw_text_path)]
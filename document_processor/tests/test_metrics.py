@@ -0,0 +1,80 @@
+import os
+import pytest
+from document_processor import metrics
+from document_processor.context import DocumentContext
+from document_processor.metrics import FIELD_RULE_SECONDS, STAGE_SECONDS, Histogram, maybe_profile, stage_timer
+from document_processor.pipeline import DocumentProcessingPipeline
+
+FACTURA_TEXT = "FACTURA Nº F1\nCliente: Test\nFecha Factura: 25/12/2023\nTotal: 242,00"
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    metrics.REGISTRY.clear()
+    yield
+    metrics.REGISTRY.clear()
+
+def run_pipeline(text=FACTURA_TEXT):
+    pipeline = DocumentProcessingPipeline("docs/f1.pdf", "f1.pdf", ".pdf", context=DocumentContext.from_text(text))
+    pipeline.run()
+    return pipeline
+
+def test_pipeline_records_stage_timings():
+    pipeline = run_pipeline()
+    assert [t.stage for t in pipeline.stage_timings] == ["ocr", "classification", "extraction", "validation", "total"]
+    total = pipeline.stage_timings[-1]
+    assert all(0 <= t.wall_seconds <= total.wall_seconds for t in pipeline.stage_timings)
+    recorded = STAGE_SECONDS.snapshot()
+    assert recorded[("extraction", "wall")][1] == 1
+    assert recorded[("total", "cpu")][1] == 1
+
+def test_field_rule_timings(monkeypatch):
+    run_pipeline()
+    fields = {field for rules, field, clock in FIELD_RULE_SECONDS.snapshot() if rules == "factura"}
+    assert {"numero_factura", "fecha_emision", "total_factura"} <= fields
+
+    metrics.REGISTRY.clear()
+    monkeypatch.setattr(metrics, "METRICS_FIELD_TIMING", False)
+    run_pipeline()
+    assert FIELD_RULE_SECONDS.snapshot() == {}
+    assert STAGE_SECONDS.snapshot() != {}
+
+def test_stage_timer_records_failing_stages():
+    timings = []
+    with pytest.raises(ValueError):
+        with stage_timer("ocr", timings):
+            raise ValueError("Textract unavailable")
+    assert [t.stage for t in timings] == ["ocr"]
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "ocr")
+    histogram.observe(0.5, "ocr")
+    histogram.observe(5.0, "ocr")
+    assert histogram.render() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="ocr",le="0.1"} 1',
+        'test_seconds_bucket{stage="ocr",le="1.0"} 2',
+        'test_seconds_bucket{stage="ocr",le="+Inf"} 3',
+        'test_seconds_sum{stage="ocr"} 5.55',
+        'test_seconds_count{stage="ocr"} 3',
+    ]
+
+def test_sampled_runs_are_profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "PROFILE_DIR", str(tmp_path))
+    with maybe_profile("doc-1", sample_rate=0.0) as profiled:
+        pass
+    assert not profiled
+    with maybe_profile("doc-2", sample_rate=1.0) as profiled:
+        sum(range(1000))
+    assert profiled
+    assert os.listdir(tmp_path) == ["doc-2.prof"]
+
+def test_metrics_endpoint():
+    from fastapi.testclient import TestClient
+    from document_processor.api import app
+    run_pipeline()
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'document_processor_stage_seconds_count{stage="extraction",clock="wall"} 1' in response.text
@@ -0,0 +1,65 @@
+import subprocess
+import sys
+import pytest
+from types import SimpleNamespace
+from document_processor import processor_factory
+from document_processor.base.base_validator import BaseValidator
+from document_processor.extractors.facturas import FacturaExtractor
+from document_processor.processor_factory import (
+    get_processor, get_processor_classes, register_extractor, register_processor, register_validator,
+)
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch):
+    monkeypatch.setattr(processor_factory, "_registry", {k: dict(v) for k, v in processor_factory._registry.items()})
+    monkeypatch.setattr(processor_factory, "_resolved", {})
+    monkeypatch.setattr(processor_factory, "_entry_points_tried", set())
+
+class EchoExtractor:
+    def __init__(self, context): self.context = context
+    def extract(self): return {"texto": self.context.text}
+
+class CountingValidator(BaseValidator):
+    instances = 0
+    def __init__(self, data, context=None):
+        super().__init__(data, context)
+        CountingValidator.instances += 1
+    def validate(self): return {"tiene_texto": bool(self.data.get("texto")), "valido": bool(self.data.get("texto"))}
+
+def test_importing_the_factory_does_not_import_processor_modules():
+    code = ("import sys, document_processor.processor_factory; "
+            "print(any(m.startswith(('document_processor.extractors', 'textractor')) for m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == "False"
+
+def test_builtin_types_resolve_lazily_and_are_cached():
+    classes = get_processor_classes("FACTURA")
+    assert classes[0] is FacturaExtractor
+    assert get_processor_classes("factura") is classes
+    assert get_processor("desconocido", "texto") is None
+
+def test_decorator_registration_and_validator_reuse():
+    register_extractor("eco")(EchoExtractor)
+    register_validator("eco")(CountingValidator)
+    CountingValidator.instances = 0
+
+    processor = get_processor("eco", "hola")
+    assert processor.extract() == {"texto": "hola"}
+    assert processor.validate() == {"is_valid": True, "details": {"tiene_texto": True, "valido": True}}
+    assert processor.validate({"texto": ""})["is_valid"] is False
+    assert CountingValidator.instances == 1
+
+def test_string_references_and_entry_points(monkeypatch):
+    loaded = []
+    def fake_entry_points(group, name):
+        assert group == processor_factory.ENTRY_POINT_GROUP
+        def load():
+            loaded.append(name)
+            register_processor(name, extractor=f"{__name__}:EchoExtractor", validator=f"{__name__}:CountingValidator")
+        return [SimpleNamespace(value="plugin.module", load=load)]
+    monkeypatch.setattr(processor_factory, "entry_points", fake_entry_points)
+
+    assert get_processor("plugin_type", "x").extract() == {"texto": "x"}
+    assert get_processor("plugin_type", "y") is not None
+    assert get_processor("otro_tipo", "z") is not None
+    assert loaded == ["plugin_type", "otro_tipo"] # Each entry point loaded once, on first use
@@ -0,0 +1,156 @@
+import pytest
+from document_processor.db import database
+from document_processor.db.insert import store_documents_bulk
+from document_processor.db.query import (
+    find_documents, get_document_details_by_id, get_documents_details, get_stage_latency_percentiles,
+)
+
+@pytest.fixture(autouse=True)
+def documents(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_FILE", str(tmp_path / "documents.db"))
+    database.initialize_database()
+    docs = []
+    for i in range(120):
+        doc = {"metadata": {
+            "document_id": f"doc-{i:03d}", "file_name": f"{i}.pdf", "file_type": ".pdf",
+            "upload_date": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}",
+            "processing_status": "completed" if i % 3 else "error_ocr",
+        }}
+        if i % 3:
+            doc["extracted_data"] = {"document_type": "factura" if i % 2 else "certificado_final", "fields": {"n": i}}
+            doc["validation_result"] = {"is_valid": i % 5 != 0, "details": {"n": "ok"}}
+        docs.append(doc)
+    store_documents_bulk(docs)
+    yield
+    database.close_db_connections()
+
+@pytest.fixture
+def statements():
+    executed = []
+    conn = database.get_db_connection()
+    conn.set_trace_callback(lambda sql: executed.append(sql) if sql.lstrip().upper().startswith("SELECT") else None)
+    yield executed
+    conn.set_trace_callback(None)
+    conn.close()
+
+def test_get_document_details_by_id_uses_one_query(statements):
+    details = get_document_details_by_id("doc-004")
+    assert details["metadata"]["processing_status"] == "completed"
+    assert details["extracted_data"] == {"document_type": "certificado_final", "fields": {"n": 4}}
+    assert details["validation_result"] == {"is_valid": True, "details": {"n": "ok"}}
+    assert len(statements) == 1
+
+    error_doc = get_document_details_by_id("doc-003")
+    assert error_doc["extracted_data"] is None and error_doc["validation_result"] is None
+    assert get_document_details_by_id("missing") is None
+
+def test_get_documents_details_matches_single_lookups(statements):
+    ids = [f"doc-{i:03d}" for i in range(100)] + ["missing", "doc-001"]
+    details = get_documents_details(ids)
+
+    assert len(statements) == 1
+    assert set(details) == {f"doc-{i:03d}" for i in range(100)}
+    for doc_id in ("doc-000", "doc-001", "doc-010", "doc-099"):
+        assert details[doc_id] == get_document_details_by_id(doc_id)
+    assert get_documents_details([]) == {}
+
+def test_find_documents_with_details_in_one_query(statements):
+    listing = find_documents(status="completed", doc_type="factura", limit=100, include_details=True)
+
+    assert len(statements) == 1
+    assert all(d["extracted_data"]["document_type"] == "factura" for d in listing)
+    assert [d["metadata"]["document_id"] for d in listing] == [d["id"] for d in find_documents(status="completed", doc_type="factura")]
+    assert listing[0] == get_document_details_by_id(listing[0]["metadata"]["document_id"])
+
+def test_find_documents_page_walks_all_documents_without_gaps():
+    from document_processor.db.query import find_documents_page
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = find_documents_page(status="completed", page_size=7, cursor=cursor)
+        seen.extend(d["id"] for d in page["documents"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [d["id"] for d in find_documents(status="completed", limit=1000)]
+    assert len(seen) == 80 and pages == 12
+
+def test_find_documents_page_with_details_and_bad_cursor():
+    from document_processor.db.query import find_documents_page
+    page = find_documents_page(doc_type="factura", page_size=5, include_details=True)
+    assert len(page["documents"]) == 5
+    assert page["documents"][0] == get_document_details_by_id(page["documents"][0]["metadata"]["document_id"])
+    with pytest.raises(ValueError):
+        find_documents_page(cursor="not-a-cursor")
+
+@pytest.mark.parametrize("filters", [{}, {"status": "completed"}, {"doc_type": "factura"},
+                                     {"status": "completed", "doc_type": "factura"}])
+@pytest.mark.parametrize("include_details", [False, True])
+def test_listing_queries_use_an_index_without_sorting(filters, include_details):
+    from document_processor.db.query import _documents_page_query
+    # The statement find_documents_page runs for a page after the first one
+    sql, params = _documents_page_query(filters.get("status"), filters.get("doc_type"), ("2024", "doc"),
+                                        page_size=10, include_details=include_details)
+    conn = database.get_db_connection()
+    plan = " ".join(row["detail"] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+    conn.close()
+    assert "USING" in plan and "INDEX" in plan
+    assert "TEMP B-TREE" not in plan
+
+def _nearest_rank(values, p):
+    ordered = sorted(values)
+    return ordered[max(-(-p * len(ordered) // 100), 1) - 1]
+
+def test_stage_latency_percentiles_per_stage_type_and_day():
+    docs, ocr_seconds = [], {}
+    for i in range(60):
+        doc_type = "factura" if i % 3 else "certificado_final"
+        day = f"2024-02-0{1 + i % 2}"
+        ocr = ocr_seconds.setdefault((doc_type, day), [])
+        ocr.append(float(i))
+        docs.append({
+            "metadata": {"document_id": f"timed-{i:03d}", "file_name": f"t{i}.pdf", "file_type": ".pdf",
+                         "upload_date": f"{day}T10:00:00", "processing_status": "completed"},
+            "extracted_data": {"document_type": doc_type, "fields": {"n": i}},
+            "processing_events": [
+                {"stage": "ocr", "started": f"{day}T10:00:00", "wall_seconds": float(i), "cpu_seconds": 0.01},
+                {"stage": "extraction", "started": f"{day}T10:00:05", "wall_seconds": 0.002, "cpu_seconds": 0.002},
+            ],
+        })
+    store_documents_bulk(docs)
+
+    (ocr,) = get_stage_latency_percentiles(stage="ocr")
+    assert ocr["stage"] == "ocr" and ocr["count"] == 60 and ocr["max"] == 59.0
+    assert (ocr["p50"], ocr["p95"], ocr["p99"]) == (29.0, 56.0, 59.0)
+
+    grouped = get_stage_latency_percentiles(group_by=("document_type", "day"), stage="ocr")
+    assert [(row["document_type"], row["day"]) for row in grouped] == sorted(ocr_seconds)
+    for row in grouped:
+        values = ocr_seconds[(row["document_type"], row["day"])]
+        assert row["count"] == len(values)
+        assert [row["p50"], row["p95"], row["p99"]] == [_nearest_rank(values, p) for p in (50, 95, 99)]
+
+    assert [row["stage"] for row in get_stage_latency_percentiles(clock="cpu")] == ["extraction", "ocr"]
+    assert get_stage_latency_percentiles(stage="ocr", since="2024-02-02")[0]["count"] == 30
+    assert get_stage_latency_percentiles(group_by=())[0]["count"] == 120
+    assert get_stage_latency_percentiles(stage="validation") == []
+    with pytest.raises(ValueError):
+        get_stage_latency_percentiles(group_by=("file_name",))
+
+def test_pipeline_stage_timings_are_stored():
+    from document_processor.context import DocumentContext
+    from document_processor.db.insert import store_document_data
+    from document_processor.pipeline import DocumentProcessingPipeline
+    pipeline = DocumentProcessingPipeline("docs/f1.pdf", "f1.pdf", ".pdf", document_id="pipeline-1",
+                                          context=DocumentContext.from_text("FACTURA Nº F1\nCliente: Test\nFecha Factura: 25/12/2023\nTotal: 242,00"))
+    result = pipeline.run()
+    assert store_document_data(result.model_dump(mode="json"))
+
+    conn = database.get_db_connection()
+    rows = conn.execute("SELECT stage, document_type, wall_seconds FROM processing_events WHERE document_id = ? ORDER BY id",
+                        ("pipeline-1",)).fetchall()
+    conn.close()
+    assert [row["stage"] for row in rows] == ["ocr", "classification", "extraction", "validation", "total"]
+    assert {row["document_type"] for row in rows} == {"factura"}
+    assert [row["wall_seconds"] for row in rows] == [t.wall_seconds for t in pipeline.stage_timings]
@@ -0,0 +1,32 @@
+from document_processor.rag import DocumentRAGSystem, HashingEmbedder, chunk_text
+
+DOCUMENTS = [
+    ("fac-1", "FACTURA Nº F1 Cliente: Construcciones Pérez Total: 242,00", {"type": "factura"}),
+    ("cfo-1", "Certificado final de obra firmado por el director de obra", {"type": "certificado_final"}),
+    ("mem-1", "Memoria de actuación de la rehabilitación energética", {"type": "memoria_actuacion"}),
+]
+
+def test_chunks_are_bounded_and_overlap():
+    text = " ".join(f"palabra{i}" for i in range(200))
+    chunks = chunk_text(text, chunk_chars=100, overlap_chars=30)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert chunks[0].split()[0] == "palabra0" and chunks[-1].split()[-1] == "palabra199"
+    assert chunks[0].split()[-1] in chunks[1].split() # Consecutive chunks overlap
+    assert chunk_text("") == []
+
+def test_hashing_embeddings_ignore_case_and_accents():
+    embedder = HashingEmbedder(dim=64)
+    a, b = embedder.encode(["Certificación FINAL", "certificacion final"])
+    assert abs(float(a @ b) - 1.0) < 1e-6
+
+def test_retrieval_finds_the_relevant_document(tmp_path):
+    rag = DocumentRAGSystem(index_dir=str(tmp_path))
+    assert rag.add_documents(DOCUMENTS) == 3
+    (best, *_) = rag.retrieve("¿Qué total tiene la factura F1?", k=2)
+    assert best["doc_id"] == "fac-1" and best["metadata"] == {"type": "factura"}
+    assert "cfo-1" in rag.query("director de obra del certificado final")
+
+    # The index persists: a new system over the same directory sees the same chunks
+    reopened = DocumentRAGSystem(index_dir=str(tmp_path))
+    assert len(reopened.index) == 3
+    assert reopened.retrieve("rehabilitación energética", k=1)[0]["doc_id"] == "mem-1"
@@ -0,0 +1,64 @@
+import json
+import os
+import pytest
+from datetime import datetime
+from document_processor.db import database, insert
+from document_processor.db.query import get_document_details_by_id, iter_documents_with_raw_text
+from document_processor.models import DocumentMetadata, ExtractedData, ProcessedDocument
+from document_processor.reextract import ReextractionRunner
+
+FACTURA_TEXT = "FACTURA Nº F1\nCliente: Test\nFecha Factura: 25/12/2023\nTotal: 242,00"
+
+@pytest.fixture(autouse=True)
+def temp_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_FILE", str(tmp_path / "documents.db"))
+    monkeypatch.setattr(insert, "RAW_TEXT_DIR", str(tmp_path / "raw_text"))
+    database.initialize_database()
+    yield
+    database.close_db_connections()
+
+def stored_document(doc_id, text, fields):
+    metadata = DocumentMetadata(document_id=doc_id, file_name=f"{doc_id}.pdf", file_type=".pdf",
+                                upload_date=datetime(2024, 1, 1), processing_status="completed")
+    return ProcessedDocument(metadata=metadata, raw_text=text,
+                             extracted_data=ExtractedData(document_type="factura", fields=fields))
+
+def test_raw_text_is_archived_when_stored():
+    insert.store_documents_bulk([stored_document("doc-1", FACTURA_TEXT, {"numero": "F1"})])
+    (document,) = iter_documents_with_raw_text()
+    with open(document["raw_text_path"], encoding="utf-8") as f:
+        assert f.read() == FACTURA_TEXT
+    assert document["fields"] == {"numero": "F1"}
+
+def test_reextract_reports_and_stores_changed_fields_only():
+    insert.store_documents_bulk([stored_document("doc-1", FACTURA_TEXT, {"numero": "OLD"}),
+                                 stored_document("doc-2", FACTURA_TEXT, {"numero": "OLD"})])
+    os.remove(next(d for d in iter_documents_with_raw_text() if d["id"] == "doc-2")["raw_text_path"])
+    diffs = []
+
+    report = ReextractionRunner(workers=0, chunk_size=1).run(on_change=diffs.append)
+
+    assert report.outcomes == {"changed": 1, "missing_text": 1}
+    assert report.stored == 1
+    assert [d["id"] for d in diffs] == ["doc-1"]
+    assert diffs[0]["changes"]["fields.numero"][0] == "OLD"
+    assert report.changed_keys["fields.numero"] == 1
+    new_fields = get_document_details_by_id("doc-1")["extracted_data"]["fields"]
+    assert new_fields == diffs[0]["update"]["fields"]
+    assert get_document_details_by_id("doc-2")["extracted_data"]["fields"] == {"numero": "OLD"}
+
+    # A second run finds nothing left to change
+    assert ReextractionRunner(workers=0).run().outcomes == {"unchanged": 1, "missing_text": 1}
+
+def test_dry_run_does_not_write():
+    insert.store_documents_bulk([stored_document("doc-1", FACTURA_TEXT, {"numero": "OLD"})])
+    report = ReextractionRunner(workers=0, store=False).run()
+    assert report.outcomes == {"changed": 1} and report.stored == 0
+    assert get_document_details_by_id("doc-1")["extracted_data"]["fields"] == {"numero": "OLD"}
+
+def test_reextract_in_worker_processes_matches_inline():
+    insert.store_documents_bulk([stored_document(f"doc-{i}", FACTURA_TEXT, {"n": i}) for i in range(20)])
+    inline = {o["id"]: o["changes"] for o in ReextractionRunner(workers=0).iter_outcomes(iter_documents_with_raw_text())}
+    parallel = {o["id"]: o["changes"] for o in ReextractionRunner(workers=2, chunk_size=3).iter_outcomes(iter_documents_with_raw_text())}
+    assert parallel == inline and len(parallel) == 20
+    assert json.dumps(parallel) # Outcomes are plain JSON data
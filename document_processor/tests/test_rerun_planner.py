@@ -0,0 +1,99 @@
+import pytest
+from document_processor.context import DocumentContext
+from document_processor.db import database, insert
+from document_processor.db.query import iter_documents_with_raw_text, iter_stored_documents
+from document_processor.extractors.facturas import FacturaExtractor
+from document_processor.pipeline import DocumentProcessingPipeline
+from document_processor.reextract import ReextractionRunner
+from document_processor.rerun_planner import RerunPlanner, summarize_plan
+from document_processor.validators.facturas_validator import FacturaValidator
+
+FACTURA_TEXT = "FACTURA Nº F1\nCliente: Test\nFecha Factura: 25/12/2023\nTotal: 242,00"
+
+@pytest.fixture(autouse=True)
+def temp_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_FILE", str(tmp_path / "documents.db"))
+    monkeypatch.setattr(insert, "RAW_TEXT_DIR", str(tmp_path / "raw_text"))
+    database.initialize_database()
+    yield
+    database.close_db_connections()
+
+def store_processed(*texts):
+    documents = []
+    for i, text in enumerate(texts):
+        pipeline = DocumentProcessingPipeline(f"docs/d{i}.pdf", f"d{i}.pdf", ".pdf",
+                                              context=DocumentContext.from_text(text), document_id=f"doc-{i}")
+        documents.append(pipeline.run())
+    insert.store_documents_bulk(documents)
+    return documents
+
+def test_fingerprints_change_with_explicit_version(monkeypatch):
+    before = FacturaValidator.version_fingerprint()
+    assert before == FacturaValidator.version_fingerprint()
+    assert before != FacturaExtractor.version_fingerprint()
+    monkeypatch.setattr(FacturaValidator, "version", "2")
+    assert FacturaValidator.version_fingerprint() != before
+
+def test_stored_documents_keep_their_stage_versions():
+    (processed,) = store_processed(FACTURA_TEXT)
+    (document,) = iter_documents_with_raw_text()
+    assert document["versions"] == processed.stage_versions.model_dump()
+    assert document["versions"]["validator"] == FacturaValidator.version_fingerprint()
+    assert document["classification_confidence"] == processed.classification_confidence
+    assert RerunPlanner().plan(document).reason == "up to date"
+
+def test_incremental_run_skips_up_to_date_documents():
+    store_processed(FACTURA_TEXT, FACTURA_TEXT)
+    report = ReextractionRunner(workers=0, incremental=True).run()
+    assert report.outcomes == {"up_to_date": 2}
+    assert report.plan_reasons == {"up to date": 2}
+
+def test_validator_change_revalidates_stored_fields_only(monkeypatch):
+    store_processed(FACTURA_TEXT)
+    monkeypatch.setattr(FacturaValidator, "version", "2")
+    monkeypatch.setattr(FacturaExtractor, "extract", lambda self: pytest.fail("extraction must not run"))
+
+    report = ReextractionRunner(workers=0, incremental=True).run()
+
+    assert report.plan_reasons == {"validator changed": 1}
+    assert report.outcomes == {"changed": 1}
+    assert set(report.changed_keys) == {"versions.validator"}
+    (document,) = iter_documents_with_raw_text()
+    assert document["versions"]["validator"] == FacturaValidator.version_fingerprint()
+    assert ReextractionRunner(workers=0, incremental=True).run().outcomes == {"up_to_date": 1}
+
+def test_revalidation_needs_no_archived_text(monkeypatch):
+    monkeypatch.setattr(insert, "RAW_TEXT_DIR", None)
+    store_processed(FACTURA_TEXT)
+    assert list(iter_documents_with_raw_text()) == []
+    monkeypatch.setattr(FacturaValidator, "version", "2")
+
+    report = ReextractionRunner(workers=0, incremental=True).run()
+
+    assert report.outcomes == {"changed": 1}
+    (document,) = iter_stored_documents()
+    assert document["raw_text_path"] is None
+    assert document["versions"]["validator"] == FacturaValidator.version_fingerprint()
+
+    # Extraction does need the text: reported, not skipped silently
+    monkeypatch.setattr(FacturaExtractor, "version", "2")
+    assert ReextractionRunner(workers=0, incremental=True).run().outcomes == {"missing_text": 1}
+
+def test_classifier_change_only_reclassifies_uncertain_documents():
+    store_processed(FACTURA_TEXT, "Texto sin tipo reconocible")
+    documents = {d["id"]: d for d in iter_documents_with_raw_text()}
+    confidence = documents["doc-0"]["classification_confidence"]
+
+    confident = RerunPlanner(min_classification_confidence=confidence, classifier_version="new")
+    assert confident.plan(documents["doc-0"]).start_stage is None
+    assert confident.plan(documents["doc-1"]).reason == "classifier changed, unclassified"
+
+    strict = RerunPlanner(min_classification_confidence=confidence + 0.01, classifier_version="new")
+    assert strict.plan(documents["doc-0"]) == ("doc-0", "classification", "classifier changed, low confidence")
+
+def test_documents_without_versions_are_rerun_in_full():
+    store_processed(FACTURA_TEXT)
+    (document,) = iter_documents_with_raw_text()
+    document["versions"] = {"classifier": None, "extractor": None, "validator": None}
+    assert summarize_plan([document]) == {"scanned": 1, "start_stages": {"classification": 1},
+                                          "reasons": {"no stored versions": 1}}
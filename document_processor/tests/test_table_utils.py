@@ -0,0 +1,70 @@
+import numpy as np
+from document_processor.utils.table_utils import TableExtractor, parse_textract_tables, _synthetic_response
+
+def word(block_id, text, confidence=99.0):
+    return {"BlockType": "WORD", "Id": block_id, "Text": text, "Confidence": confidence}
+
+def cell(block_id, row, column, child_ids, confidence=95.0, header=False, **extra):
+    block = {"BlockType": "CELL", "Id": block_id, "RowIndex": row, "ColumnIndex": column, "Confidence": confidence,
+             "Relationships": [{"Type": "CHILD", "Ids": child_ids}], **extra}
+    if header:
+        block["EntityTypes"] = ["COLUMN_HEADER"]
+    return block
+
+def invoice_blocks():
+    """Concepto / Cantidad / Precio / Total, with "Descuento" merged over the first three columns of row 3."""
+    return [
+        {"BlockType": "TABLE", "Id": "t", "Confidence": 97.0, "Page": 2, "Relationships": [
+            {"Type": "CHILD", "Ids": ["h1", "h2", "h3", "h4", "c1", "c2", "c3", "c4", "m1", "m2", "m3", "m4"]},
+            {"Type": "MERGED_CELL", "Ids": ["merged"]},
+        ]},
+        cell("h1", 1, 1, ["wh1"], header=True), cell("h2", 1, 2, ["wh2"], header=True),
+        cell("h3", 1, 3, ["wh3"], header=True), cell("h4", 1, 4, ["wh4"], header=True),
+        word("wh1", "Concepto"), word("wh2", "Cantidad"), word("wh3", "Precio"), word("wh4", "Total"),
+        cell("c1", 2, 1, ["w1", "w2"]), cell("c2", 2, 2, ["w3"]), cell("c3", 2, 3, ["w4"]), cell("c4", 2, 4, ["w5"], confidence=30.0),
+        word("w1", "Mano"), word("w2", "obra", confidence=20.0), word("w3", "3"), word("w4", "40,00"), word("w5", "120,00"),
+        cell("m1", 3, 1, ["w6"]), cell("m2", 3, 2, []), cell("m3", 3, 3, []), cell("m4", 3, 4, ["w7"]),
+        word("w6", "Descuento"), word("w7", "-10,00"),
+        {"BlockType": "MERGED_CELL", "Id": "merged", "RowIndex": 3, "ColumnIndex": 1, "RowSpan": 1, "ColumnSpan": 3,
+         "Confidence": 90.0, "Relationships": [{"Type": "CHILD", "Ids": ["m1", "m2", "m3"]}]},
+    ]
+
+def test_parses_columns_merged_cells_and_headers():
+    [table] = parse_textract_tables({"Blocks": invoice_blocks()})
+    assert table.table_id == "t" and table.page == 2 and table.confidence == 97.0
+    assert table.column_names == ["Concepto", "Cantidad", "Precio", "Total"]
+    assert table.num_rows == 2
+    assert table.columns["Concepto"].tolist() == ["Mano obra", "Descuento"]
+    assert table.columns["Precio"].tolist() == ["40,00", "Descuento"] # The merged cell spans it
+    assert table.columns["Total"].tolist() == ["120,00", "-10,00"]
+    assert table.cell_confidence.shape == (2, 4)
+    assert table.cell_confidence[1, 0] == 90.0
+
+def test_confidence_filtering():
+    [table] = parse_textract_tables(invoice_blocks(), min_confidence=50.0)
+    assert table.columns["Concepto"].tolist() == ["Mano", "Descuento"] # Low-confidence word dropped
+    assert table.columns["Total"].tolist() == [None, "-10,00"] # Low-confidence cell is missing
+
+def test_paginated_response_and_first_row_header():
+    response = _synthetic_response(pages=3, rows=4)
+    tables = parse_textract_tables(response)
+    assert [table.page for table in tables] == [1, 2, 3]
+    assert tables[0].to_records()[0] == {"Concepto": "Partida 2", "Cantidad": "2", "Precio": "10,50", "Total": "21,00"}
+    flat = [block for page in response for block in page["Blocks"]]
+    for block in flat:
+        block.pop("EntityTypes", None)
+    assert [t.column_names for t in parse_textract_tables(flat)] == [t.column_names for t in tables]
+
+def test_without_header_and_duplicate_names():
+    blocks = [
+        {"BlockType": "TABLE", "Id": "t", "Relationships": [{"Type": "CHILD", "Ids": ["a", "b", "missing"]}]},
+        cell("a", 1, 1, ["w"]), cell("b", 1, 2, ["w"]), word("w", "Importe"),
+    ]
+    assert parse_textract_tables(blocks)[0].column_names == ["Importe", "Importe_2"]
+    table = parse_textract_tables(blocks, header=False)[0]
+    assert table.column_names == ["Col1", "Col2"]
+    assert isinstance(table.columns["Col1"], np.ndarray) and table.columns["Col1"].tolist() == ["Importe"]
+
+def test_table_extractor_uses_ocr_results():
+    assert TableExtractor().extract_tables_from_textract_response({"Blocks": []}) == []
+    assert len(TableExtractor(ocr_results=invoice_blocks()).extract_tables_from_textract_response()) == 1
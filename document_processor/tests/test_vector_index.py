@@ -0,0 +1,83 @@
+import os
+import numpy as np
+import pytest
+from document_processor.utils.vector_index import VectorIndex, normalize_rows
+
+DIM = 16
+
+def random_vectors(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+def exact_ids(vectors, queries, k):
+    return np.argsort(-(normalize_rows(queries) @ normalize_rows(vectors).T), axis=1, kind="stable")[:, :k]
+
+def test_flat_search_is_exact_and_persistent(tmp_path):
+    vectors, queries = random_vectors(300), random_vectors(5, seed=1)
+    index = VectorIndex(str(tmp_path), dim=DIM)
+    index.add(vectors[:100], [{"n": i} for i in range(100)])
+    index.add(vectors[100:], [{"n": i} for i in range(100, 300)]) # Incremental add
+    scores, ids = index.search(queries, k=4)
+    assert ids.tolist() == exact_ids(vectors, queries, 4).tolist()
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+    reopened = VectorIndex(str(tmp_path))
+    assert len(reopened) == 300 and reopened.meta["partitioned"] == 0
+    assert reopened.search(queries, k=4)[1].tolist() == ids.tolist()
+    assert reopened.payloads(ids[0]) == [{"n": int(i)} for i in ids[0]]
+    with pytest.raises(ValueError):
+        VectorIndex(str(tmp_path), dim=DIM + 1)
+
+def test_ivf_lists_with_all_lists_probed_match_exact_search(tmp_path):
+    vectors, queries = random_vectors(600), random_vectors(8, seed=1)
+    index = VectorIndex(str(tmp_path), dim=DIM, nlist=8, nprobe=8, ivf_min_vectors=400, max_unpartitioned=150)
+    index.add(vectors[:400])
+    assert index.meta["partitioned"] == 400 and index.meta["nlist"] == 8
+    index.add(vectors[400:500]) # Searched flat as the unpartitioned tail
+    assert index.meta["partitioned"] == 400
+    assert index.search(queries, k=5)[1].tolist() == exact_ids(vectors[:500], queries, 5).tolist()
+
+    index.add(vectors[500:]) # The tail outgrows max_unpartitioned: sorted into the existing lists
+    assert index.meta["partitioned"] == 600 and index.meta["trained_count"] == 400
+    assert index.search(queries, k=5)[1].tolist() == exact_ids(vectors, queries, 5).tolist()
+    # Only the current generation's files are kept
+    assert sorted(f for f in os.listdir(tmp_path) if f.startswith("vectors")) == [f"vectors.{index.meta['generation']}.f32"]
+
+    # Probing a single list is approximate, but each query finds its own vector
+    _, ids = VectorIndex(str(tmp_path)).search(vectors[:20], k=1, nprobe=1)
+    assert ids[:, 0].tolist() == list(range(20))
+
+def test_uncommitted_bytes_are_dropped_by_the_next_add(tmp_path):
+    vectors = random_vectors(20)
+    index = VectorIndex(str(tmp_path), dim=DIM)
+    index.add(vectors[:10])
+    with open(tmp_path / "vectors.0.f32", "ab") as f: # An add that failed before committing
+        f.write(b"\x00" * 100)
+    index.add(vectors[10:])
+    assert os.path.getsize(tmp_path / "vectors.0.f32") == 20 * DIM * 4
+    assert VectorIndex(str(tmp_path)).search(vectors[15], k=1)[1].tolist() == [[15]]
+
+def test_search_returns_fewer_results_than_k(tmp_path):
+    index = VectorIndex(str(tmp_path), dim=DIM)
+    scores, ids = index.search(random_vectors(1), k=3)
+    assert ids.tolist() == [[-1, -1, -1]] and np.all(np.isneginf(scores))
+    index.add(random_vectors(2))
+    assert index.search(random_vectors(1), k=3)[1][0, 2] == -1
+
+@pytest.mark.parametrize("partition_after", ["vectors", "ids"])
+def test_search_reads_one_generation_when_partitioned_meanwhile(tmp_path, partition_after):
+    vectors, queries = random_vectors(300), random_vectors(5, seed=1)
+    index = VectorIndex(str(tmp_path), dim=DIM, nlist=4, nprobe=4)
+    index.add(vectors)
+    expected = exact_ids(vectors, queries, 4).tolist()
+    array, partitioned = index._array, []
+
+    def array_then_partition(name, meta):
+        values = array(name, meta)
+        if name == partition_after and not partitioned:
+            partitioned.append(True)
+            index.build_ivf() # A concurrent writer, between the search's reads
+        return values
+
+    index._array = array_then_partition
+    assert index.search(queries, k=4)[1].tolist() == expected
+    assert index.meta["generation"] == 1
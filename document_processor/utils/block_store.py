@@ -0,0 +1,296 @@
+# Almacenamiento columnar de bloques Textract
+
+# Textract returns far more than text: block geometry, confidences, text type (printed
+# vs handwriting), selection elements and the relationships that make up lines, tables
+# and key/value pairs. To let later stages (table extraction, signature detection,
+# re-layout) use them without another OCR run, the blocks of each document are written
+# once, next to its archived OCR text (`<id>.txt` -> `<id>.blocks/`).
+#
+# The layout is a directory with one .npy file per column, one row per block:
+#
+# - fixed-width columns: id, block_type, page, confidence, text_type, selection_status,
+#   bbox (left, top, width, height), row/column index and span, entity_types (bitmask);
+# - variable-length columns as a flat values array plus an offsets array (CSR):
+#   text (UTF-8 bytes), polygon (x, y points) and relationships (target row, type);
+# - meta.json with the block count and the vocabularies behind the coded columns.
+#
+# `BlockStore` opens each column memory-mapped on first use, so a reader only pages in
+# the columns it touches. Fields outside these columns (e.g. Query blocks) are not kept.
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import json
+import os
+import shutil
+
+import numpy as np
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+_CODED_FIELDS = {"block_type": "BlockType", "text_type": "TextType", "selection_status": "SelectionStatus"}
+_CELL_FIELDS = {"row_index": "RowIndex", "column_index": "ColumnIndex", "row_span": "RowSpan", "column_span": "ColumnSpan"}
+_BBOX_KEYS = ("Left", "Top", "Width", "Height")
+
+
+def block_store_path(raw_text_path: str) -> str:
+    """Where the blocks of a document whose OCR text is archived at `raw_text_path` are stored."""
+    return f"{os.path.splitext(raw_text_path)[0]}.blocks"
+
+
+class _Vocabulary:
+    """Maps strings to small integer codes. Code 0 is reserved for "absent"."""
+    def __init__(self):
+        self.values = [""]
+        self._codes = {"": 0}
+
+    def code(self, value: Optional[str]) -> int:
+        if not value:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def write_block_store(path: str, blocks: Sequence[dict]) -> str:
+    """
+    Writes Textract blocks to a columnar store at `path` (a directory, replaced if it
+    exists). The directory is built under a temporary name and renamed into place.
+    :return: `path`.
+    """
+    row_of = {block["Id"]: row for row, block in enumerate(blocks)}
+    vocabularies = {field: _Vocabulary() for field in _CODED_FIELDS}
+    vocabularies["relationship_type"] = _Vocabulary()
+    entity_vocabulary = _Vocabulary()
+
+    count = len(blocks)
+    coded = {field: np.zeros(count, dtype=np.uint8) for field in _CODED_FIELDS}
+    cell = {field: np.zeros(count, dtype=np.int32) for field in _CELL_FIELDS}
+    page = np.zeros(count, dtype=np.int32)
+    confidence = np.full(count, np.nan, dtype=np.float32)
+    bbox = np.full((count, 4), np.nan, dtype=np.float32)
+    entity_types = np.zeros(count, dtype=np.uint32)
+    text_parts, text_offsets = [], np.zeros(count + 1, dtype=np.int64)
+    polygon, polygon_offsets = [], np.zeros(count + 1, dtype=np.int64)
+    rel_target, rel_type, rel_offsets = [], [], np.zeros(count + 1, dtype=np.int64)
+    text_length = 0
+
+    for row, block in enumerate(blocks):
+        for field, key in _CODED_FIELDS.items():
+            coded[field][row] = vocabularies[field].code(block.get(key))
+        for field, key in _CELL_FIELDS.items():
+            cell[field][row] = block.get(key, 0)
+        page[row] = block.get("Page", 0)
+        if "Confidence" in block:
+            confidence[row] = block["Confidence"]
+        geometry = block.get("Geometry") or {}
+        box = geometry.get("BoundingBox")
+        if box:
+            bbox[row] = [box.get(key, np.nan) for key in _BBOX_KEYS]
+        polygon.extend((point.get("X", np.nan), point.get("Y", np.nan)) for point in geometry.get("Polygon") or ())
+        polygon_offsets[row + 1] = len(polygon)
+        for entity_type in block.get("EntityTypes") or ():
+            entity_types[row] |= 1 << (entity_vocabulary.code(entity_type) - 1)
+        encoded = block.get("Text", "").encode("utf-8")
+        text_parts.append(encoded)
+        text_length += len(encoded)
+        text_offsets[row + 1] = text_length
+        for relationship in block.get("Relationships") or ():
+            type_code = vocabularies["relationship_type"].code(relationship.get("Type"))
+            for target_id in relationship.get("Ids", ()):
+                target = row_of.get(target_id)
+                if target is not None: # Ids outside this response (e.g. a truncated page) are dropped
+                    rel_target.append(target)
+                    rel_type.append(type_code)
+        rel_offsets[row + 1] = len(rel_target)
+    if len(entity_vocabulary.values) > 33:
+        raise ValueError("More than 32 distinct EntityTypes cannot be stored in the entity_types bitmask.")
+
+    columns = {
+        "id": np.array([block["Id"] for block in blocks], dtype=bytes) if count else np.empty(0, dtype="S1"),
+        "page": page,
+        "confidence": confidence,
+        "bbox": bbox,
+        "entity_types": entity_types,
+        "text": np.frombuffer(b"".join(text_parts), dtype=np.uint8),
+        "text_offsets": text_offsets,
+        "polygon": np.array(polygon, dtype=np.float32).reshape(-1, 2),
+        "polygon_offsets": polygon_offsets,
+        "rel_target": np.array(rel_target, dtype=np.int32),
+        "rel_type": np.array(rel_type, dtype=np.uint8),
+        "rel_offsets": rel_offsets,
+        **coded,
+        **cell,
+    }
+    meta = {
+        "version": FORMAT_VERSION,
+        "count": count,
+        "vocabularies": {field: vocabulary.values for field, vocabulary in vocabularies.items()},
+        "entity_types": entity_vocabulary.values[1:],
+    }
+
+    temp_path = f"{path}.part"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+    for name, values in columns.items():
+        np.save(os.path.join(temp_path, f"{name}.npy"), values)
+    with open(os.path.join(temp_path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temp_path, path)
+    return path
+
+
+def holds_blocks(path: str, blocks: Sequence[dict]) -> bool:
+    """
+    True if `path` already holds a block store of exactly these blocks (same Ids, in the
+    same order), e.g. one checkpointed earlier in the same pipeline run.
+    """
+    try:
+        store = BlockStore(path)
+    except (OSError, ValueError):
+        return False
+    return len(store) == len(blocks) and store.column("id").tolist() == [block["Id"].encode() for block in blocks]
+
+
+class BlockStore:
+    """
+    Read access to a block store written by `write_block_store`. Columns are opened
+    memory-mapped when first used; rows are block positions in the original response.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported block store version {self.meta.get('version')} at {path}")
+        self.vocabularies = self.meta["vocabularies"]
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def column(self, name: str) -> np.ndarray:
+        """A column by name (e.g. "page", "confidence", "bbox"), memory-mapped."""
+        values = self._columns.get(name)
+        if values is None:
+            values = self._columns[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        return values
+
+    def _code(self, field: str, value: str) -> int:
+        values = self.vocabularies[field]
+        return values.index(value) if value in values else -1
+
+    def rows(self, block_type: Optional[str] = None, page: Optional[int] = None) -> np.ndarray:
+        """Rows of the blocks with the given type and/or page, in order."""
+        mask = np.ones(len(self), dtype=bool)
+        if block_type is not None:
+            mask &= self.column("block_type") == self._code("block_type", block_type)
+        if page is not None:
+            mask &= self.column("page") == page
+        return np.flatnonzero(mask)
+
+    def text(self, row: int) -> str:
+        offsets = self.column("text_offsets")
+        return bytes(self.column("text")[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def texts(self, rows: Optional[Iterable[int]] = None) -> List[str]:
+        """Text of each row (all rows by default); "" for blocks without text."""
+        rows = range(len(self)) if rows is None else rows
+        offsets = self.column("text_offsets")
+        data = self.column("text")
+        return [bytes(data[offsets[row]:offsets[row + 1]]).decode("utf-8") for row in rows]
+
+    def related(self, row: int, relationship_type: str = "CHILD") -> np.ndarray:
+        """Rows that block `row` points to through relationships of the given type."""
+        offsets = self.column("rel_offsets")
+        start, end = offsets[row], offsets[row + 1]
+        targets = self.column("rel_target")[start:end]
+        return np.asarray(targets[self.column("rel_type")[start:end] == self._code("relationship_type", relationship_type)])
+
+    def entity_types(self, row: int) -> List[str]:
+        bits = int(self.column("entity_types")[row])
+        return [name for index, name in enumerate(self.meta["entity_types"]) if bits & (1 << index)]
+
+    def to_blocks(self, block_types: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Rebuilds Textract-style block dicts, e.g. for `table_utils.parse_textract_tables`.
+        :param block_types: Only rebuild blocks of these types (relationships still refer
+                            to the Ids of the others).
+        """
+        if block_types is None:
+            selected = range(len(self))
+        else:
+            codes = [self._code("block_type", block_type) for block_type in block_types]
+            selected = np.flatnonzero(np.isin(self.column("block_type"), codes)).tolist()
+        # Whole columns are converted to lists once: element access on memory-mapped
+        # arrays is much slower than on Python lists
+        ids = [value.decode("ascii") for value in self.column("id").tolist()]
+        coded = {key: (self.column(field).tolist(), self.vocabularies[field]) for field, key in _CODED_FIELDS.items()}
+        cell = {key: self.column(field).tolist() for field, key in _CELL_FIELDS.items()}
+        page, confidence, bbox = self.column("page").tolist(), self.column("confidence").tolist(), self.column("bbox").tolist()
+        text, text_offsets = bytes(self.column("text")), self.column("text_offsets").tolist()
+        polygon, polygon_offsets = self.column("polygon").tolist(), self.column("polygon_offsets").tolist()
+        entity_types = self.column("entity_types").tolist()
+        rel_offsets, rel_target, rel_type = (self.column(name).tolist() for name in ("rel_offsets", "rel_target", "rel_type"))
+        relationship_names = self.vocabularies["relationship_type"]
+
+        blocks = []
+        for row in selected:
+            block: Dict[str, Any] = {"Id": ids[row]}
+            for key, (values, names) in coded.items():
+                if values[row]:
+                    block[key] = names[values[row]]
+            for key, values in cell.items():
+                if values[row]:
+                    block[key] = values[row]
+            if page[row]:
+                block["Page"] = page[row]
+            if confidence[row] == confidence[row]: # Not NaN
+                block["Confidence"] = confidence[row]
+            if text_offsets[row + 1] > text_offsets[row]:
+                block["Text"] = text[text_offsets[row]:text_offsets[row + 1]].decode("utf-8")
+            if entity_types[row]:
+                block["EntityTypes"] = self.entity_types(row)
+            geometry = {}
+            if bbox[row][0] == bbox[row][0]:
+                geometry["BoundingBox"] = dict(zip(_BBOX_KEYS, bbox[row]))
+            if polygon_offsets[row + 1] > polygon_offsets[row]:
+                geometry["Polygon"] = [{"X": x, "Y": y} for x, y in polygon[polygon_offsets[row]:polygon_offsets[row + 1]]]
+            if geometry:
+                block["Geometry"] = geometry
+            relationships: Dict[str, List[str]] = {}
+            for position in range(rel_offsets[row], rel_offsets[row + 1]):
+                relationships.setdefault(relationship_names[rel_type[position]], []).append(ids[rel_target[position]])
+            if relationships:
+                block["Relationships"] = [{"Type": name, "Ids": target_ids} for name, target_ids in relationships.items()]
+            blocks.append(block)
+        return blocks
+
+
+if __name__ == '__main__':
+    import tempfile
+    import time
+    from document_processor.utils.table_utils import _synthetic_response, parse_textract_tables
+
+    blocks = [block for page in _synthetic_response(pages=1000) for block in page["Blocks"]]
+    for block in blocks:
+        block["Geometry"] = {"BoundingBox": {"Left": 0.1, "Top": 0.2, "Width": 0.3, "Height": 0.05},
+                             "Polygon": [{"X": 0.1, "Y": 0.2}, {"X": 0.4, "Y": 0.2}, {"X": 0.4, "Y": 0.25}, {"X": 0.1, "Y": 0.25}]}
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        path = write_block_store(os.path.join(directory, "doc.blocks"), blocks)
+        written = time.perf_counter() - start
+        store_size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        json_size = len(json.dumps(blocks))
+        print(f"{len(blocks)} blocks: JSON {json_size / 1e6:.1f} MB, block store {store_size / 1e6:.1f} MB, written in {written:.2f}s")
+
+        start = time.perf_counter()
+        store = BlockStore(path)
+        words = store.rows(block_type="WORD", page=500)
+        print(f"Words on page 500: {store.texts(words)[:4]} ({(time.perf_counter() - start) * 1000:.1f} ms, no JSON parsed)")
+        start = time.perf_counter()
+        tables = parse_textract_tables(store.to_blocks(["TABLE", "CELL", "MERGED_CELL", "WORD", "SELECTION_ELEMENT"]))
+        print(f"{len(tables)} tables rebuilt from the store in {time.perf_counter() - start:.2f}s")
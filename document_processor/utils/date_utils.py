@@ -1,7 +1,8 @@
 # Utility functions for date parsing, formatting, and validation
 
 from datetime import datetime, date
-from typing import Optional, List, Union
+from functools import lru_cache
+from typing import Optional, List, Tuple, Union
 import re
 
 # Common date formats to try when parsing
@@ -18,24 +19,113 @@ COMMON_DATE_FORMATS = [
     "%Y%m%d",    # 20231201 (No separator)
 ]
 
+# Month names accepted in "15 May 2024" style dates: English (as strptime's %b/%B in the
+# C locale) and Spanish, full and abbreviated. Keys are lowercase.
+MONTH_NAMES = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3, "apr": 4, "april": 4,
+    "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7, "aug": 8, "august": 8,
+    "sep": 9, "september": 9, "oct": 10, "october": 10, "nov": 11, "november": 11, "dec": 12, "december": 12,
+    "ene": 1, "enero": 1, "febrero": 2, "marzo": 3, "abr": 4, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "ago": 8, "agosto": 8, "sept": 9, "set": 9, "septiembre": 9, "setiembre": 9, "octubre": 10,
+    "noviembre": 11, "dic": 12, "diciembre": 12,
+}
+DATE_CACHE_SIZE = 4096 # Distinct date strings memoized per process
+
+# One pattern for every shape the default formats accept; the named group that matched
+# says which shape it is, and its digit groups become the date directly (no strptime).
+# Digits are ASCII only ([0-9], re.ASCII), as in strptime: "１５/05/2024" is not a date.
+# Whitespace stays Unicode-aware, as strptime's is (a non-breaking space separates too).
+_DATE_SHAPE_RE = re.compile(
+    r"(?P<d1>[0-9]{1,2})(?P<sep1>[/.-])(?P<m1>[0-9]{1,2})(?P=sep1)(?P<y1>[0-9]{4})"       # 15/05/2024, 15-05-2024, 15.05.2024
+    r"|(?P<y2>[0-9]{4})(?P<sep2>[/-])(?P<m2>[0-9]{1,2})(?P=sep2)(?P<d2>[0-9]{1,2})"       # 2024-05-15, 2024/05/15
+    r"|(?P<d3>[0-9]{1,2})\s+(?:de\s+)?(?P<mon>[^\W\d_]+)\.?\s+(?:del?\s+)?(?P<y3>[0-9]{4})" # 15 May 2024, 15 de mayo de 2024
+    r"|(?P<y4>[0-9]{4})(?P<m4>[0-9]{2})(?P<d4>[0-9]{2})"                                  # 20240515
+)
+_FOUR_DIGITS_RE = re.compile(r"\d{4}", re.ASCII)
+_DAY_MONTH_YEAR_RE = re.compile(r"(\d{1,2}| [1-9])/(\d{1,2})/(\d{4})", re.ASCII) # strptime's "%d/%m/%Y"
+
+# Candidate dates in free text (see find_and_parse_dates)
+_DATE_CANDIDATE_RE = re.compile(
+    r'\b('
+    r'(?:\d{1,2}[./-]\d{1,2}[./-]\d{2,4})|'  # dd/mm/yy or dd/mm/yyyy and variations
+    r'(?:\d{4}[./-]\d{1,2}[./-]\d{1,2})|'  # yyyy/mm/dd and variations
+    # d Mon YYYY / d de mes de YYYY, English or Spanish month (case-insensitive)
+    r'(?:\d{1,2}\s+(?:de\s+)?(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec|Ene|Abr|Ago|Set|Dic)[a-z]*\.?\s+(?:del?\s+)?\d{2,4})|'
+    r'(?:\d{8})' # YYYYMMDD
+    r')\b',
+    re.IGNORECASE
+)
+
+def _date_or_none(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+def _parse_with_formats(date_str: str, formats) -> Optional[date]:
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except (ValueError, TypeError):
+            continue
+    return None
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_default(date_str: str) -> Optional[date]:
+    """Same result as trying COMMON_DATE_FORMATS in order with strptime, plus Spanish month names."""
+    match = _DATE_SHAPE_RE.fullmatch(date_str)
+    if match is None:
+        # Every default format needs a 4-digit year; anything else with one (rare
+        # spacing variants strptime tolerates) goes through strptime itself.
+        if not _FOUR_DIGITS_RE.search(date_str):
+            return None
+        return _parse_with_formats(date_str, COMMON_DATE_FORMATS)
+    groups = match.groupdict()
+    if groups["d1"] is not None:
+        day, month, year = int(groups["d1"]), int(groups["m1"]), int(groups["y1"])
+        parsed = _date_or_none(year, month, day)
+        if parsed is None and groups["sep1"] == "/":
+            parsed = _date_or_none(year, day, month) # "%m/%d/%Y" (US) comes after "%d/%m/%Y"
+        return parsed
+    if groups["y2"] is not None:
+        return _date_or_none(int(groups["y2"]), int(groups["m2"]), int(groups["d2"]))
+    if groups["d3"] is not None:
+        month = MONTH_NAMES.get(groups["mon"].lower())
+        return _date_or_none(int(groups["y3"]), month, int(groups["d3"])) if month else None
+    return _date_or_none(int(groups["y4"]), int(groups["m4"]), int(groups["d4"]))
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_custom(date_str: str, formats: Tuple[str, ...]) -> Optional[date]:
+    return _parse_with_formats(date_str, formats)
+
 def parse_date_string(date_str: str, formats: Optional[List[str]] = None) -> Optional[date]:
     """
     Tries to parse a date string using a list of common formats.
     Returns a datetime.date object if successful, otherwise None.
+    With the default formats the string is matched once against all supported shapes and
+    the date is built from the captured digits; Spanish month names are also accepted
+    ("15 de mayo de 2024", "3 ene 2024"). Results are memoized per string.
     :param date_str: The date string to parse.
-    :param formats: Optional list of format strings to try. Defaults to COMMON_DATE_FORMATS.
+    :param formats: Optional list of format strings to try (with strptime). Defaults to COMMON_DATE_FORMATS.
     """
     if not date_str or not isinstance(date_str, str):
         return None
+    if formats:
+        return _parse_custom(date_str.strip(), tuple(formats))
+    return _parse_default(date_str.strip())
 
-    target_formats = formats or COMMON_DATE_FORMATS
-
-    for fmt in target_formats:
-        try:
-            return datetime.strptime(date_str.strip(), fmt).date()
-        except (ValueError, TypeError):
-            continue
-    return None
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_day_month_year(date_str: str) -> Optional[date]:
+    """
+    Parses a DD/MM/YYYY date exactly as `datetime.strptime(date_str, "%d/%m/%Y")` would,
+    without the strptime machinery. Returns None where strptime raises.
+    """
+    if not isinstance(date_str, str):
+        return None
+    match = _DAY_MONTH_YEAR_RE.fullmatch(date_str)
+    if match is None:
+        return None
+    return _date_or_none(int(match.group(3)), int(match.group(2)), int(match.group(1)))
 
 def find_and_parse_dates(text: str, formats: Optional[List[str]] = None) -> List[date]:
     """
@@ -46,33 +136,13 @@ def find_and_parse_dates(text: str, formats: Optional[List[str]] = None) -> List
     if not text:
         return []
 
-    # Basic regex to find potential date-like strings.
-    # This regex is quite broad and will capture many things that then need to be validated by strptime.
-    # It looks for sequences like dd/mm/yyyy, dd-mm-yyyy, yyyy-mm-dd, etc.
-    # It also tries to capture d Mon YYYY and d Month YYYY.
-    date_pattern = re.compile(
-        r'\b('
-        r'(?:\d{1,2}[./-]\d{1,2}[./-]\d{2,4})|'  # dd/mm/yy or dd/mm/yyyy and variations
-        r'(?:\d{4}[./-]\d{1,2}[./-]\d{1,2})|'  # yyyy/mm/dd and variations
-        r'(?:\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})|' # d Mon YYYY (case-insensitive for month)
-        r'(?:\d{8})' # YYYYMMDD
-        r')\b',
-        re.IGNORECASE
-    )
-
-    potential_dates_str = date_pattern.findall(text)
     parsed_dates = set() # Use a set to store unique dates
-
-    for date_str in potential_dates_str:
-        # Clean up common issues, e.g., "1st" -> "1" before parsing for some formats
-        # This part can be expanded. For now, just stripping.
-        cleaned_date_str = date_str.strip()
-
-        parsed_dt = parse_date_string(cleaned_date_str, formats)
+    for date_str in _DATE_CANDIDATE_RE.findall(text):
+        parsed_dt = parse_date_string(date_str, formats)
         if parsed_dt:
             parsed_dates.add(parsed_dt)
 
-    return sorted(list(parsed_dates))
+    return sorted(parsed_dates)
 
 
 def format_date(dt_obj: Union[date, datetime], fmt: str = "%Y-%m-%d") -> Optional[str]:
@@ -139,3 +209,29 @@ if __name__ == '__main__':
     print(f"Is 2024-02-29 valid (leap)? {is_valid_date(2024, 2, 29)}") # True
     print(f"Is 2023-13-01 valid (invalid month)? {is_valid_date(2023, 13, 1)}") # False
     print(f"Is 2023-04-31 valid (invalid day for Apr)? {is_valid_date(2023, 4, 31)}") # False
+
+    print("\n--- Microbenchmark: date-dense document ---")
+    import timeit
+
+    def legacy_find_and_parse_dates(text: str) -> List[date]:
+        # Previous implementation: pattern compiled per call, strptime tried format by format
+        pattern = re.compile(_DATE_CANDIDATE_RE.pattern, re.IGNORECASE)
+        return sorted({d for d in (_parse_with_formats(s.strip(), COMMON_DATE_FORMATS) for s in pattern.findall(text)) if d})
+
+    lines = []
+    for i in range(2000):
+        day, month = i % 28 + 1, i % 12 + 1
+        lines.append(f"Línea {i}: emitida {day:02d}/{month:02d}/2023, vence {2024 + i % 3}-{month:02d}-{day:02d}, "
+                     f"ref {20230000 + i}, entregada {day} {['Jan', 'Jun', 'Dec'][i % 3]} 2023, plazo 30/{month:02d}/24.")
+    dense_text = "\n".join(lines)
+    assert find_and_parse_dates(dense_text) == legacy_find_and_parse_dates(dense_text)
+    runs = 5
+    legacy = timeit.timeit(lambda: legacy_find_and_parse_dates(dense_text), number=runs) / runs
+    _parse_default.cache_clear()
+    cold = timeit.timeit(lambda: find_and_parse_dates(dense_text), number=1)
+    warm = timeit.timeit(lambda: find_and_parse_dates(dense_text), number=runs) / runs
+    candidates = len(_DATE_CANDIDATE_RE.findall(dense_text))
+    print(f"{candidates} candidate dates per document")
+    print(f"strptime loop:        {legacy * 1000:8.2f} ms")
+    print(f"engine (cold cache):  {cold * 1000:8.2f} ms ({legacy / cold:.1f}x)")
+    print(f"engine (memoized):    {warm * 1000:8.2f} ms ({legacy / warm:.1f}x)")
@@ -1,8 +1,18 @@
 # Utility functions for file operations
 
+import hashlib
+import mmap
 import os
-import shutil
-from typing import Optional, List
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, NamedTuple, Optional, List, Union
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024 # 1 MiB per read/write when streaming files
+
+class StoredFile(NamedTuple):
+    """Result of streaming a file to disk: where it went, its size and its SHA-256."""
+    path: str
+    size: int
+    sha256: str
 
 def get_file_extension(file_path: str) -> Optional[str]:
     """
@@ -42,15 +52,42 @@ def create_directory_if_not_exists(dir_path: str):
     #     print(f"Directory already exists: {dir_path}")
 
 
+def stream_to_file(source: BinaryIO, destination_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> StoredFile:
+    """
+    Copies a file-like object to `destination_path` in fixed-size chunks, computing
+    its SHA-256 on the fly, so memory use does not grow with the document size.
+    The file is written to a temporary name first and renamed when complete, so a
+    failed copy never leaves a truncated document behind.
+    """
+    create_directory_if_not_exists(os.path.dirname(destination_path) or ".")
+    digest = hashlib.sha256()
+    size = 0
+    temp_path = f"{destination_path}.part"
+    try:
+        with open(temp_path, "wb") as buffer:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                buffer.write(chunk)
+                size += len(chunk)
+        os.replace(temp_path, destination_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return StoredFile(destination_path, size, digest.hexdigest())
+
+
 def save_uploaded_file(upload_file, destination_path: str) -> bool:
     """
     Saves an uploaded file (e.g., from FastAPI's UploadFile) to a destination.
     Assumes `upload_file` has a `file` attribute (like BytesIO) and a `filename`.
+    The file is streamed in chunks (see `stream_to_file`).
     """
-    create_directory_if_not_exists(os.path.dirname(destination_path))
     try:
-        with open(destination_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
+        stream_to_file(upload_file.file, destination_path)
         print(f"File '{getattr(upload_file, 'filename', 'unknown')}' saved to '{destination_path}'")
         return True
     except Exception as e:
@@ -61,10 +98,59 @@ def save_uploaded_file(upload_file, destination_path: str) -> bool:
              upload_file.close()
 
 
+def file_sha256(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """Returns the SHA-256 hex digest of a file, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def open_file_view(file_path: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    Yields a read-only, memory-mapped view of a file. Pages are loaded by the OS on
+    demand, so large documents can be hashed or sent on without copying them into
+    the Python heap. Empty files (which cannot be mapped) yield b"".
+    """
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view
+
+
+def raw_text_archive_path(document_id: str, archive_dir: str) -> str:
+    """
+    Where `archive_raw_text` archives a document's OCR text: `<archive_dir>/<first 2
+    chars of id>/<id>.txt`. Files are spread over subdirectories so that an archive of
+    millions of documents does not end up in a single directory.
+    """
+    return os.path.join(archive_dir, document_id[:2], f"{document_id}.txt")
+
+
+def archive_raw_text(document_id: str, text: str, archive_dir: str) -> str:
+    """
+    Writes a document's OCR text to `raw_text_archive_path(document_id, archive_dir)`
+    and returns the path. The write is atomic (temporary name, then rename), like
+    `stream_to_file`.
+    """
+    destination_path = raw_text_archive_path(document_id, archive_dir)
+    create_directory_if_not_exists(os.path.dirname(destination_path))
+    temp_path = f"{destination_path}.part"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, destination_path)
+    return destination_path
+
+
 def read_file_bytes(file_path: str) -> Optional[bytes]:
     """
     Reads a file and returns its content as bytes.
     Returns None if the file cannot be read.
+    Loads the whole file into memory; prefer `open_file_view` for large documents.
     """
     try:
         with open(file_path, "rb") as f:
@@ -4,11 +4,157 @@
 # - Using OCR capabilities that specifically identify tables (like Textract's AnalyzeDocument with 'TABLES' feature).
 # - PDF parsing libraries that can interpret table structures (e.g., camelot-py, tabula-py).
 # - Computer vision models if dealing with image-based tables.
+#
+# Textract tables are parsed from the response's block graph: TABLE blocks point to CELL
+# (and MERGED_CELL) blocks, which point to WORD / SELECTION_ELEMENT blocks. An Id -> Block
+# index is built once, so each relationship is resolved with a dict lookup and the whole
+# parse is linear in the number of blocks, also for multi-page (paginated) responses.
+# Each table comes back as one NumPy object array per column (the shape
+# `BaseValidator.validate_batch` takes), without building it row by row. pandas is
+# optional: `TextractTable.to_dataframe` imports it only when called.
 
-# This file will provide placeholders for such functionalities.
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+TextractResponse = Union[dict, List[dict]] # A response, a list of paginated responses, or a list of blocks
+
+
+class TextractTable(NamedTuple):
+    table_id: str
+    page: int
+    column_names: List[str]
+    columns: Dict[str, np.ndarray] # Body cell texts per column; None where a cell was below min_confidence
+    cell_confidence: np.ndarray # (rows, columns) body cell confidences, NaN where there is no cell
+    confidence: float # Confidence of the TABLE block
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.cell_confidence)
+
+    def to_records(self) -> List[Dict[str, Optional[str]]]:
+        """One dict per body row, e.g. {"Concepto": ..., "Cantidad": ..., "Precio": ..., "Total": ...}."""
+        return [dict(zip(self.column_names, row)) for row in zip(*self.columns.values())]
+
+    def to_dataframe(self):
+        """The table as a pandas DataFrame (requires pandas)."""
+        import pandas as pd
+        return pd.DataFrame(self.columns, columns=self.column_names)
+
+
+def _iter_blocks(response: TextractResponse) -> Iterable[dict]:
+    if isinstance(response, dict):
+        return response.get("Blocks", [])
+    if response and "BlockType" not in response[0]: # Pages of a paginated (NextToken) response
+        return (block for page in response for block in page.get("Blocks", []))
+    return response
+
+
+def _child_ids(block: dict, relationship_type: str = "CHILD") -> List[str]:
+    ids = []
+    for relationship in block.get("Relationships") or ():
+        if relationship.get("Type") == relationship_type:
+            ids.extend(relationship.get("Ids", ()))
+    return ids
+
+
+def _cell_text(cell: dict, blocks_by_id: Dict[str, dict], min_confidence: float) -> str:
+    parts = []
+    for child_id in _child_ids(cell):
+        child = blocks_by_id.get(child_id)
+        if child is None or child.get("Confidence", 100.0) < min_confidence:
+            continue
+        if child.get("BlockType") == "WORD":
+            parts.append(child.get("Text", ""))
+        elif child.get("BlockType") == "SELECTION_ELEMENT":
+            parts.append("[X]" if child.get("SelectionStatus") == "SELECTED" else "[ ]")
+    return " ".join(parts)
+
+
+def _column_names(header: np.ndarray) -> List[str]:
+    """Column names from the header rows of a (columns, header rows) grid, made unique."""
+    names, seen = [], {}
+    for index, parts in enumerate(header):
+        words = []
+        for part in parts:
+            if part and (not words or words[-1] != part): # Merged header cells repeat their text
+                words.append(part)
+        name = " ".join(words) or f"Col{index + 1}"
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+def _parse_table(table: dict, blocks_by_id: Dict[str, dict], min_confidence: float,
+                 header: bool) -> Optional[TextractTable]:
+    cells = [blocks_by_id[cell_id] for cell_id in _child_ids(table) if cell_id in blocks_by_id]
+    cells = [cell for cell in cells if cell.get("BlockType") == "CELL"]
+    if not cells:
+        return None
+    num_rows = max(cell["RowIndex"] + cell.get("RowSpan", 1) - 1 for cell in cells)
+    num_columns = max(cell["ColumnIndex"] + cell.get("ColumnSpan", 1) - 1 for cell in cells)
+    # Column-major, so each column's body is a contiguous slice of the grid
+    grid = np.full((num_columns, num_rows), "", dtype=object)
+    confidence = np.full((num_columns, num_rows), np.nan)
+    header_rows = 0
+
+    def place(block: dict, text: Optional[str]):
+        rows = slice(block["RowIndex"] - 1, block["RowIndex"] - 1 + block.get("RowSpan", 1))
+        columns = slice(block["ColumnIndex"] - 1, block["ColumnIndex"] - 1 + block.get("ColumnSpan", 1))
+        cell_confidence = block.get("Confidence", 100.0)
+        grid[columns, rows] = text if cell_confidence >= min_confidence else None
+        confidence[columns, rows] = cell_confidence
+
+    cell_texts = {}
+    for cell in cells:
+        cell_texts[cell["Id"]] = text = _cell_text(cell, blocks_by_id, min_confidence)
+        place(cell, text)
+        if "COLUMN_HEADER" in (cell.get("EntityTypes") or ()):
+            header_rows = max(header_rows, cell["RowIndex"] + cell.get("RowSpan", 1) - 1)
+    # A merged cell's text is that of its cells, repeated over every position it spans
+    for merged_id in _child_ids(table, "MERGED_CELL"):
+        merged = blocks_by_id.get(merged_id)
+        if merged is None:
+            continue
+        texts = [cell_texts[cell_id] for cell_id in _child_ids(merged) if cell_texts.get(cell_id)]
+        place(merged, " ".join(texts))
+
+    if not header:
+        header_rows = 0
+    elif header_rows == 0:
+        header_rows = 1 # No cell is tagged as a column header: the first row is the header
+    names = _column_names(grid[:, :header_rows]) if header_rows else [f"Col{j + 1}" for j in range(num_columns)]
+    return TextractTable(
+        table_id=table["Id"],
+        page=table.get("Page", 1),
+        column_names=names,
+        columns={name: grid[j, header_rows:] for j, name in enumerate(names)},
+        cell_confidence=confidence[:, header_rows:].T,
+        confidence=table.get("Confidence", 100.0),
+    )
+
+
+def parse_textract_tables(response: TextractResponse, min_confidence: float = 0.0,
+                          header: bool = True) -> List[TextractTable]:
+    """
+    Parses every table of a Textract AnalyzeDocument response (with the 'TABLES' feature).
+    :param response: A response dict, a list of paginated response dicts, or a flat list
+                     of blocks (as returned by `aws_lib` and stored with documents).
+    :param min_confidence: Cells below this confidence (0-100) become None; words below it
+                           are left out of their cell's text.
+    :param header: Use the column-header rows (or, if none is tagged, the first row) as
+                   column names. Otherwise columns are named Col1, Col2, ...
+    :return: Tables in document order.
+    """
+    blocks_by_id = {}
+    tables = []
+    for block in _iter_blocks(response):
+        blocks_by_id[block["Id"]] = block
+        if block.get("BlockType") == "TABLE":
+            tables.append(block)
+    parsed = (_parse_table(table, blocks_by_id, min_confidence, header) for table in tables)
+    return [table for table in parsed if table is not None]
 
-# from typing import List, Dict, Any, Optional
-# import pandas as pd # Pandas DataFrames are a common way to represent tables
 
 class TableExtractor:
     def __init__(self, ocr_results: Optional[Any] = None, pdf_path: Optional[str] = None):
@@ -20,62 +166,19 @@ class TableExtractor:
         """
         self.ocr_results = ocr_results
         self.pdf_path = pdf_path
-        print("TableExtractor initialized (mock).")
 
-    def extract_tables_from_textract_response(self, textract_response: dict) -> List[pd.DataFrame]:
+    def extract_tables_from_textract_response(self, textract_response: Optional[TextractResponse] = None,
+                                              min_confidence: float = 0.0) -> List[TextractTable]:
         """
-        Parses a Textract 'AnalyzeDocument' response (with 'TABLES' feature)
-        and converts detected tables into a list of pandas DataFrames.
-
-        This is a simplified placeholder. A real implementation needs to handle:
-        - Merged cells.
-        - Relationships between TABLE, CELL, and WORD blocks.
-        - Confidence scores.
+        Parses a Textract 'AnalyzeDocument' response (with 'TABLES' feature), or the
+        `ocr_results` given at construction, into tables. See `parse_textract_tables`.
         """
-        # tables_data = []
-        # if not textract_response or "Blocks" not in textract_response:
-        #     return tables_data
-
-        # table_blocks = [block for block in textract_response["Blocks"] if block["BlockType"] == "TABLE"]
-        # cell_blocks_by_id = {block["Id"]: block for block in textract_response["Blocks"] if block["BlockType"] == "CELL"}
-        # word_blocks_by_id = {block["Id"]: block for block in textract_response["Blocks"] if block["BlockType"] == "WORD"}
-
-        # for table_block in table_blocks:
-        #     # Determine table dimensions (rows, columns) - Textract provides this
-        #     # Iterate through cell relationships in the table block
-        #     # For each cell, get its text content by looking up child WORD blocks
-        #     # Assemble into a 2D list or directly into a DataFrame
-
-        #     # Placeholder:
-        #     num_rows = table_block.get("Rows", 0) # This is not directly in Textract, needs calculation
-        #     num_cols = table_block.get("Columns", 0) # Same as above
-
-        #     # This is a very naive representation. A real parser is complex.
-        #     # For instance, you'd iterate `table_block['Relationships']` of type `CHILD` to find `CELL` IDs,
-        #     # then for each `CELL`, find its `WORD` children to get text.
-        #     # Then map `RowIndex`, `ColumnIndex` from `CELL` block to DataFrame positions.
-
-        #     if num_rows > 0 and num_cols > 0: # A very rough guess for placeholder
-        #         data = [["(mock cell)" for _ in range(num_cols)] for _ in range(num_rows)]
-        #         df = pd.DataFrame(data, columns=[f"Col{i+1}" for i in range(num_cols)])
-        #         tables_data.append(df)
-        #     else: # Fallback mock if dimensions are hard to guess from placeholder
-        #         df = pd.DataFrame({
-        #             "Header1 (mock)": ["R1C1", "R2C1"],
-        #             "Header2 (mock)": ["R1C2", "R2C2"]
-        #         })
-        #         tables_data.append(df)
-
-        print(f"Simulating table extraction from Textract response. Found 1 mock table.")
-        # Simulate finding one table
-        mock_df = pd.DataFrame({
-            "Column A (Simulated)": [1, 2, 3],
-            "Column B (Simulated)": ["Data X", "Data Y", "Data Z"],
-            "Column C (Simulated)": [10.5, 20.3, 30.1]
-        })
-        return [mock_df]
+        response = textract_response if textract_response is not None else self.ocr_results
+        if not response:
+            return []
+        return parse_textract_tables(response, min_confidence=min_confidence)
 
-    def extract_tables_with_camelot(self) -> List[pd.DataFrame]:
+    def extract_tables_with_camelot(self) -> list:
         """
         Extracts tables from a PDF using camelot-py.
         Requires camelot-py and its dependencies (Ghostscript, Tkinter) to be installed.
@@ -97,6 +200,7 @@ class TableExtractor:
         if not self.pdf_path:
             print("PDF path not provided for Camelot simulation.")
             return []
+        import pandas as pd
         print(f"Simulating table extraction with Camelot for PDF: {self.pdf_path}. Found 1 mock table.")
         mock_df = pd.DataFrame({
             "Camelot Header 1": ["Val1", "Val2"],
@@ -104,57 +208,49 @@ class TableExtractor:
         })
         return [mock_df]
 
-def dataframe_to_json_serializable(df: pd.DataFrame) -> List[Dict[str, Any]]:
+def dataframe_to_json_serializable(df) -> List[Dict[str, Any]]:
     """
     Converts a pandas DataFrame into a JSON-serializable list of dictionaries (one per row).
     Handles potential NaNs or other non-serializable types if necessary.
     """
-    # return df.to_dict(orient='records')
-    # More robustly, handle NaNs which are not valid JSON `null` directly via to_json then parse
-    # For simplicity now, to_dict is often fine if data is clean or further processed.
     # Replace NaN with None for JSON compatibility
-    return df.where(pd.notnull(df), None).to_dict(orient='records')
+    return df.astype(object).where(df.notnull(), None).to_dict(orient='records')
+
+
+def _synthetic_response(pages: int, rows: int = 20) -> List[dict]:
+    """A paginated AnalyzeDocument response with one line-item table per page."""
+    responses = []
+    for page in range(1, pages + 1):
+        blocks, cell_ids = [], []
+        for row in range(1, rows + 1):
+            values = ["Concepto", "Cantidad", "Precio", "Total"] if row == 1 else [f"Partida {row}", "2", "10,50", "21,00"]
+            for column, value in enumerate(values, start=1):
+                cell_id, word_id = f"p{page}-c{row}-{column}", f"p{page}-w{row}-{column}"
+                blocks.append({"BlockType": "WORD", "Id": word_id, "Text": value, "Confidence": 99.0, "Page": page})
+                blocks.append({"BlockType": "CELL", "Id": cell_id, "RowIndex": row, "ColumnIndex": column,
+                               "Confidence": 95.0, "Page": page, "EntityTypes": ["COLUMN_HEADER"] if row == 1 else [],
+                               "Relationships": [{"Type": "CHILD", "Ids": [word_id]}]})
+                cell_ids.append(cell_id)
+        blocks.append({"BlockType": "TABLE", "Id": f"p{page}-table", "Confidence": 98.0, "Page": page,
+                       "Relationships": [{"Type": "CHILD", "Ids": cell_ids}]})
+        responses.append({"Blocks": blocks})
+    return responses
 
 
 if __name__ == '__main__':
-    print("--- Mock Textract Table Extraction ---")
-    # Simulate a Textract response structure (very simplified)
-    mock_textract_response = {
-        "Blocks": [
-            {"BlockType": "TABLE", "Id": "table1", "Rows": 2, "Columns": 2}, # Simplified attributes
-            # ... other blocks like CELL, WORD would be here in a real response
-        ]
-    }
-    extractor_textract = TableExtractor(ocr_results=mock_textract_response)
-    textract_tables = extractor_textract.extract_tables_from_textract_response(mock_textract_response)
-    if textract_tables:
-        print(f"Found {len(textract_tables)} table(s) from Textract (mock):")
-        for i, table_df in enumerate(textract_tables):
-            print(f"Table {i+1}:\n{table_df}\n")
-            serializable_table = dataframe_to_json_serializable(table_df)
-            print(f"Serializable version of Table {i+1}:\n{serializable_table}\n")
-    else:
-        print("No tables extracted from Textract (mock).")
-
-    print("\n--- Mock Camelot Table Extraction ---")
-    # Create a dummy PDF file name for the simulation
-    dummy_pdf_file = "dummy_document_for_camelot.pdf"
-    extractor_camelot = TableExtractor(pdf_path=dummy_pdf_file)
-    camelot_tables = extractor_camelot.extract_tables_with_camelot()
-    if camelot_tables:
-        print(f"Found {len(camelot_tables)} table(s) with Camelot (mock):")
-        for i, table_df in enumerate(camelot_tables):
-            print(f"Table {i+1}:\n{table_df}\n")
-    else:
-        print("No tables extracted with Camelot (mock).")
-
-    # Example of dataframe_to_json_serializable with NaN
-    df_with_nan = pd.DataFrame({
-        'col1': [1, 2, np.nan],
-        'col2': ['a', np.nan, 'c']
-    })
-    import numpy as np # for pd.NA or np.nan
-    print(f"\n--- Testing dataframe_to_json_serializable with NaN ---")
-    print(f"Original DataFrame with NaN:\n{df_with_nan}")
-    json_serializable_nan = dataframe_to_json_serializable(df_with_nan.copy()) # Use copy
-    print(f"JSON Serializable (NaN replaced with None):\n{json_serializable_nan}")
+    import time
+
+    print("--- Textract Table Extraction ---")
+    textract_tables = TableExtractor().extract_tables_from_textract_response(_synthetic_response(pages=1, rows=3))
+    for i, table in enumerate(textract_tables):
+        print(f"Table {i+1} (page {table.page}): {table.column_names}")
+        for record in table.to_records():
+            print(f"  {record}")
+
+    # Parse time should grow linearly with the number of pages
+    for pages in (100, 1000):
+        response = _synthetic_response(pages)
+        start = time.perf_counter()
+        tables = parse_textract_tables(response)
+        elapsed = time.perf_counter() - start
+        print(f"{pages} pages, {sum(len(r['Blocks']) for r in response)} blocks: {len(tables)} tables in {elapsed:.3f}s")
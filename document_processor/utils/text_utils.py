@@ -2,6 +2,7 @@
 
 import re
 import unicodedata
+from typing import Iterable, Set
 
 def normalize_text(text: str) -> str:
     """
@@ -68,6 +69,55 @@ def extract_numbers(text: str, convert_to_float: bool = False) -> list:
     return found_strings
 
 
+def trie_regex_pattern(words: Iterable[str]) -> str:
+    """
+    Builds a regex alternation shaped like a trie of `words`, so shared prefixes are
+    matched once and the engine dispatches on one character per step instead of trying
+    each word in turn. At any position it matches the longest word.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {} # End of a word
+
+    def serialize(node: dict) -> str:
+        is_end = "" in node
+        branches = [re.escape(char) + serialize(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if is_end:
+            return "(?:" + body + ")?" if len(branches) == 1 else body + "?"
+        return body
+
+    return serialize(trie)
+
+class KeywordScanner:
+    """
+    Finds which of a fixed set of keywords occur in a text, as substrings, with a single
+    regex scan. Cost depends on the text length, not on the number of keywords.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        vocabulary = {keyword for keyword in keywords if keyword}
+        # A match of a long keyword also counts every keyword it contains
+        # ("factura nº" implies "factura"), since the scan reports the longest match only.
+        self._implied = {word: frozenset(other for other in vocabulary if other in word) for word in vocabulary}
+        # The lookahead lets matches overlap: every start position is tried once.
+        self._pattern = re.compile("(?=(" + trie_regex_pattern(vocabulary) + "))") if vocabulary else None
+
+    def find(self, text: str) -> Set[str]:
+        """Returns every keyword that occurs in `text`."""
+        found: Set[str] = set()
+        if self._pattern is None or not text:
+            return found
+        implied = self._implied
+        for match in self._pattern.findall(text):
+            found |= implied[match]
+        return found
+
 if __name__ == '__main__':
     sample_text_1 = "  Esto es una PRUEBA   con    espacios extra y ácentos.  "
     normalized = normalize_text(sample_text_1)
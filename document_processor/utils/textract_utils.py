@@ -4,30 +4,124 @@
 # from botocore.exceptions import ClientError
 # import time
 # from config import AWS_REGION, TEXTRACT_S3_BUCKET # Assuming these are in config
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import logging
+
+from aws_lib.ocr_cache import (
+    OCRCache, cache_key_for_bytes, cache_key_for_s3_object, cache_key_for_sha256, get_default_ocr_cache,
+)
+from aws_lib.page_parallel import PagePart, count_pdf_pages, is_pdf, split_pdf
+from document_processor.config import OCR_MAX_PARALLEL_JOBS, OCR_PAGE_PARALLEL_THRESHOLD, OCR_PAGES_PER_JOB
+from document_processor.utils.file_utils import open_file_view
+
+logger = logging.getLogger(__name__)
 
 class TextractClient:
-    def __init__(self, region_name=None, s3_bucket_name=None):
+    def __init__(self, region_name=None, s3_bucket_name=None, ocr_cache: Optional[OCRCache] = None,
+                 page_parallel_threshold: Optional[int] = OCR_PAGE_PARALLEL_THRESHOLD,
+                 pages_per_job: int = OCR_PAGES_PER_JOB, max_parallel_jobs: int = OCR_MAX_PARALLEL_JOBS):
         """
         Initializes the Textract client.
         :param region_name: AWS region for Textract.
         :param s3_bucket_name: S3 bucket for asynchronous operations with large documents.
+        :param ocr_cache: Optional OCR result cache. Defaults to the process-wide cache
+                          configured through OCR_CACHE_DIR, if any.
+        :param page_parallel_threshold: Local PDFs with at least this many pages are split into
+                                        ranges of `pages_per_job` pages, OCR'd by up to
+                                        `max_parallel_jobs` concurrent calls and merged in page
+                                        order. None disables it. Requires pypdf.
         """
+        self.s3_bucket_name = s3_bucket_name
+        self.ocr_cache = ocr_cache if ocr_cache is not None else get_default_ocr_cache()
+        self.page_parallel_threshold = page_parallel_threshold
+        self.pages_per_job = pages_per_job
+        self.max_parallel_jobs = max_parallel_jobs
         # self.region_name = region_name or AWS_REGION
         # self.s3_bucket_name = s3_bucket_name or TEXTRACT_S3_BUCKET
         # self.textract = boto3.client('textract', region_name=self.region_name)
         # self.s3_client = boto3.client('s3', region_name=self.region_name) # If uploading to S3 first
         print(f"TextractClient initialized (mock). Region: {region_name}, S3 Bucket: {s3_bucket_name}")
 
-    def extract_text_sync(self, document_bytes: bytes) -> Optional[str]:
+    def extract_text(self, document_path: str, content_sha256: Optional[str] = None) -> Optional[str]:
+        """
+        Extracts text from a local file or from an S3 URI (s3://bucket/key).
+        Local files go through the synchronous API, S3 objects through an async job.
+        :param document_path: Local path or S3 URI of the document.
+        :param content_sha256: SHA-256 of a local file, if already known (e.g. from the upload).
+        :return: Extracted text as a single string, or None if error.
+        """
+        if document_path.startswith("s3://"):
+            bucket_name, _, document_key = document_path[len("s3://"):].partition("/")
+            return self.extract_text_from_s3(document_key, bucket_name)
+        return self.extract_text_from_file(document_path, content_sha256)
+
+    def extract_text_from_file(self, file_path: str, content_sha256: Optional[str] = None) -> Optional[str]:
+        """
+        Extracts text from a local file through a memory-mapped view of it, so the
+        document is never copied whole into the Python heap.
+        :param file_path: Path of the local document.
+        :param content_sha256: SHA-256 of the file, if already known; avoids hashing it again.
+        :return: Extracted text as a single string, or None if error.
+        """
+        try:
+            with open_file_view(file_path) as document_view:
+                return self.extract_text_sync(document_view, content_sha256)
+        except OSError as e:
+            print(f"Error reading file {file_path}: {e}")
+            return None
+
+    def extract_text_sync(self, document_bytes, content_sha256: Optional[str] = None) -> Optional[str]:
         """
         Extracts text from a document synchronously.
         Suitable for smaller documents (PDFs up to 500 pages, images).
-        :param document_bytes: Bytes of the document file.
+        :param document_bytes: Bytes of the document file, or a bytes-like view (e.g. an mmap).
+        :param content_sha256: SHA-256 of the document, if already known.
         :return: Extracted text as a single string, or None if error.
         """
+        cache_key = None
+        if self.ocr_cache is not None:
+            cache_key = cache_key_for_sha256(content_sha256) if content_sha256 else cache_key_for_bytes(document_bytes)
+            cached = self.ocr_cache.get(cache_key)
+            if cached is not None:
+                return cached["text"]
+        parts = self._page_parts(document_bytes)
+        text = self._detect_page_parts(parts) if parts else self._detect_document_text_sync(document_bytes)
+        if text and cache_key is not None:
+            self.ocr_cache.put(cache_key, {"text": text})
+        return text
+
+    def _page_parts(self, document_bytes) -> Optional[List[PagePart]]:
+        """The page ranges to OCR concurrently, or None to OCR the document in one call."""
+        if not self.page_parallel_threshold or not is_pdf(document_bytes):
+            return None
+        try:
+            if count_pdf_pages(document_bytes) < self.page_parallel_threshold:
+                return None
+            return split_pdf(document_bytes, self.pages_per_job)
+        except ImportError as e:
+            logger.warning(f"{e} OCR'ing the document in a single call.")
+            return None
+        except Exception as e: # Malformed PDFs are still sent to Textract as they are
+            logger.warning(f"Could not split the PDF into page ranges ({e}); OCR'ing it in a single call.")
+            return None
+
+    def _detect_page_parts(self, parts: List[PagePart]) -> Optional[str]:
+        """OCRs page ranges concurrently and joins their text in page order. None if any range fails."""
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel_jobs, len(parts)), thread_name_prefix="ocr-pages") as pool:
+            texts = list(pool.map(lambda part: self._detect_document_text_sync(part.content), parts))
+        for part, text in zip(parts, texts):
+            if text is None:
+                logger.error(f"OCR failed for pages {part.first_page}-{part.last_page}.")
+                return None
+        return "\n".join(text for text in texts if text)
+
+    def _detect_document_text_sync(self, document_bytes) -> Optional[str]:
+        # The Textract sync API takes the document in the request body, so this is the
+        # only place where a memory-mapped view has to be materialized as bytes.
         # try:
         #     response = self.textract.detect_document_text(
-        #         Document={'Bytes': document_bytes}
+        #         Document={'Bytes': bytes(document_bytes)}
         #     )
         #     # Process response to concatenate text blocks
         #     text = ""
@@ -45,6 +139,8 @@ class TextractClient:
     def start_text_extraction_async(self, s3_document_key: str, s3_bucket: Optional[str] = None) -> Optional[str]:
         """
         Starts an asynchronous text detection job for a document in S3.
+        From asyncio code (e.g. the FastAPI handlers) use `aws_lib.async_textract.AsyncTextractClient`
+        instead, which polls all pending jobs without blocking the event loop.
         :param s3_document_key: Key (path) of the document in S3.
         :param s3_bucket: S3 bucket name. Defaults to instance's s3_bucket_name.
         :return: JobId if the job started successfully, else None.
@@ -110,6 +206,30 @@ class TextractClient:
         else: # Simulate success
             return "Simulated extracted text from Textract (asynchronous job success).\nContent from page 1.\nContent from page 2."
 
+    def extract_text_from_s3(self, s3_document_key: str, s3_bucket: Optional[str] = None) -> Optional[str]:
+        """
+        Extracts text from a document in S3, reusing a cached OCR result when the
+        object's content (ETag) has already been processed.
+        :param s3_document_key: Key (path) of the document in S3.
+        :param s3_bucket: S3 bucket name. Defaults to instance's s3_bucket_name.
+        :return: Extracted text as a single string, or None if the job failed.
+        """
+        target_bucket = s3_bucket or self.s3_bucket_name
+        cache_key = None
+        if self.ocr_cache is not None:
+            cache_key = cache_key_for_s3_object(target_bucket, s3_document_key)
+            cached = self.ocr_cache.get(cache_key)
+            if cached is not None:
+                return cached["text"]
+
+        job_id = self.start_text_extraction_async(s3_document_key, target_bucket)
+        if not job_id:
+            return None
+        text = self.get_async_extraction_results(job_id)
+        if text and cache_key is not None:
+            self.ocr_cache.put(cache_key, {"text": text})
+        return text
+
     # Helper to upload to S3 if needed (e.g., for async)
     # def upload_to_s3(self, file_bytes: bytes, s3_key: str, bucket_name: Optional[str] = None) -> bool:
     #     target_bucket = bucket_name or self.s3_bucket_name
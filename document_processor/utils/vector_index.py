@@ -0,0 +1,377 @@
+# Índice vectorial local (NumPy, memoria mapeada)
+
+# Nearest-neighbour search over embeddings for the RAG system (rag.py), with no
+# external service. Vectors are stored L2-normalized as float32, so the inner product
+# of two vectors is their cosine similarity.
+#
+# Two ways of searching, picked per index size:
+#
+# - flat: exact. The query batch is multiplied against every stored vector, in blocks
+#   of FLAT_BLOCK_ROWS rows to bound memory, keeping the top k per query;
+# - IVF (inverted file): the vectors are partitioned with spherical k-means into
+#   `nlist` lists, each stored contiguously. A query only scans the `nprobe` lists
+#   whose centroids are closest to it: approximate, but it reads ~N*nprobe/nlist
+#   vectors instead of N. Indexes partition themselves once they reach
+#   `ivf_min_vectors` vectors.
+#
+# On disk an index is a directory:
+#
+# - vectors.<generation>.f32: the vectors, row-major float32 (count x dim), searched
+#   memory-mapped;
+# - ids.<generation>.i64: the id of the vector at each position. Ids are assigned in
+#   insertion order and never change; positions change when the lists are rebuilt;
+# - payloads.jsonl + payload_offsets.i64: one JSON payload per id (e.g. a chunk's text
+#   and document id), read by seeking, only for the results of a search;
+# - centroids.<generation>.npy + list_offsets.<generation>.npy (IVF): list i is
+#   stored at positions [list_offsets[i], list_offsets[i + 1]);
+# - meta.json: dimension, count, generation and how many positions the lists cover.
+#
+# Adds are appended to the files and committed by rewriting meta.json; bytes past the
+# counts in meta.json (a failed add) are truncated by the next add. Vectors added after
+# the lists were built form an unpartitioned tail, searched exactly. Once the tail
+# exceeds `max_unpartitioned` vectors, it is sorted into the lists: the files are
+# rewritten in list order as a new generation (k-means is only retrained when the
+# index has grown `retrain_growth` times since the last training). Bulk loads should
+# therefore be added in large batches.
+#
+# One writer per index. Searches may run concurrently with each other and with adds.
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+PAYLOADS_FILE = "payloads.jsonl"
+PAYLOAD_OFFSETS_FILE = "payload_offsets.i64"
+
+FLAT_BLOCK_ROWS = 65536 # Vectors multiplied against the queries at once
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64 # k-means trains on up to nlist * this many vectors
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """float32 copy of `vectors` (n x dim) with every row scaled to unit length (zero rows stay zero)."""
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def default_nlist(count: int) -> int:
+    """Number of IVF lists for `count` vectors (~sqrt(count), as usual for IVF)."""
+    return max(1, int(round(np.sqrt(count))))
+
+
+class _TopK:
+    """Running top k (highest score) per query, over candidates seen in blocks."""
+
+    def __init__(self, queries: int, k: int):
+        self.k = k
+        self.scores = np.full((queries, k), -np.inf, dtype=np.float32)
+        self.positions = np.full((queries, k), -1, dtype=np.int64)
+
+    def update(self, rows: Any, scores: np.ndarray, positions: np.ndarray):
+        """
+        Merges candidates into the results of some queries.
+        :param rows: The queries (index array or slice) the rows of `scores` belong to.
+        :param scores: Scores (queries x candidates).
+        :param positions: Position of each candidate (1-D).
+        """
+        k = self.k
+        if scores.shape[1] > k:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(scores, top, axis=1)
+            positions = positions[top]
+        else:
+            positions = np.broadcast_to(positions, scores.shape)
+        merged_scores = np.concatenate((self.scores[rows], scores), axis=1)
+        merged_positions = np.concatenate((self.positions[rows], positions), axis=1)
+        top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        self.scores[rows] = np.take_along_axis(merged_scores, top, axis=1)
+        self.positions[rows] = np.take_along_axis(merged_positions, top, axis=1)
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(scores, positions), best first."""
+        order = np.argsort(-self.scores, axis=1, kind="stable")
+        return np.take_along_axis(self.scores, order, axis=1), np.take_along_axis(self.positions, order, axis=1)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid (highest inner product) of every vector."""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), FLAT_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + FLAT_BLOCK_ROWS])
+        assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
+
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, iterations: int = KMEANS_ITERATIONS,
+                     seed: int = 0) -> np.ndarray:
+    """
+    Trains `nlist` unit-length centroids on a sample of `vectors` (normalized rows, at
+    least `nlist` of them), assigning by inner product.
+    :return: Centroids (nlist x dim), float32.
+    """
+    rng = np.random.default_rng(seed)
+    count = len(vectors)
+    sample_size = min(count, nlist * KMEANS_SAMPLE_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(count, size=sample_size, replace=False))])
+    centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _assign(sample, centroids)
+        order = np.argsort(assignment, kind="stable")
+        used, starts = np.unique(assignment[order], return_index=True)
+        sums = np.add.reduceat(sample[order], starts, axis=0)
+        centroids[used] = normalize_rows(sums)
+        empty = np.setdiff1d(np.arange(len(centroids)), used)
+        if len(empty): # Reseed empty lists with random vectors
+            centroids[empty] = sample[rng.choice(sample_size, size=len(empty), replace=False)]
+    return centroids
+
+
+class VectorIndex:
+    """
+    A persistent vector index in directory `path` (see the module comments). Created
+    on first use if the directory has no index yet.
+    """
+
+    def __init__(self, path: str, dim: Optional[int] = None, nlist: Optional[int] = None, nprobe: int = 16,
+                 ivf_min_vectors: int = 50_000, max_unpartitioned: int = 20_000, retrain_growth: float = 2.0):
+        """
+        :param dim: Vector dimension; required to create an index, checked when opening one.
+        :param nlist: IVF lists; defaults to ~sqrt(count) when the lists are (re)trained.
+        :param nprobe: IVF lists scanned per query. More lists, better recall, slower searches.
+        :param ivf_min_vectors: Indexes smaller than this are searched flat (exactly).
+        :param max_unpartitioned: Vectors added after the lists were built that are
+                                  searched flat before they are sorted into the lists.
+        :param retrain_growth: k-means is retrained when the index has grown this many
+                               times since it was last trained.
+        """
+        self.path = path
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_min_vectors = ivf_min_vectors
+        self.max_unpartitioned = max_unpartitioned
+        self.retrain_growth = retrain_growth
+        self._write_lock = threading.Lock()
+        self._arrays: Dict[str, np.ndarray] = {}
+
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+            if self.meta.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported vector index version {self.meta.get('version')} at {path}")
+            if dim is not None and dim != self.meta["dim"]:
+                raise ValueError(f"The vector index at {path} has dimension {self.meta['dim']}, not {dim}.")
+        else:
+            if dim is None:
+                raise ValueError(f"No vector index at {path}; a dimension is needed to create one.")
+            os.makedirs(path, exist_ok=True)
+            self.meta = {"version": FORMAT_VERSION, "dim": dim, "count": 0, "generation": 0,
+                         "partitioned": 0, "nlist": 0, "trained_count": 0, "payload_bytes": 0}
+            self._write_meta()
+
+    @property
+    def dim(self) -> int:
+        return self.meta["dim"]
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    # Files
+
+    def _file(self, name: str, generation: Optional[int] = None) -> str:
+        generation = self.meta["generation"] if generation is None else generation
+        stem, extension = name.split(".")
+        return os.path.join(self.path, f"{stem}.{generation}.{extension}")
+
+    def _write_meta(self):
+        temp_path = os.path.join(self.path, f"{META_FILE}.part")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(temp_path, os.path.join(self.path, META_FILE))
+
+    def _array(self, name: str, meta: Dict[str, Any]) -> np.ndarray:
+        """
+        The vectors ("vectors") or ids ("ids") of the generation in `meta` (a snapshot of
+        `self.meta`), memory-mapped, `count` rows.
+        """
+        key = (name, meta["generation"], meta["count"])
+        values = self._arrays.get(key)
+        if values is None:
+            dtype, shape = (np.float32, (meta["count"], meta["dim"])) if name == "vectors" else (np.int64, (meta["count"],))
+            if meta["count"] == 0:
+                values = np.empty(shape, dtype=dtype)
+            else:
+                values = np.memmap(self._file(f"{name}.{'f32' if name == 'vectors' else 'i64'}", meta["generation"]),
+                                   dtype=dtype, mode="r", shape=shape)
+            self._arrays = {key: values, **{k: v for k, v in self._arrays.items() if k[0] != name}}
+        return values
+
+    def _ivf(self, meta: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """(centroids, list_offsets) of the generation in `meta`."""
+        generation = meta["generation"]
+        key = ("ivf", generation)
+        values = self._arrays.get(key)
+        if values is None:
+            values = (np.load(self._file("centroids.npy", generation)), np.load(self._file("list_offsets.npy", generation)))
+            self._arrays[key] = values
+        return values
+
+    # Writes
+
+    def add(self, vectors: np.ndarray, payloads: Optional[Sequence[Any]] = None) -> np.ndarray:
+        """
+        Appends vectors (n x dim; normalized here) with an optional JSON-serializable
+        payload each, and sorts them into the IVF lists if that is due.
+        :return: The ids assigned to the vectors.
+        """
+        vectors = normalize_rows(vectors)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}.")
+        if payloads is not None and len(payloads) != len(vectors):
+            raise ValueError(f"Got {len(payloads)} payloads for {len(vectors)} vectors.")
+        if len(vectors) == 0:
+            return np.empty(0, dtype=np.int64)
+        with self._write_lock:
+            count = self.meta["count"]
+            ids = np.arange(count, count + len(vectors), dtype=np.int64)
+            encoded = [(json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+                       for payload in (payloads if payloads is not None else [None] * len(vectors))]
+            offsets = self.meta["payload_bytes"] + np.cumsum([0] + [len(line) for line in encoded[:-1]], dtype=np.int64)
+
+            self._append(self._file("vectors.f32"), count * self.dim * 4, vectors.tobytes())
+            self._append(self._file("ids.i64"), count * 8, ids.tobytes())
+            self._append(os.path.join(self.path, PAYLOAD_OFFSETS_FILE), count * 8, offsets.tobytes())
+            self._append(os.path.join(self.path, PAYLOADS_FILE), self.meta["payload_bytes"], b"".join(encoded))
+            self.meta = dict(self.meta, count=count + len(vectors),
+                             payload_bytes=self.meta["payload_bytes"] + sum(len(line) for line in encoded))
+            self._write_meta()
+
+            unpartitioned = self.meta["count"] - self.meta["partitioned"]
+            if self.meta["count"] >= self.ivf_min_vectors and (not self.meta["partitioned"] or unpartitioned > self.max_unpartitioned):
+                self._partition(retrain=self.meta["count"] >= self.retrain_growth * self.meta["trained_count"])
+        return ids
+
+    @staticmethod
+    def _append(file_path: str, committed_size: int, data: bytes):
+        """Appends `data` after the first `committed_size` bytes of a file (dropping any uncommitted rest)."""
+        with open(file_path, "ab") as f:
+            if f.tell() != committed_size:
+                f.truncate(committed_size)
+                f.seek(committed_size)
+            f.write(data)
+
+    def build_ivf(self, nlist: Optional[int] = None):
+        """(Re)trains the IVF lists on all vectors now in the index and rewrites it in list order."""
+        with self._write_lock:
+            if nlist is not None:
+                self.nlist = nlist
+            self._partition(retrain=True)
+
+    def _partition(self, retrain: bool):
+        meta = self.meta
+        count, generation = meta["count"], meta["generation"]
+        vectors, ids = self._array("vectors", meta), self._array("ids", meta)
+        if retrain or not meta["partitioned"]:
+            nlist = min(self.nlist or default_nlist(count), count)
+            logger.info(f"Training {nlist} IVF lists on {count} vectors at {self.path}")
+            centroids = spherical_kmeans(vectors, nlist)
+            assignment = _assign(vectors, centroids)
+            trained_count = count
+        else:
+            centroids, list_offsets = self._ivf(meta)
+            nlist, trained_count = meta["nlist"], meta["trained_count"]
+            # Partitioned positions keep their list; only the tail is assigned
+            assignment = np.concatenate((np.repeat(np.arange(nlist), np.diff(list_offsets)),
+                                         _assign(vectors[meta["partitioned"]:], centroids)))
+        order = np.argsort(assignment, kind="stable")
+        list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=nlist)))).astype(np.int64)
+
+        new_generation = generation + 1
+        with open(self._file("vectors.f32", new_generation), "wb") as vector_file, \
+                open(self._file("ids.i64", new_generation), "wb") as id_file:
+            for start in range(0, count, FLAT_BLOCK_ROWS):
+                positions = order[start:start + FLAT_BLOCK_ROWS]
+                vector_file.write(np.asarray(vectors[positions]).tobytes())
+                id_file.write(np.asarray(ids[positions]).tobytes())
+        np.save(self._file("centroids.npy", new_generation), centroids)
+        np.save(self._file("list_offsets.npy", new_generation), list_offsets)
+        self.meta = dict(meta, generation=new_generation, partitioned=count, nlist=nlist, trained_count=trained_count)
+        self._write_meta()
+        self._arrays = {}
+        for name in ("vectors.f32", "ids.i64", "centroids.npy", "list_offsets.npy"):
+            try:
+                os.remove(self._file(name, generation))
+            except FileNotFoundError:
+                pass
+
+    # Reads
+
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The k nearest vectors (by cosine similarity) of each query.
+        :param queries: One query vector or a batch (m x dim); normalized here.
+        :param nprobe: IVF lists scanned per query; defaults to the index's.
+        :return: (scores, ids), both m x k and best first. Missing results (fewer than k
+                 vectors) have score -inf and id -1.
+        """
+        queries = normalize_rows(queries)
+        while True:
+            meta = self.meta # Snapshot: vectors added during the search are not seen
+            try:
+                return self._search(queries, k, nprobe or self.nprobe, meta)
+            except FileNotFoundError:
+                # A concurrent `_partition` removed the snapshot's generation before it was
+                # opened; search the new one
+                if self.meta["generation"] == meta["generation"]:
+                    raise
+
+    def _search(self, queries: np.ndarray, k: int, nprobe: int, meta: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        # Every file read comes from the snapshot's generation, so vectors, ids and lists match
+        vectors, ids = self._array("vectors", meta), self._array("ids", meta)
+        best = _TopK(len(queries), k)
+        if meta["partitioned"]:
+            self._search_lists(queries, vectors, best, nprobe, meta)
+        for start in range(meta["partitioned"], meta["count"], FLAT_BLOCK_ROWS):
+            block = vectors[start:start + FLAT_BLOCK_ROWS]
+            best.update(slice(None), queries @ block.T, np.arange(start, start + len(block)))
+        scores, positions = best.result()
+        return scores, np.where(positions >= 0, ids[np.maximum(positions, 0)] if len(ids) else -1, -1)
+
+    def _search_lists(self, queries: np.ndarray, vectors: np.ndarray, best: _TopK, nprobe: int,
+                      meta: Dict[str, Any]):
+        centroids, list_offsets = self._ivf(meta)
+        nprobe = min(nprobe, len(centroids))
+        probed = np.argpartition(-(queries @ centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        # Each probed list is read once, for all the queries that probe it
+        lists, query_rows = probed.ravel(), np.repeat(np.arange(len(queries)), nprobe)
+        order = np.argsort(lists, kind="stable")
+        distinct, starts = np.unique(lists[order], return_index=True)
+        for list_id, rows in zip(distinct, np.split(query_rows[order], starts[1:])):
+            start, end = list_offsets[list_id], list_offsets[list_id + 1]
+            if start < end:
+                best.update(rows, queries[rows] @ vectors[start:end].T, np.arange(start, end))
+
+    def payloads(self, ids: Iterable[int]) -> List[Any]:
+        """The payloads stored with the given ids (None for ids that have none)."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        offsets = np.memmap(os.path.join(self.path, PAYLOAD_OFFSETS_FILE), dtype=np.int64, mode="r", shape=(len(self),))
+        results = []
+        with open(os.path.join(self.path, PAYLOADS_FILE), "rb") as f:
+            for i in ids:
+                if not 0 <= i < len(self):
+                    raise IndexError(f"No vector with id {i} in the index at {self.path}")
+                f.seek(int(offsets[i]))
+                results.append(json.loads(f.readline()))
+        return results
@@ -0,0 +1,152 @@
+# Utilidades vectorizadas para validación por lotes (NumPy)
+
+# Validators evaluate their rules over whole columns of stored records at once (see
+# `BaseValidator.validate_batch`). Columns are 1-D NumPy arrays, one per field, built
+# from the records' extracted data; a pandas DataFrame with those columns works too.
+# Missing values must be None (not NaN), as in the scalar path's `data.get(...)`.
+#
+# The helpers below turn raw object columns into typed arrays (datetime64, float64,
+# lengths) so each rule becomes one NumPy expression. Date strings are parsed once per
+# distinct value with the scalar date engine, so both paths agree exactly.
+
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+
+import numpy as np
+
+NOT_A_DATE = np.datetime64("NaT", "D")
+
+
+def object_column(values: Iterable[Any], count: int = -1) -> np.ndarray:
+    """1-D object array of `values`, even when they are lists or dicts."""
+    return np.fromiter(values, dtype=object, count=count)
+
+
+def columns_from_records(records: Iterable[Mapping[str, Any]], defaults: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Builds one object column per field in `defaults` from dict records (e.g. decoded
+    `extracted_data.data_json`). A field missing from a record takes its default, as
+    `record.get(field, default)` would.
+    """
+    records = list(records)
+    return {
+        field: object_column((record.get(field, default) for record in records), len(records))
+        for field, default in defaults.items()
+    }
+
+
+def column(columns: Any, name: str) -> np.ndarray:
+    """The column `name` of a dict of arrays or a DataFrame, as a NumPy array."""
+    return np.asarray(columns[name], dtype=object)
+
+
+def is_not_none(values: np.ndarray) -> np.ndarray:
+    return np.not_equal(values, None)
+
+
+def truthy(values: np.ndarray) -> np.ndarray:
+    """bool(value) for every element."""
+    return values.astype(bool)
+
+
+def _as_text(values: np.ndarray) -> np.ndarray:
+    try:
+        return values.astype(str)
+    except ValueError: # Elements such as lists cannot be cast directly
+        return np.array([str(value) for value in values], dtype=str)
+
+
+def parse_dates(values: np.ndarray, parser: Callable[[str], Optional[date]],
+                dash_to_slash: bool = False) -> np.ndarray:
+    """
+    Parses a column of date strings into datetime64[D], with NaT where `parser` returns
+    None (or the value is None/empty). Each distinct string is parsed once.
+    :param parser: Scalar parser, e.g. `date_utils.parse_day_month_year`.
+    :param dash_to_slash: Replace "-" with "/" before parsing, as validators do for DD-MM-YYYY.
+    """
+    if len(values) == 0:
+        return np.empty(0, dtype="datetime64[D]")
+    text = _as_text(values)
+    text[~truthy(values)] = "" # None and empty strings are never valid dates
+    distinct, inverse = np.unique(text, return_inverse=True)
+    candidates = np.char.replace(distinct, "-", "/") if dash_to_slash else distinct
+    parsed = np.array([parser(str(candidate)) if candidate else None for candidate in candidates], dtype=object)
+    distinct_dates = np.array([np.datetime64(d, "D") if d is not None else NOT_A_DATE for d in parsed],
+                              dtype="datetime64[D]")
+    return distinct_dates[inverse.reshape(-1)]
+
+
+def parse_day_month_year_column(values: np.ndarray, dash_to_slash: bool = False) -> np.ndarray:
+    """
+    Vectorized `date_utils.parse_day_month_year` over a column, to datetime64[D] with NaT
+    where it returns None. Values in the common fixed "DD/MM/YYYY" shape are decoded
+    straight from their code points; any other value goes through `parse_dates`.
+    :param dash_to_slash: Also accept "-" separators, as validators do for DD-MM-YYYY.
+    """
+    from document_processor.utils.date_utils import parse_day_month_year
+
+    result = np.full(len(values), NOT_A_DATE, dtype="datetime64[D]")
+    if len(values) == 0:
+        return result
+    text = _as_text(values)
+    present = truthy(values)
+    if text.dtype.itemsize // 4 >= 10:
+        chars = text.view(np.uint32).reshape(len(text), -1)[:, :10].astype(np.int64)
+        digits = chars - ord("0")
+        digit_positions = [0, 1, 3, 4, 6, 7, 8, 9]
+        separators = (ord("/"), ord("-")) if dash_to_slash else (ord("/"),)
+        fixed = present & (np.char.str_len(text) == 10)
+        fixed &= np.all((digits[:, digit_positions] >= 0) & (digits[:, digit_positions] <= 9), axis=1)
+        fixed &= np.isin(chars[:, 2], separators) & np.isin(chars[:, 5], separators)
+
+        day = digits[:, 0] * 10 + digits[:, 1]
+        month = digits[:, 3] * 10 + digits[:, 4]
+        year = digits[:, 6] * 1000 + digits[:, 7] * 100 + digits[:, 8] * 10 + digits[:, 9]
+        plausible = fixed & (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+        month_start = np.where(plausible, (year - 1970) * 12 + month - 1, 0).astype("datetime64[M]")
+        first_day = month_start.astype("datetime64[D]")
+        days_in_month = ((month_start + 1).astype("datetime64[D]") - first_day).astype(np.int64)
+        valid = plausible & (day <= days_in_month)
+        result[valid] = first_day[valid] + (day[valid] - 1)
+        rest = present & ~fixed
+    else:
+        rest = present
+    if rest.any():
+        result[rest] = parse_dates(values[rest], parse_day_month_year, dash_to_slash=dash_to_slash)
+    return result
+
+
+def as_float(values: np.ndarray) -> np.ndarray:
+    """
+    float(value) for every element, with NaN where the value is None or float() fails.
+    Comparisons against NaN are False, matching a scalar rule that returns False on error.
+    """
+    present = is_not_none(values)
+    result = np.full(len(values), np.nan)
+    try:
+        result[present] = values[present].astype(float)
+    except (ValueError, TypeError):
+        for index in np.flatnonzero(present):
+            try:
+                result[index] = float(values[index])
+            except (ValueError, TypeError):
+                pass
+    return result
+
+
+def text_lengths(values: np.ndarray) -> np.ndarray:
+    """
+    len(value) for every element (strings, lists, ...), -1 for None or values without a
+    length. Strings are measured in one NumPy call, anything else with len() itself: a
+    list title counts its items, as in the scalar path, not the characters of its str().
+    """
+    lengths = np.full(len(values), -1)
+    strings = np.fromiter((isinstance(value, str) for value in values), dtype=bool, count=len(values))
+    if strings.any():
+        lengths[strings] = np.char.str_len(values[strings].astype(str))
+    for index in np.flatnonzero(~strings & is_not_none(values)):
+        try:
+            lengths[index] = len(values[index])
+        except TypeError:
+            pass
+    return lengths
@@ -0,0 +1,48 @@
+# Huellas de versión de clasificador, extractores y validadores
+
+# A version fingerprint identifies the logic that produced a stage's output. It is
+# stored with every document's results, so that after a deploy only the documents
+# whose stages actually changed are processed again (see rerun_planner.py).
+#
+# Fingerprints are derived from source code: a class's fingerprint changes whenever
+# the source of a module defining it or one of its base classes changes (rule sets
+# defined in those modules included), or when its explicit `version` is bumped. The
+# explicit version is for changes the source hash cannot see, e.g. in a shared helper.
+
+from functools import lru_cache
+from typing import Any
+import hashlib
+import inspect
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_LENGTH = 16 # Hex characters kept from the SHA-256
+
+
+def fingerprint(*parts: Any) -> str:
+    """Short, stable hash of `parts` (through their repr)."""
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:FINGERPRINT_LENGTH]
+
+
+@lru_cache(maxsize=None)
+def module_source_fingerprint(module_name: str) -> str:
+    """Hash of a module's source code, computed once per process."""
+    try:
+        source = inspect.getsource(sys.modules[module_name])
+    except (KeyError, OSError, TypeError) as e:
+        # E.g. a module shipped without sources: only an explicit version bump is seen
+        logger.warning(f"No source available to fingerprint module {module_name}: {e}")
+        source = None
+    return fingerprint(module_name, source)
+
+
+def class_fingerprint(cls: type, *extra: Any) -> str:
+    """
+    Fingerprint of a class: the sources of the modules of the class and its bases
+    (builtins excluded), its `version` attribute, if any, and `extra`.
+    """
+    modules = sorted({klass.__module__ for klass in cls.__mro__ if klass.__module__ not in ("builtins", "abc")})
+    return fingerprint(cls.__qualname__, getattr(cls, "version", None),
+                       [module_source_fingerprint(module) for module in modules], extra)
@@ -1,7 +1,14 @@
-from base.base_validator import BaseValidator
-from datetime import datetime
+from document_processor.base.base_validator import BaseValidator
+from datetime import date
+from document_processor.utils.date_utils import parse_day_month_year
+from document_processor.utils import vector_utils as vu
+import numpy as np
+
+FECHA_LIMITE = date(2026, 6, 30) # Example validation: date should be before June 30, 2026
 
 class CertificadoFinalValidator(BaseValidator):
+    batch_fields = {"firmas": False, "fecha": None, "observaciones": False}
+
     def validate(self) -> dict:
         results = {
             "firmas_presentes": self.data.get("firmas", False),
@@ -14,9 +21,20 @@ class CertificadoFinalValidator(BaseValidator):
     def _validar_fecha(self, fecha_str):
         if not fecha_str:
             return False
-        try:
-            fecha = datetime.strptime(fecha_str, "%d/%m/%Y")
-            # Example validation: date should be before June 30, 2026
-            return fecha < datetime(2026, 6, 30)
-        except ValueError:
+        fecha = parse_day_month_year(fecha_str)
+        if fecha is None:
             return False
+        return fecha < FECHA_LIMITE
+
+    @classmethod
+    def validate_batch(cls, columns) -> dict:
+        """Vectorized `validate` over columns of records (see `BaseValidator.validate_batch`)."""
+        firmas = vu.column(columns, "firmas")
+        fechas = vu.parse_day_month_year_column(vu.column(columns, "fecha"))
+        results = {
+            "firmas_presentes": firmas,
+            "fecha_valida": ~np.isnat(fechas) & (fechas < np.datetime64(FECHA_LIMITE, "D")),
+            "tiene_observaciones": vu.column(columns, "observaciones"),
+        }
+        results["valido"] = vu.truthy(firmas) & results["fecha_valida"]
+        return results
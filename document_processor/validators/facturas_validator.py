@@ -1,7 +1,12 @@
-from base.base_validator import BaseValidator
-from datetime import datetime
+from document_processor.base.base_validator import BaseValidator
+from datetime import date
+from document_processor.utils.date_utils import parse_day_month_year
+from document_processor.utils import vector_utils as vu
+import numpy as np
 
 class FacturaValidator(BaseValidator):
+    batch_fields = {"numero_factura": None, "fecha_emision": None, "total_factura": None}
+
     def validate(self) -> dict:
         """
         Validates extracted data for invoices (facturas).
@@ -29,13 +34,12 @@ class FacturaValidator(BaseValidator):
     def _validar_fecha_emision(self, fecha_str: str) -> bool:
         if not fecha_str:
             return False
-        try:
-            # Assuming date format DD/MM/YYYY or DD-MM-YYYY from extractor
-            fecha = datetime.strptime(fecha_str.replace('-', '/'), "%d/%m/%Y")
-            # Example rule: invoice date cannot be in the future
-            return fecha <= datetime.now()
-        except ValueError:
+        # Assuming date format DD/MM/YYYY or DD-MM-YYYY from extractor
+        fecha = parse_day_month_year(fecha_str.replace('-', '/'))
+        if fecha is None:
             return False
+        # Example rule: invoice date cannot be in the future
+        return fecha <= date.today()
 
     def _validar_total(self, total_value) -> bool:
         if total_value is None: # Can be 0, but not None if extraction failed
@@ -47,6 +51,18 @@ class FacturaValidator(BaseValidator):
         except (ValueError, TypeError):
             return False
 
+    @classmethod
+    def validate_batch(cls, columns) -> dict:
+        """Vectorized `validate` over columns of records (see `BaseValidator.validate_batch`)."""
+        fechas = vu.parse_day_month_year_column(vu.column(columns, "fecha_emision"), dash_to_slash=True)
+        results = {
+            "numero_factura_presente": vu.is_not_none(vu.column(columns, "numero_factura")),
+            "fecha_emision_valida": ~np.isnat(fechas) & (fechas <= np.datetime64(date.today(), "D")),
+            "total_factura_valido": vu.as_float(vu.column(columns, "total_factura")) >= 0,
+        }
+        results["valido"] = results["numero_factura_presente"] & results["fecha_emision_valida"] & results["total_factura_valido"]
+        return results
+
 if __name__ == '__main__':
     # Valid data
     valid_invoice_data = {
@@ -97,3 +113,10 @@ if __name__ == '__main__':
     print("\nValidation for Invalid Invoice Data (Negative Total):")
     for key, value in result_invalid_neg_total.items():
         print(f"- {key}: {value}")
+
+    # Batch validation over many stored invoices vs one validate() per invoice
+    from document_processor.base.base_validator import compare_batch_with_scalar
+    sample = [valid_invoice_data, invalid_invoice_data_date, invalid_invoice_data_total, invalid_invoice_data_neg_total]
+    timings = compare_batch_with_scalar(FacturaValidator, [dict(sample[i % 4], fecha_emision=f"{i % 28 + 1:02d}/{i % 12 + 1:02d}/20{i % 30:02d}") for i in range(100_000)])
+    print(f"\nBatch validation of 100000 invoices: scalar {timings['scalar']:.3f}s, batch {timings['batch']:.3f}s "
+          f"({timings['speedup']:.1f}x, {timings['speedup_with_columns']:.1f}x including column build)")
@@ -1,7 +1,12 @@
-from base.base_validator import BaseValidator
+from document_processor.base.base_validator import BaseValidator
 from datetime import datetime
+from document_processor.utils.date_utils import parse_day_month_year
+from document_processor.utils import vector_utils as vu
+import numpy as np
 
 class MemoriaActuacionValidator(BaseValidator):
+    batch_fields = {"titulo_proyecto": None, "fecha_elaboracion": None, "resumen": None}
+
     def validate(self) -> dict:
         """
         Validates extracted data for "Memoria de Actuación" documents.
@@ -29,14 +34,27 @@ class MemoriaActuacionValidator(BaseValidator):
     def _validar_fecha_elaboracion(self, fecha_str: str) -> bool:
         if not fecha_str:
             return False
-        try:
-            # Assuming date format DD/MM/YYYY or DD-MM-YYYY from extractor
-            fecha = datetime.strptime(fecha_str.replace('-', '/'), "%d/%m/%Y")
-            # Example rule: date cannot be too far in the past or in the future
-            # For instance, not older than 5 years and not more than 1 year in the future.
-            return (datetime.now().year - 5) <= fecha.year <= (datetime.now().year + 1)
-        except ValueError:
+        # Assuming date format DD/MM/YYYY or DD-MM-YYYY from extractor
+        fecha = parse_day_month_year(fecha_str.replace('-', '/'))
+        if fecha is None:
             return False
+        # Example rule: date cannot be too far in the past or in the future
+        # For instance, not older than 5 years and not more than 1 year in the future.
+        return (datetime.now().year - 5) <= fecha.year <= (datetime.now().year + 1)
+
+    @classmethod
+    def validate_batch(cls, columns) -> dict:
+        """Vectorized `validate` over columns of records (see `BaseValidator.validate_batch`)."""
+        fechas = vu.parse_day_month_year_column(vu.column(columns, "fecha_elaboracion"), dash_to_slash=True)
+        years = fechas.astype("datetime64[Y]").astype(int) + 1970 # NaT becomes a huge negative year
+        current_year = datetime.now().year
+        results = {
+            "titulo_presente": vu.text_lengths(vu.column(columns, "titulo_proyecto")) > 5,
+            "fecha_elaboracion_valida": ~np.isnat(fechas) & (years >= current_year - 5) & (years <= current_year + 1),
+            "resumen_presente": vu.text_lengths(vu.column(columns, "resumen")) > 20,
+        }
+        results["valido"] = results["titulo_presente"] & results["fecha_elaboracion_valida"] & results["resumen_presente"]
+        return results
 
 if __name__ == '__main__':
     # Valid data
@@ -0,0 +1,136 @@
+# Workers que consumen la cola de procesamiento en segundo plano
+
+# `QueueWorkerPool` runs a fixed number of threads that claim jobs from the
+# SQLite-backed queue (db/job_queue.py), run `DocumentProcessingPipeline` on them,
+# report each stage back to the queue as live progress, and store the results.
+# The API only enqueues, so upload latency does not depend on OCR time.
+#
+# Pipelines run with checkpoints (db/checkpoints.py): a job that ends in an extraction
+# or validation error is requeued up to QUEUE_MAX_ATTEMPTS times, and a retried job
+# (also one whose worker died) resumes after its last completed stage instead of
+# repeating the OCR. Jobs whose pipeline raises are retried the same way.
+#
+# While a job runs, a heartbeat renews its lease every QUEUE_HEARTBEAT_SECONDS, so a
+# stage longer than the lease (a large OCR job) is not reclaimed by another worker.
+
+from document_processor.config import (
+    QUEUE_HEARTBEAT_SECONDS, QUEUE_MAX_ATTEMPTS, QUEUE_WORKERS, QUEUE_POLL_INTERVAL_SECONDS,
+)
+from document_processor.db.checkpoints import delete_checkpoint
+from document_processor.db.insert import store_document_data
+from document_processor.db import job_queue
+from document_processor.pipeline import DocumentProcessingPipeline
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Final pipeline statuses worth another attempt: the stage raised, possibly transiently
+RETRYABLE_STATUSES = {"error_extraction", "error_validation"}
+
+
+def _default_pipeline_factory(job: dict, on_status_change: Callable[[str, str], None]) -> DocumentProcessingPipeline:
+    return DocumentProcessingPipeline(
+        document_path=job["document_path"],
+        file_name=job["file_name"],
+        file_type=job["file_type"],
+        document_id=job["id"],
+        on_status_change=on_status_change,
+        content_sha256=job.get("content_sha256"),
+        checkpoints=True,
+    )
+
+
+class QueueWorkerPool:
+    def __init__(self, num_workers: int = QUEUE_WORKERS, poll_interval: float = QUEUE_POLL_INTERVAL_SECONDS,
+                 pipeline_factory: Optional[Callable[..., DocumentProcessingPipeline]] = None,
+                 heartbeat_interval: float = QUEUE_HEARTBEAT_SECONDS):
+        """
+        :param num_workers: Number of worker threads.
+        :param poll_interval: Seconds an idle worker waits before checking the queue again.
+        :param pipeline_factory: Builds the pipeline for a job row; mainly for tests.
+        :param heartbeat_interval: Seconds between lease renewals of a running job.
+        """
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.pipeline_factory = pipeline_factory or _default_pipeline_factory
+        self._stop = threading.Event()
+        self._work_available = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Starts the worker threads. Jobs left over from a previous run are picked up too."""
+        self._stop.clear()
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"queue-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.num_workers} queue worker(s).")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Asks workers to exit after their current job and waits for them."""
+        self._stop.set()
+        self._work_available.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wakes idle workers, e.g. right after a job was enqueued."""
+        self._work_available.set()
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            job = job_queue.claim_next_job()
+            if job is None:
+                self._work_available.wait(self.poll_interval)
+                self._work_available.clear()
+                continue
+            self.process_job(job)
+
+    @contextmanager
+    def _heartbeat(self, document_id: str) -> Iterator[None]:
+        """Renews the job's lease in a background thread while the enclosed block runs."""
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(self.heartbeat_interval):
+                job_queue.renew_lease(document_id)
+
+        thread = threading.Thread(target=beat, name=f"heartbeat-{document_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def process_job(self, job: dict):
+        """Runs the pipeline for one claimed job and records the outcome in the queue."""
+        document_id = job["id"]
+        try:
+            pipeline = self.pipeline_factory(job, job_queue.update_job_stage)
+            with self._heartbeat(document_id):
+                result = pipeline.run()
+            status = result.metadata.processing_status
+            if status in RETRYABLE_STATUSES and job["attempts"] < QUEUE_MAX_ATTEMPTS:
+                job_queue.requeue_job(document_id, result.metadata.error_message)
+                logger.warning(f"Job {document_id} ended with {status} (attempt {job['attempts']}); requeued.")
+                return
+            processed = result.model_dump(mode="json")
+            if not store_document_data(processed):
+                raise RuntimeError("Results could not be stored.")
+            delete_checkpoint(document_id)
+            job_queue.complete_job(document_id, status)
+            logger.info(f"Job {document_id} done with status {status}.")
+        except Exception as e:
+            if job["attempts"] < QUEUE_MAX_ATTEMPTS:
+                logger.warning(f"Job {document_id} failed (attempt {job['attempts']}): {e}; requeued.", exc_info=True)
+                job_queue.requeue_job(document_id, str(e))
+                return
+            logger.error(f"Job {document_id} failed: {e}", exc_info=True)
+            delete_checkpoint(document_id) # No retry will resume from it
+            job_queue.fail_job(document_id, str(e))
@@ -0,0 +1,115 @@
+# Local stand-in for the Textract async text detection API, for tests.
+# It speaks the same JSON-over-HTTP protocol as the real service, so a regular
+# boto3 client pointed at `endpoint_url` can be used against it.
+
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTextractServer:
+    def __init__(self, documents, polls_until_done=2, page_size=2, failing_keys=(), throttle_first_starts=0):
+        """
+        :param documents: Mapping of S3 key -> list of text lines in that document.
+        :param polls_until_done: GetDocumentTextDetection calls that report IN_PROGRESS before a job finishes.
+        :param page_size: Blocks returned per result page (drives NextToken pagination).
+        :param failing_keys: Keys whose jobs finish with JobStatus FAILED.
+        :param throttle_first_starts: Number of initial StartDocumentTextDetection calls rejected with ThrottlingException.
+        """
+        self.documents = documents
+        self.polls_until_done = polls_until_done
+        self.page_size = page_size
+        self.failing_keys = set(failing_keys)
+        self.throttles_left = throttle_first_starts
+        self.jobs = {}
+        self.calls = {"StartDocumentTextDetection": 0, "GetDocumentTextDetection": 0}
+        self.max_concurrent_requests = 0
+        self._active_requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def endpoint_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _blocks_for(self, key):
+        blocks = [{"BlockType": "PAGE", "Id": f"{key}-page-1", "Page": 1}]
+        for i, line in enumerate(self.documents[key]):
+            blocks.append({"BlockType": "LINE", "Id": f"{key}-line-{i}", "Text": line, "Page": 1, "Confidence": 99.0})
+        return blocks
+
+    def _start(self, body):
+        with self._lock:
+            if self.throttles_left > 0:
+                self.throttles_left -= 1
+                return 400, {"__type": "ThrottlingException", "message": "Rate exceeded"}
+            key = body["DocumentLocation"]["S3Object"]["Name"]
+            if key not in self.documents:
+                return 400, {"__type": "InvalidS3ObjectException", "message": f"Unable to get object {key}"}
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {"key": key, "polls": 0}
+            return 200, {"JobId": job_id}
+
+    def _get(self, body):
+        with self._lock:
+            job = self.jobs.get(body.get("JobId"))
+            if job is None:
+                return 400, {"__type": "InvalidJobIdException", "message": "Unknown job"}
+            if "NextToken" not in body:
+                job["polls"] += 1
+            if job["polls"] <= self.polls_until_done:
+                return 200, {"JobStatus": "IN_PROGRESS"}
+            if job["key"] in self.failing_keys:
+                return 200, {"JobStatus": "FAILED", "StatusMessage": "Unsupported document"}
+            blocks = self._blocks_for(job["key"])
+        start = int(body.get("NextToken", 0))
+        end = start + self.page_size
+        response = {"JobStatus": "SUCCEEDED", "DocumentMetadata": {"Pages": 1}, "Blocks": blocks[start:end]}
+        if end < len(blocks):
+            response["NextToken"] = str(end)
+        return 200, response
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                with server._lock:
+                    server._active_requests += 1
+                    server.max_concurrent_requests = max(server.max_concurrent_requests, server._active_requests)
+                try:
+                    operation = self.headers.get("X-Amz-Target", "").split(".")[-1]
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                    with server._lock:
+                        server.calls[operation] = server.calls.get(operation, 0) + 1
+                    if operation == "StartDocumentTextDetection":
+                        status, payload = server._start(body)
+                    elif operation == "GetDocumentTextDetection":
+                        status, payload = server._get(body)
+                    else:
+                        status, payload = 400, {"__type": "UnknownOperationException", "message": operation}
+                    data = json.dumps(payload).encode("utf-8")
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/x-amz-json-1.1")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                finally:
+                    with server._lock:
+                        server._active_requests -= 1
+
+            def log_message(self, format, *args): # Keep test output quiet
+                pass
+
+        return Handler
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+import unittest
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from aws_lib.async_textract import AsyncTextractClient, TextractJobError
+from tests.fake_textract_server import FakeTextractServer
+
+
+def make_boto3_client(endpoint_url):
+    return boto3.client(
+        "textract",
+        endpoint_url=endpoint_url,
+        region_name="us-east-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+        config=Config(retries={"total_max_attempts": 1}, max_pool_connections=64),
+    )
+
+
+class TestAsyncTextractClient(unittest.IsolatedAsyncioTestCase):
+
+    def start_server(self, **kwargs):
+        server = FakeTextractServer(**kwargs).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def make_client(self, server, **kwargs):
+        options = dict(s3_bucket_name="test-bucket", min_poll_interval=0.01, max_poll_interval=0.05)
+        options.update(kwargs)
+        return AsyncTextractClient(textract_client=make_boto3_client(server.endpoint_url), **options)
+
+    async def test_extract_pages_through_next_token(self):
+        lines = [f"Línea {i}" for i in range(7)]
+        server = self.start_server(documents={"doc.pdf": lines}, page_size=3)
+        async with self.make_client(server) as client:
+            result = await client.extract_document("doc.pdf")
+        self.assertEqual(result["text"], "\n".join(lines))
+        self.assertEqual(len(result["blocks"]), 8) # PAGE block + 7 LINE blocks
+
+    async def test_fan_out_shares_one_poller(self):
+        documents = {f"doc_{i}.pdf": [f"Factura {i}"] for i in range(50)}
+        server = self.start_server(documents=documents, polls_until_done=3)
+        async with self.make_client(server, max_concurrent_requests=8) as client:
+            texts = await client.extract_many(list(documents))
+        self.assertEqual(texts, [f"Factura {i}" for i in range(50)])
+        self.assertEqual(server.calls["StartDocumentTextDetection"], 50)
+        self.assertLessEqual(server.max_concurrent_requests, 8)
+
+    async def test_event_loop_stays_responsive_while_polling(self):
+        server = self.start_server(documents={"slow.pdf": ["texto"]}, polls_until_done=5)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker_task = asyncio.create_task(ticker())
+        async with self.make_client(server) as client:
+            self.assertEqual(await client.extract("slow.pdf"), "texto")
+        ticker_task.cancel()
+        self.assertGreater(ticks, 5)
+
+    async def test_failed_job_raises(self):
+        server = self.start_server(documents={"bad.pdf": ["x"]}, failing_keys={"bad.pdf"})
+        async with self.make_client(server) as client:
+            with self.assertRaises(TextractJobError):
+                await client.extract("bad.pdf")
+
+    async def test_throttled_start_is_retried(self):
+        server = self.start_server(documents={"doc.pdf": ["ok"]}, throttle_first_starts=2)
+        async with self.make_client(server) as client:
+            self.assertEqual(await client.extract("doc.pdf"), "ok")
+        self.assertEqual(server.calls["StartDocumentTextDetection"], 3)
+
+    async def test_unknown_document_raises_client_error(self):
+        server = self.start_server(documents={})
+        async with self.make_client(server) as client:
+            with self.assertRaises(ClientError):
+                await client.extract("missing.pdf")
+
+
+if __name__ == '__main__':
+    unittest.main()
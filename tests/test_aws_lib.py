@@ -8,7 +8,9 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from aws_lib.s3 import get_s3_client
+import hashlib
+import io
+from aws_lib.s3 import get_s3_client, upload_fileobj_multipart
 from aws_lib.textract import extract_text_from_document
 from textractor.data.text_linearization_config import TextLinearizationConfig
 
@@ -59,5 +61,36 @@ class TestAwsLib(unittest.TestCase):
         )
         self.assertEqual(extracted_text, expected_text)
 
+    def test_upload_fileobj_multipart_streams_parts_and_hashes(self):
+        """
+        Tests that the multipart upload sends one part per chunk and hashes the whole stream.
+        """
+        content = b"x" * 25
+        s3_client = MagicMock()
+        s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+        s3_client.upload_part.side_effect = lambda **kwargs: {"ETag": f"etag-{kwargs['PartNumber']}"}
+
+        sha256, size = upload_fileobj_multipart(io.BytesIO(content), "bucket", "key", chunk_size=10, s3_client=s3_client)
+
+        self.assertEqual((sha256, size), (hashlib.sha256(content).hexdigest(), 25))
+        self.assertEqual([len(c.kwargs["Body"]) for c in s3_client.upload_part.call_args_list], [10, 10, 5])
+        s3_client.complete_multipart_upload.assert_called_once_with(
+            Bucket="bucket", Key="key", UploadId="upload-1",
+            MultipartUpload={"Parts": [{"ETag": f"etag-{n}", "PartNumber": n} for n in (1, 2, 3)]}
+        )
+        s3_client.abort_multipart_upload.assert_not_called()
+
+    def test_upload_fileobj_multipart_aborts_on_failure(self):
+        """
+        Tests that a failed part aborts the multipart upload.
+        """
+        s3_client = MagicMock()
+        s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+        s3_client.upload_part.side_effect = RuntimeError("network down")
+
+        with self.assertRaises(RuntimeError):
+            upload_fileobj_multipart(io.BytesIO(b"data"), "bucket", "key", s3_client=s3_client)
+        s3_client.abort_multipart_upload.assert_called_once_with(Bucket="bucket", Key="key", UploadId="upload-1")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from aws_lib.ocr_cache import OCRCache, cache_key_for_bytes, cache_key_for_s3_object
+from aws_lib.textract import extract_text_from_document
+
+
+class TestOCRCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_hit_and_miss_counters(self):
+        cache = OCRCache(self.cache_dir)
+        self.assertIsNone(cache.get("missing"))
+        cache.put("doc", {"text": "Factura Nº 1"})
+        self.assertEqual(cache.get("doc"), {"text": "Factura Nº 1"})
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_lru_eviction_by_size(self):
+        entry = {"text": "x" * 100}
+        cache = OCRCache(self.cache_dir, max_bytes=250)
+        cache.put("a", entry)
+        cache.put("b", entry)
+        cache.get("a")  # "b" is now the least recently used entry
+        cache.put("c", entry)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertLessEqual(cache.stats()["size_bytes"], 250)
+
+    def test_entries_persist_across_instances(self):
+        OCRCache(self.cache_dir).put("doc", {"text": "persisted"})
+        reopened = OCRCache(self.cache_dir)
+        self.assertEqual(reopened.get("doc"), {"text": "persisted"})
+
+    def test_cache_keys_are_content_addressed(self):
+        self.assertEqual(cache_key_for_bytes(b"same"), cache_key_for_bytes(b"same"))
+        self.assertNotEqual(cache_key_for_bytes(b"same"), cache_key_for_bytes(b"other"))
+
+        s3_client = MagicMock()
+        s3_client.head_object.return_value = {"ETag": '"abc123"', "ContentLength": 42}
+        self.assertEqual(cache_key_for_s3_object("bucket", "a.pdf", s3_client), "etag-abc123-42")
+
+    @patch('aws_lib.textract.cache_key_for_s3_object', return_value="etag-abc123-42")
+    @patch('aws_lib.textract.Textractor')
+    def test_extract_text_from_document_uses_cache(self, MockTextractor, _mock_key):
+        mock_response = MagicMock()
+        mock_response.text = "OCR text"
+        MockTextractor.return_value.start_document_text_detection.return_value = mock_response
+        cache = OCRCache(self.cache_dir)
+
+        first = extract_text_from_document("bucket", "a.pdf", cache=cache)
+        second = extract_text_from_document("bucket", "a.pdf", cache=cache)
+
+        self.assertEqual(first, "OCR text")
+        self.assertEqual(second, "OCR text")
+        MockTextractor.return_value.start_document_text_detection.assert_called_once()
+        self.assertEqual(cache.stats()["hits"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
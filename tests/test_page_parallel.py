@@ -0,0 +1,160 @@
+import io
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    import pypdf
+except ImportError: # Page-parallel OCR is optional and needs pypdf
+    pypdf = None
+
+from aws_lib.async_textract import AsyncTextractClient
+from aws_lib import textract
+from aws_lib.page_parallel import count_pdf_pages, extract_pdf_by_page_ranges, merge_page_results, split_pdf
+from document_processor.utils.textract_utils import TextractClient
+from tests.fake_textract_server import FakeTextractServer
+from tests.test_async_textract import make_boto3_client
+
+
+def make_pdf(pages):
+    """A PDF whose page i (1-based) is 100 + i points wide, so parts can be told apart."""
+    writer = pypdf.PdfWriter()
+    for page in range(1, pages + 1):
+        writer.add_blank_page(width=100 + page, height=100)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def page_lines(document):
+    return [f"Página {int(page.mediabox.width) - 100}" for page in pypdf.PdfReader(io.BytesIO(document)).pages]
+
+
+class FakeS3:
+    """Uploaded page ranges become documents of the fake Textract server."""
+    def __init__(self, server):
+        self.server = server
+        self.deleted = []
+        self.stored = 0
+        self.max_stored = 0
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        self.server.documents[Key] = page_lines(Body)
+        with self._lock:
+            self.stored += 1
+            self.max_stored = max(self.max_stored, self.stored)
+
+    def delete_object(self, Bucket, Key):
+        with self._lock:
+            self.stored -= 1
+            self.deleted.append(Key)
+
+
+@unittest.skipIf(pypdf is None, "pypdf is not installed")
+class TestSplitAndMerge(unittest.TestCase):
+
+    def test_split_pdf_into_page_ranges(self):
+        parts = split_pdf(make_pdf(7), pages_per_part=3)
+        self.assertEqual([(p.first_page, p.last_page) for p in parts], [(1, 3), (4, 6), (7, 7)])
+        self.assertEqual(page_lines(parts[1].content), ["Página 4", "Página 5", "Página 6"])
+        self.assertEqual(count_pdf_pages(make_pdf(7)), 7)
+
+    def test_merge_renumbers_pages(self):
+        merged = merge_page_results([
+            (1, {"text": "a", "blocks": [{"Id": "x", "Page": 1}, {"Id": "y", "Page": 2}]}),
+            (3, {"text": "", "blocks": [{"Id": "z", "Page": 1}]}),
+            (4, {"text": "b", "blocks": [{"Id": "w"}]}),
+        ])
+        self.assertEqual(merged["text"], "a\nb")
+        self.assertEqual([(b["Id"], b["Page"]) for b in merged["blocks"]], [("x", 1), ("y", 2), ("z", 3), ("w", 4)])
+
+
+@unittest.skipIf(pypdf is None, "pypdf is not installed")
+class TestPageParallelJobs(unittest.IsolatedAsyncioTestCase):
+
+    async def test_page_ranges_run_concurrently_and_merge_in_page_order(self):
+        server = FakeTextractServer(documents={}, polls_until_done=1).start()
+        self.addCleanup(server.stop)
+        s3 = FakeS3(server)
+        async with AsyncTextractClient(textract_client=make_boto3_client(server.endpoint_url),
+                                       min_poll_interval=0.01, max_poll_interval=0.05) as client:
+            result = await extract_pdf_by_page_ranges(client, make_pdf(10), "bucket", "textract-input/memoria.pdf/", s3,
+                                                      pages_per_job=3, max_parallel_jobs=2)
+        self.assertEqual(result["text"], "\n".join(f"Página {i}" for i in range(1, 11)))
+        self.assertEqual([b["Page"] for b in result["blocks"] if b["BlockType"] == "PAGE"], [1, 4, 7, 10])
+        self.assertEqual(server.calls["StartDocumentTextDetection"], 4)
+        self.assertEqual(s3.max_stored, 2) # Never more than max_parallel_jobs ranges in flight
+        self.assertEqual(sorted(s3.deleted), sorted(server.documents))
+
+
+@unittest.skipIf(pypdf is None, "pypdf is not installed")
+class TestTextractClientPageParallel(unittest.TestCase):
+
+    class PageEchoClient(TextractClient):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.calls = []
+
+        def _detect_document_text_sync(self, document_bytes):
+            self.calls.append(threading.current_thread().name)
+            return "\n".join(page_lines(bytes(document_bytes)))
+
+    def test_large_pdf_is_split_and_merged_in_order(self):
+        client = self.PageEchoClient(page_parallel_threshold=5, pages_per_job=3, max_parallel_jobs=4)
+        self.assertEqual(client.extract_text_sync(make_pdf(10)), "\n".join(f"Página {i}" for i in range(1, 11)))
+        self.assertEqual(len(client.calls), 4)
+        self.assertTrue(all(name.startswith("ocr-pages") for name in client.calls))
+
+    def test_small_or_non_pdf_documents_are_sent_whole(self):
+        client = self.PageEchoClient(page_parallel_threshold=5, pages_per_job=3)
+        client.extract_text_sync(make_pdf(4))
+        self.assertEqual(len(client.calls), 1)
+        disabled = self.PageEchoClient(page_parallel_threshold=None)
+        disabled.extract_text_sync(make_pdf(10))
+        self.assertEqual(len(disabled.calls), 1)
+
+    def test_unreadable_pdf_falls_back_to_one_call(self):
+        client = TextractClient(page_parallel_threshold=1)
+        self.assertIsNotNone(client.extract_text_sync(b"%PDF-1.4 not really a pdf"))
+
+
+class RangedS3:
+    """Serves one S3 object, recording the Range of every get_object call (None: whole object)."""
+    def __init__(self, content):
+        self.content = content
+        self.ranges = []
+
+    def get_object(self, Bucket, Key, Range=None):
+        self.ranges.append(Range)
+        body = self.content
+        if Range:
+            start, end = map(int, Range[len("bytes="):].split("-"))
+            body = body[start:end + 1]
+        return {"Body": io.BytesIO(body)}
+
+
+@unittest.skipIf(pypdf is None, "pypdf is not installed")
+class TestDetectByPageRanges(unittest.TestCase):
+
+    def detect(self, s3):
+        with patch("aws_lib.textract.boto3.client", return_value=s3):
+            return textract._detect_by_page_ranges("bucket", "doc", "us-east-1", 5, 3, 2)
+
+    def test_non_pdf_documents_are_not_downloaded(self):
+        s3 = RangedS3(b"\xff\xd8\xff\xe0" + b"\0" * 100_000) # A JPEG
+        self.assertIsNone(self.detect(s3))
+        self.assertEqual(s3.ranges, [f"bytes=0-{textract._PDF_HEADER_BYTES - 1}"])
+
+    def test_small_pdfs_fall_back_to_one_job(self):
+        s3 = RangedS3(make_pdf(4))
+        self.assertIsNone(self.detect(s3))
+        self.assertEqual(s3.ranges, [f"bytes=0-{textract._PDF_HEADER_BYTES - 1}", None])
+
+
+if __name__ == '__main__':
+    unittest.main()